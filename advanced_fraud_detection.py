@@ -1,21 +1,130 @@
+import argparse
 import psycopg2
 import psycopg2.extras
+import hashlib
+import multiprocessing
 import random
+import time
 import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import networkx as nx
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, List, Dict, Tuple, Optional, Union
 import logging
 
+from cluster_graph import ClusterGraph, read_edges
+from graph_analytics import account_centrality
+from pattern_store import PatternStore
+from transaction_graph import (TemporalGraph, datetime_to_epoch, epoch_to_datetime, find_layered_chains,
+                               find_temporal_cycles)
+from security_dashboard.burst_monitor import BurstDetector, BurstMonitor
+from security_dashboard.cluster_index import ClusterIndex, cluster_risk, load_account_cluster
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Transfers of the burst window in time order, replayed through BurstDetector
+VELOCITY_BURST_QUERY = """
+    SELECT 
+        t.transaction_id,
+        EXTRACT(EPOCH FROM t.transaction_date),
+        t.sender_account_id,
+        a.client_id,
+        t.amount
+    FROM transaction t
+    JOIN account a ON t.sender_account_id = a.account_id
+    WHERE t.transaction_date >= NOW() - INTERVAL '%s minutes'
+    ORDER BY t.transaction_date, t.transaction_id;
+"""
+
+NETWORK_EDGE_QUERY = """
+    SELECT 
+        t.sender_account_id,
+        t.receiver_account_id,
+        COUNT(*) as transaction_count,
+        SUM(t.amount) as total_amount,
+        MAX(t.transaction_date) as last_transaction
+    FROM transaction t
+    WHERE t.transaction_date >= NOW() - INTERVAL '%s days'
+    GROUP BY t.sender_account_id, t.receiver_account_id
+    HAVING COUNT(*) >= 1
+    ORDER BY transaction_count DESC;
+"""
+
+NEW_DEVICE_QUERY = """
+    SELECT 
+        d.device_id,
+        d.device_fingerprint,
+        d.device_type,
+        d.os,
+        d.browser,
+        d.first_seen_date,
+        COUNT(t.transaction_id) as transaction_count,
+        SUM(t.amount) as total_amount,
+        COUNT(DISTINCT t.sender_account_id) as unique_accounts,
+        MIN(t.transaction_date) as first_transaction,
+        MAX(t.transaction_date) as last_transaction
+    FROM device d
+    LEFT JOIN transaction t ON d.device_id = t.device_id
+    WHERE d.first_seen_date >= NOW() - INTERVAL '%s hours'
+    GROUP BY d.device_id, d.device_fingerprint, d.device_type, d.os, d.browser, d.first_seen_date
+    ORDER BY transaction_count DESC, total_amount DESC;
+"""
+
+SUSPICIOUS_IP_QUERY = """
+    SELECT 
+        ip.ip_address_id,
+        ip.ip_address,
+        ip.country,
+        ip.is_proxy,
+        ip.is_tor,
+        ip.is_vpn,
+        ip.threat_level,
+        COUNT(t.transaction_id) as transaction_count,
+        SUM(t.amount) as total_amount,
+        COUNT(DISTINCT t.sender_account_id) as unique_accounts,
+        MIN(t.transaction_date) as first_transaction,
+        MAX(t.transaction_date) as last_transaction
+    FROM ipaddress ip
+    LEFT JOIN transaction t ON ip.ip_address_id = t.ip_address_id
+    WHERE ip.is_proxy = TRUE OR ip.is_tor = TRUE OR ip.threat_level IN ('high', 'critical')
+    GROUP BY ip.ip_address_id, ip.ip_address, ip.country, ip.is_proxy, ip.is_tor, ip.is_vpn, ip.threat_level
+    ORDER BY transaction_count DESC, total_amount DESC;
+"""
+
+
+ALERT_INSERT_QUERY = """
+    INSERT INTO alert (alert_type, severity, title, description, risk_score, auto_generated, pattern_key)
+    VALUES %s
+    ON CONFLICT (pattern_key) WHERE status IN ('open', 'investigating') DO NOTHING
+    RETURNING alert_id
+"""
+
+# Rows fetched per round-trip by the detectors' server-side cursors
+DEFAULT_ITERSIZE = 10000
+
+# Below this many account pairs analyze_network_clusters uses NetworkX
+NETWORKX_MAX_EDGES = 200
+
+# Detectors run by run_comprehensive_analysis, in the order their patterns are merged
+DETECTORS = (
+    'detect_carousel_patterns',
+    'detect_velocity_bursts',
+    'detect_layered_transactions',
+    'analyze_network_clusters',
+    'detect_new_device_patterns',
+    'detect_suspicious_ip_patterns',
+)
+
 class AdvancedFraudDetection:
     def __init__(self, db_config):
         self.db_config = db_config
         self.conn = None
+        # Live velocity-burst view of run_incremental_analysis, warmed on first use
+        self.burst_monitor = None
+        # Live cluster index of run_incremental_analysis, saved to AccountCluster
+        self.cluster_index = None
         self.connect()
         
     def connect(self):
@@ -26,367 +135,385 @@ class AdvancedFraudDetection:
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             raise
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
     
-    def detect_carousel_patterns(self, time_window_hours=24) -> List[Dict]:
+    def _stream(self, name: str, query: str, params=None, itersize: int = DEFAULT_ITERSIZE) -> Iterator[Tuple]:
+        """
+        Yield the query's rows as tuples from a server-side cursor.
+
+        PostgreSQL sends ``itersize`` rows per round-trip, so only one batch
+        is held in memory however large the result is.
+        """
+        with self.conn.cursor(name=name) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            yield from cursor
+
+    def detect_carousel_patterns(self, time_window_hours=24, min_length=3, max_length=6,
+                                 since: Optional[Tuple[int, Optional[datetime]]] = None) -> List[Dict]:
         """
         Detect carousel patterns - circular transactions between multiple accounts
         designed to obscure money trail
+
+        The window's transfers are loaded once into an in-memory temporal graph
+        and searched for simple cycles whose transactions happen in order.
+
+        Args:
+            since: (transaction id, date) high-water mark; when given, only
+                cycles containing a transaction above either are returned
         """
-        query = """
-        WITH RECURSIVE transaction_paths AS (
-            SELECT 
-                t.sender_account_id,
-                t.receiver_account_id,
-                t.amount,
-                t.transaction_date,
-                ARRAY[t.transaction_id] as transaction_ids,
-                ARRAY[t.sender_account_id, t.receiver_account_id] as account_path,
-                1 as path_length
-            FROM transaction t
-            WHERE t.transaction_date >= NOW() - INTERVAL '%s hours'
-            
-            UNION ALL
-            
-            SELECT 
-                tp.sender_account_id,
-                t.receiver_account_id,
-                tp.amount + t.amount as total_amount,
-                GREATEST(tp.transaction_date, t.transaction_date) as latest_date,
-                tp.transaction_ids || t.transaction_id,
-                tp.account_path || t.receiver_account_id,
-                tp.path_length + 1
-            FROM transaction_paths tp
-            JOIN transaction t ON tp.receiver_account_id = t.sender_account_id
-            WHERE t.transaction_date >= NOW() - INTERVAL '%s hours'
-            AND tp.path_length < 6
-            AND t.receiver_account_id != ALL(tp.account_path[1:-1])
-        )
-        SELECT 
-            account_path,
-            transaction_ids,
-            SUM(amount) as total_amount,
-            COUNT(*) as transaction_count,
-            MAX(transaction_date) as latest_date,
-            path_length
-        FROM transaction_paths
-        WHERE account_path[1] = account_path[array_length(account_path, 1)]
-        AND path_length >= 3
-        GROUP BY account_path, transaction_ids, path_length
-        HAVING COUNT(*) >= 3
-        ORDER BY total_amount DESC, path_length DESC;
-        """
-        
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, (time_window_hours, time_window_hours))
-                patterns = cursor.fetchall()
-                
-                results = []
-                for pattern in patterns:
-                    results.append({
-                        'pattern_type': 'carousel',
-                        'account_path': pattern['account_path'],
-                        'transaction_ids': pattern['transaction_ids'],
-                        'total_amount': float(pattern['total_amount']),
-                        'transaction_count': pattern['transaction_count'],
-                        'risk_score': self._calculate_carousel_risk(pattern),
-                        'latest_date': pattern['latest_date']
-                    })
-                
-                logger.info(f"Detected {len(results)} carousel patterns")
-                return results
-                
+            return self._carousel_patterns(time_window_hours, min_length, max_length, since)
         except Exception as e:
             logger.error(f"Error detecting carousel patterns: {e}")
             return []
+
+    def _carousel_patterns(self, time_window_hours, min_length, max_length, since) -> List[Dict]:
+        results = list(self.iter_carousel_patterns(time_window_hours, min_length, max_length, since))
+        results.sort(key=lambda x: (x['total_amount'], x['transaction_count']), reverse=True)
+        logger.info(f"Detected {len(results)} carousel patterns")
+        return results
+
+    def iter_carousel_patterns(self, time_window_hours=24, min_length=3, max_length=6,
+                               since: Optional[Tuple[int, Optional[datetime]]] = None,
+                               itersize: int = 100000) -> Iterator[Dict]:
+        """Carousel patterns in the order the cycle search finds them; errors propagate"""
+        graph = TemporalGraph.load_window(self.conn, time_window_hours, itersize)
+        new_ids = None
+        if since is not None:
+            new = graph.out_txid > since[0]
+            if since[1] is not None:
+                new |= graph.out_ts >= datetime_to_epoch(since[1])
+            new_ids = set(graph.out_txid[new].tolist())
+            # Only the neighbourhood of the new transfers can hold a new cycle
+            graph = graph.around(new, max_length - 1)
+        candidates = graph.cycle_candidates()
+        logger.info(f"Carousel search over {candidates.num_edges} of {graph.num_edges} transfers")
+
+        # First-transaction dates, looked up by id
+        order = np.argsort(candidates.out_txid)
+        sorted_ids = candidates.out_txid[order]
+        sorted_ts = candidates.out_ts[order]
+
+        for account_path, transaction_ids, total_amount, last_ts in find_temporal_cycles(
+                candidates, min_length, max_length):
+            if new_ids is not None and new_ids.isdisjoint(transaction_ids):
+                continue
+            pattern = {
+                'path_length': len(transaction_ids),
+                'total_amount': total_amount
+            }
+            yield {
+                'pattern_type': 'carousel',
+                'account_path': account_path,
+                'transaction_ids': transaction_ids,
+                'total_amount': total_amount,
+                'transaction_count': len(transaction_ids),
+                'risk_score': self._calculate_carousel_risk(pattern),
+                'first_date': epoch_to_datetime(
+                    float(sorted_ts[np.searchsorted(sorted_ids, transaction_ids)].min())),
+                'latest_date': epoch_to_datetime(last_ts)
+            }
     
-    def detect_velocity_bursts(self, time_window_minutes=15, threshold_count=5) -> List[Dict]:
+    def detect_velocity_bursts(self, time_window_minutes=15, threshold_count=5,
+                               history_minutes=None) -> List[Dict]:
         """
         Detect velocity bursts - unusual high frequency of transactions
+
+        A burst is at least ``threshold_count`` transfers from one account
+        within ``time_window_minutes``, found by replaying the last
+        ``history_minutes`` (defaults to the window) through BurstDetector.
         """
-        query = """
-        SELECT 
-            a.client_id,
-            t.sender_account_id,
-            COUNT(*) as transaction_count,
-            SUM(t.amount) as total_amount,
-            AVG(t.amount) as avg_amount,
-            MIN(t.transaction_date) as first_transaction,
-            MAX(t.transaction_date) as last_transaction
-        FROM transaction t
-        JOIN account a ON t.sender_account_id = a.account_id
-        WHERE t.transaction_date >= NOW() - INTERVAL '%s minutes'
-        GROUP BY a.client_id, t.sender_account_id
-        HAVING COUNT(*) >= %s
-        ORDER BY transaction_count DESC, total_amount DESC;
-        """
-        
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, (time_window_minutes, threshold_count))
-                bursts = cursor.fetchall()
-                
-                results = []
-                for burst in bursts:
-                    results.append({
-                        'pattern_type': 'velocity_burst',
-                        'client_id': burst['client_id'],
-                        'account_id': burst['sender_account_id'],
-                        'transaction_count': burst['transaction_count'],
-                        'total_amount': float(burst['total_amount']),
-                        'avg_amount': float(burst['avg_amount']),
-                        'time_window_minutes': time_window_minutes,
-                        'risk_score': self._calculate_velocity_risk(burst),
-                        'first_transaction': burst['first_transaction'],
-                        'last_transaction': burst['last_transaction']
-                    })
-                
-                logger.info(f"Detected {len(results)} velocity bursts")
-                return results
+            results = list(self.iter_velocity_bursts(time_window_minutes, threshold_count, history_minutes))
+            results.sort(key=lambda x: (x['transaction_count'], x['total_amount']), reverse=True)
+            logger.info(f"Detected {len(results)} velocity bursts")
+            return results
                 
         except Exception as e:
             logger.error(f"Error detecting velocity bursts: {e}")
             return []
+
+    def iter_velocity_bursts(self, time_window_minutes=15, threshold_count=5, history_minutes=None,
+                             itersize: int = DEFAULT_ITERSIZE) -> Iterator[Dict]:
+        """
+        Velocity bursts of the history span; errors propagate.
+
+        Transfers are streamed in time order through per-sender deque
+        windows. A burst can grow until the stream ends, so bursts are
+        yielded once the span has been read.
+        """
+        detector = BurstDetector(time_window_minutes * 60, threshold_count)
+        rows = self._stream('velocity_bursts', VELOCITY_BURST_QUERY,
+                            (history_minutes or time_window_minutes,), itersize)
+        for transaction_id, ts, sender, client_id, amount in rows:
+            detector.add(transaction_id, float(ts), sender, client_id, amount)
+        for burst in detector.bursts():
+            burst['risk_score'] = self._calculate_velocity_risk(burst)
+            yield burst
     
-    def detect_layered_transactions(self, min_layers=3, time_window_hours=24) -> List[Dict]:
+    def detect_layered_transactions(self, min_layers=3, time_window_hours=24,
+                                    since: Optional[Tuple[int, Optional[datetime]]] = None,
+                                    max_layers=6, max_dwell_minutes=240, amount_tolerance=0.1) -> List[Dict]:
         """
         Detect layered transactions - complex money laundering patterns
         with multiple intermediate accounts
+
+        Money is followed forward through the window's temporal graph: each
+        hop must leave its account after the previous one arrived, within
+        ``max_dwell_minutes``, and carry at least ``1 - amount_tolerance`` of
+        the previous hop's amount (and no more than it). The deepest chain
+        per originator and final beneficiary is reported.
+
+        Args:
+            since: (transaction id, date) high-water mark; when given, only
+                chains containing a transaction above either are returned
         """
-        query = """
-        WITH transaction_chains AS (
-            SELECT 
-                t1.sender_account_id as originator,
-                tN.receiver_account_id as final_beneficiary,
-                ARRAY_AGG(t1.sender_account_id ORDER BY t1.transaction_date) as account_chain,
-                ARRAY_AGG(t1.transaction_id ORDER BY t1.transaction_date) as transaction_ids,
-                SUM(t1.amount) as total_amount,
-                COUNT(*) as chain_length,
-                MAX(t1.transaction_date) as latest_date
-            FROM (
-                SELECT 
-                    t.sender_account_id,
-                    t.receiver_account_id,
-                    t.transaction_id,
-                    t.amount,
-                    t.transaction_date,
-                    ROW_NUMBER() OVER (PARTITION BY t.sender_account_id ORDER BY t.transaction_date) as rn
-                FROM transaction t
-                WHERE t.transaction_date >= NOW() - INTERVAL '%s hours'
-            ) t1
-            JOIN transaction t2 ON t1.receiver_account_id = t2.sender_account_id
-            JOIN transaction t3 ON t2.receiver_account_id = t3.sender_account_id
-            WHERE t3.transaction_date >= NOW() - INTERVAL '%s hours'
-            AND t1.sender_account_id != t3.receiver_account_id
-            GROUP BY t1.sender_account_id, t3.receiver_account_id
-            HAVING COUNT(DISTINCT t1.receiver_account_id) >= %s
-        )
-        SELECT * FROM transaction_chains
-        ORDER BY chain_length DESC, total_amount DESC;
-        """
-        
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, (time_window_hours, time_window_hours, min_layers - 1))
-                layers = cursor.fetchall()
-                
-                results = []
-                for layer in layers:
-                    results.append({
-                        'pattern_type': 'layered_transaction',
-                        'originator': layer['originator'],
-                        'final_beneficiary': layer['final_beneficiary'],
-                        'account_chain': layer['account_chain'],
-                        'transaction_ids': layer['transaction_ids'],
-                        'total_amount': float(layer['total_amount']),
-                        'chain_length': layer['chain_length'],
-                        'risk_score': self._calculate_layered_risk(layer),
-                        'latest_date': layer['latest_date']
-                    })
-                
-                logger.info(f"Detected {len(results)} layered transaction patterns")
-                return results
-                
+            return self._layered_transactions(min_layers, time_window_hours, since,
+                                              max_layers, max_dwell_minutes, amount_tolerance)
         except Exception as e:
             logger.error(f"Error detecting layered transactions: {e}")
             return []
+
+    def _layered_transactions(self, min_layers, time_window_hours, since,
+                              max_layers=6, max_dwell_minutes=240, amount_tolerance=0.1) -> List[Dict]:
+        results = list(self.iter_layered_transactions(min_layers, time_window_hours, since,
+                                                      max_layers, max_dwell_minutes, amount_tolerance))
+        results.sort(key=lambda x: (x['chain_length'], x['total_amount']), reverse=True)
+        logger.info(f"Detected {len(results)} layered transaction patterns")
+        return results
+
+    def iter_layered_transactions(self, min_layers=3, time_window_hours=24,
+                                  since: Optional[Tuple[int, Optional[datetime]]] = None,
+                                  max_layers=6, max_dwell_minutes=240, amount_tolerance=0.1,
+                                  itersize: int = 100000) -> Iterator[Dict]:
+        """
+        Layered transaction chains, one per originator and final beneficiary; errors propagate.
+
+        Chains for the same pair are only comparable once the search is
+        done, so patterns are yielded after it.
+        """
+        graph = TemporalGraph.load_window(self.conn, time_window_hours, itersize)
+        new_ids = None
+        if since is not None:
+            new = graph.out_txid > since[0]
+            if since[1] is not None:
+                new |= graph.out_ts >= datetime_to_epoch(since[1])
+            new_ids = set(graph.out_txid[new].tolist())
+            # One hop beyond the longest chain, so chain ends are judged as in a full search
+            graph = graph.along(new, max_layers)
+
+        deepest = {}
+        for account_path, transaction_ids, total_amount, first_ts, last_ts in find_layered_chains(
+                graph, min_layers, max_layers, max_dwell_minutes * 60, amount_tolerance):
+            if new_ids is not None and new_ids.isdisjoint(transaction_ids):
+                continue
+            pair = (account_path[0], account_path[-1])
+            current = deepest.get(pair)
+            if current is not None and (current['chain_length'], current['total_amount']) >= \
+                    (len(transaction_ids), total_amount):
+                continue
+            deepest[pair] = {
+                'pattern_type': 'layered_transaction',
+                'originator': account_path[0],
+                'final_beneficiary': account_path[-1],
+                'account_chain': account_path[:-1],
+                'transaction_ids': transaction_ids,
+                'total_amount': total_amount,
+                'chain_length': len(transaction_ids),
+                'first_date': epoch_to_datetime(first_ts),
+                'latest_date': epoch_to_datetime(last_ts)
+            }
+
+        for layer in deepest.values():
+            layer['risk_score'] = self._calculate_layered_risk(layer)
+            yield layer
     
     def analyze_network_clusters(self, min_cluster_size=5, time_window_days=7) -> List[Dict]:
         """
         Analyze transaction network to identify suspicious clusters
         using graph analysis
         """
-        query = """
-        SELECT 
-            t.sender_account_id,
-            t.receiver_account_id,
-            COUNT(*) as transaction_count,
-            SUM(t.amount) as total_amount,
-            MAX(t.transaction_date) as last_transaction
-        FROM transaction t
-        WHERE t.transaction_date >= NOW() - INTERVAL '%s days'
-        GROUP BY t.sender_account_id, t.receiver_account_id
-        HAVING COUNT(*) >= 1
-        ORDER BY transaction_count DESC;
-        """
-        
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, (time_window_days,))
-                edges = cursor.fetchall()
-                
-                # Build network graph
-                G = nx.Graph()
-                
-                for edge in edges:
-                    G.add_edge(
-                        edge['sender_account_id'], 
-                        edge['receiver_account_id'],
-                        weight=edge['transaction_count'],
-                        total_amount=edge['total_amount']
-                    )
-                
-                # Find connected components
-                clusters = []
-                for component in nx.connected_components(G):
-                    if len(component) >= min_cluster_size:
-                        subgraph = G.subgraph(component)
-                        
-                        # Calculate cluster metrics
-                        density = nx.density(subgraph)
-                        avg_clustering = nx.average_clustering(subgraph)
-                        
-                        # Find central nodes
-                        centrality = nx.degree_centrality(subgraph)
-                        central_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:3]
-                        
-                        clusters.append({
-                            'pattern_type': 'network_cluster',
-                            'cluster_size': len(component),
-                            'accounts': list(component),
-                            'density': density,
-                            'avg_clustering_coefficient': avg_clustering,
-                            'central_accounts': central_nodes,
-                            'risk_score': self._calculate_cluster_risk(subgraph),
-                            'transaction_count': subgraph.size(weight='weight')
-                        })
-                
-                logger.info(f"Detected {len(clusters)} suspicious network clusters")
-                return clusters
+            clusters = list(self.iter_network_clusters(min_cluster_size, time_window_days))
+            logger.info(f"Detected {len(clusters)} suspicious network clusters")
+            return clusters
                 
         except Exception as e:
             logger.error(f"Error analyzing network clusters: {e}")
             return []
+
+    def iter_network_clusters(self, min_cluster_size=5, time_window_days=7,
+                              itersize: int = DEFAULT_ITERSIZE) -> Iterator[Dict]:
+        """
+        Suspicious clusters, one per connected component; errors propagate.
+
+        The edges are streamed into NumPy arrays and every component's
+        metrics are computed at once with SciPy sparse matrices; graphs of
+        fewer than NETWORKX_MAX_EDGES pairs go through NetworkX instead.
+        """
+        rows = self._stream('network_edges', NETWORK_EDGE_QUERY, (time_window_days,), itersize)
+        graph = ClusterGraph.from_rows(rows, itersize)
+        if graph.num_edges < NETWORKX_MAX_EDGES:
+            yield from self._networkx_clusters(graph, min_cluster_size)
+            return
+
+        for component in graph.components(min_cluster_size):
+            yield {
+                'pattern_type': 'network_cluster',
+                'cluster_size': component['size'],
+                'accounts': component['accounts'],
+                'density': component['density'],
+                'avg_clustering_coefficient': component['avg_clustering'],
+                'central_accounts': component['central'],
+                'risk_score': self._calculate_cluster_risk(component['size'], component['density']),
+                'transaction_count': component['weight']
+            }
+
+    def _networkx_clusters(self, graph: ClusterGraph, min_cluster_size: int) -> Iterator[Dict]:
+        # Build network graph
+        G = nx.Graph()
+        for sender, receiver, weight in zip(graph.accounts[graph.src].tolist(),
+                                            graph.accounts[graph.dst].tolist(), graph.weight.tolist()):
+            G.add_edge(sender, receiver, weight=weight)
+
+        # Find connected components
+        for component in nx.connected_components(G):
+            if len(component) >= min_cluster_size:
+                subgraph = G.subgraph(component)
+
+                # Calculate cluster metrics
+                density = nx.density(subgraph)
+                avg_clustering = nx.average_clustering(subgraph)
+
+                # Find central nodes
+                centrality = nx.degree_centrality(subgraph)
+                central_nodes = sorted(centrality.items(), key=lambda x: (-x[1], x[0]))[:3]
+
+                yield {
+                    'pattern_type': 'network_cluster',
+                    'cluster_size': len(component),
+                    'accounts': sorted(component),
+                    'density': density,
+                    'avg_clustering_coefficient': avg_clustering,
+                    'central_accounts': central_nodes,
+                    'risk_score': self._calculate_cluster_risk(len(component), density),
+                    'transaction_count': subgraph.size(weight='weight')
+                }
+
+    def account_cluster(self, account_id: int) -> Optional[Dict]:
+        """
+        Cluster of an account as last saved by run_incremental_analysis
+
+        Returns:
+            dict with cluster_id, cluster_size, edge_count, density and
+            risk_score, or None if the account is in no cluster
+        """
+        return load_account_cluster(self.conn, account_id)
+
+    def analyze_account_centrality(self, min_cluster_size=5, time_window_days=7,
+                                   max_workers: Optional[int] = None, communities: str = 'louvain',
+                                   itersize: int = DEFAULT_ITERSIZE) -> List[Dict]:
+        """
+        PageRank, betweenness and community features of the accounts in
+        clusters of at least ``min_cluster_size`` accounts, to find mule hubs
+
+        The clusters are scored in ``max_workers`` processes (every CPU by
+        default), see graph_analytics.py.
+
+        Returns:
+            one dict per account (see account_centrality), highest relative
+            PageRank first
+        """
+        try:
+            rows = self._stream('centrality_edges', NETWORK_EDGE_QUERY, (time_window_days,), itersize)
+            senders, receivers, weights = read_edges(rows, itersize)
+            features = account_centrality(senders, receivers, weights, min_cluster_size=min_cluster_size,
+                                          max_workers=max_workers, communities=communities)
+            results = sorted(features.values(), key=lambda x: (-x['relative_pagerank'], x['account_id']))
+            logger.info(f"Computed centrality features of {len(results)} accounts")
+            return results
+
+        except Exception as e:
+            logger.error(f"Error analyzing account centrality: {e}")
+            return []
     
     def detect_new_device_patterns(self, device_age_hours=24) -> List[Dict]:
         """
         Detect transactions from new or suspicious devices
         """
-        query = """
-        SELECT 
-            d.device_id,
-            d.device_fingerprint,
-            d.device_type,
-            d.os,
-            d.browser,
-            d.first_seen_date,
-            COUNT(t.transaction_id) as transaction_count,
-            SUM(t.amount) as total_amount,
-            COUNT(DISTINCT t.sender_account_id) as unique_accounts,
-            MIN(t.transaction_date) as first_transaction,
-            MAX(t.transaction_date) as last_transaction
-        FROM device d
-        LEFT JOIN transaction t ON d.device_id = t.device_id
-        WHERE d.first_seen_date >= NOW() - INTERVAL '%s hours'
-        GROUP BY d.device_id, d.device_fingerprint, d.device_type, d.os, d.browser, d.first_seen_date
-        ORDER BY transaction_count DESC, total_amount DESC;
-        """
-        
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, (device_age_hours,))
-                devices = cursor.fetchall()
-                
-                results = []
-                for device in devices:
-                    results.append({
-                        'pattern_type': 'new_device',
-                        'device_id': device['device_id'],
-                        'device_fingerprint': device['device_fingerprint'],
-                        'device_type': device['device_type'],
-                        'os': device['os'],
-                        'browser': device['browser'],
-                        'device_age_hours': device_age_hours,
-                        'transaction_count': device['transaction_count'],
-                        'total_amount': float(device['total_amount']) if device['total_amount'] else 0,
-                        'unique_accounts': device['unique_accounts'],
-                        'risk_score': self._calculate_device_risk(device),
-                        'first_transaction': device['first_transaction'],
-                        'last_transaction': device['last_transaction']
-                    })
-                
-                logger.info(f"Detected {len(results)} new device patterns")
-                return results
+            results = list(self.iter_new_device_patterns(device_age_hours))
+            logger.info(f"Detected {len(results)} new device patterns")
+            return results
                 
         except Exception as e:
             logger.error(f"Error detecting new device patterns: {e}")
             return []
+
+    def iter_new_device_patterns(self, device_age_hours=24,
+                                 itersize: int = DEFAULT_ITERSIZE) -> Iterator[Dict]:
+        """New device patterns streamed as the query returns them; errors propagate"""
+        rows = self._stream('new_devices', NEW_DEVICE_QUERY, (device_age_hours,), itersize)
+        for (device_id, fingerprint, device_type, os_name, browser, _, transaction_count, total_amount,
+             unique_accounts, first, last) in rows:
+            device = {
+                'pattern_type': 'new_device',
+                'device_id': device_id,
+                'device_fingerprint': fingerprint,
+                'device_type': device_type,
+                'os': os_name,
+                'browser': browser,
+                'device_age_hours': device_age_hours,
+                'transaction_count': transaction_count,
+                'total_amount': float(total_amount) if total_amount else 0,
+                'unique_accounts': unique_accounts,
+                'first_transaction': first,
+                'last_transaction': last
+            }
+            device['risk_score'] = self._calculate_device_risk(device)
+            yield device
     
     def detect_suspicious_ip_patterns(self) -> List[Dict]:
         """
         Detect transactions from suspicious IP addresses
         """
-        query = """
-        SELECT 
-            ip.ip_address_id,
-            ip.ip_address,
-            ip.country,
-            ip.is_proxy,
-            ip.is_tor,
-            ip.is_vpn,
-            ip.threat_level,
-            COUNT(t.transaction_id) as transaction_count,
-            SUM(t.amount) as total_amount,
-            COUNT(DISTINCT t.sender_account_id) as unique_accounts,
-            MIN(t.transaction_date) as first_transaction,
-            MAX(t.transaction_date) as last_transaction
-        FROM ipaddress ip
-        LEFT JOIN transaction t ON ip.ip_address_id = t.ip_address_id
-        WHERE ip.is_proxy = TRUE OR ip.is_tor = TRUE OR ip.threat_level IN ('high', 'critical')
-        GROUP BY ip.ip_address_id, ip.ip_address, ip.country, ip.is_proxy, ip.is_tor, ip.is_vpn, ip.threat_level
-        ORDER BY transaction_count DESC, total_amount DESC;
-        """
-        
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query)
-                ips = cursor.fetchall()
-                
-                results = []
-                for ip in ips:
-                    results.append({
-                        'pattern_type': 'suspicious_ip',
-                        'ip_address_id': ip['ip_address_id'],
-                        'ip_address': str(ip['ip_address']),
-                        'country': ip['country'],
-                        'is_proxy': ip['is_proxy'],
-                        'is_tor': ip['is_tor'],
-                        'is_vpn': ip['is_vpn'],
-                        'threat_level': ip['threat_level'],
-                        'transaction_count': ip['transaction_count'],
-                        'total_amount': float(ip['total_amount']) if ip['total_amount'] else 0,
-                        'unique_accounts': ip['unique_accounts'],
-                        'risk_score': self._calculate_ip_risk(ip),
-                        'first_transaction': ip['first_transaction'],
-                        'last_transaction': ip['last_transaction']
-                    })
-                
-                logger.info(f"Detected {len(results)} suspicious IP patterns")
-                return results
+            results = list(self.iter_suspicious_ip_patterns())
+            logger.info(f"Detected {len(results)} suspicious IP patterns")
+            return results
                 
         except Exception as e:
             logger.error(f"Error detecting suspicious IP patterns: {e}")
             return []
+
+    def iter_suspicious_ip_patterns(self, itersize: int = DEFAULT_ITERSIZE) -> Iterator[Dict]:
+        """Suspicious IP patterns streamed as the query returns them; errors propagate"""
+        rows = self._stream('suspicious_ips', SUSPICIOUS_IP_QUERY, None, itersize)
+        for (ip_address_id, ip_address, country, is_proxy, is_tor, is_vpn, threat_level,
+             transaction_count, total_amount, unique_accounts, first, last) in rows:
+            ip = {
+                'pattern_type': 'suspicious_ip',
+                'ip_address_id': ip_address_id,
+                'ip_address': str(ip_address),
+                'country': country,
+                'is_proxy': is_proxy,
+                'is_tor': is_tor,
+                'is_vpn': is_vpn,
+                'threat_level': threat_level,
+                'transaction_count': transaction_count,
+                'total_amount': float(total_amount) if total_amount else 0,
+                'unique_accounts': unique_accounts,
+                'first_transaction': first,
+                'last_transaction': last
+            }
+            ip['risk_score'] = self._calculate_ip_risk(ip)
+            yield ip
     
     def _calculate_carousel_risk(self, pattern) -> float:
         """Calculate risk score for carousel patterns"""
@@ -399,29 +526,27 @@ class AdvancedFraudDetection:
         """Calculate risk score for velocity bursts"""
         base_score = 0.5
         count_multiplier = min(burst['transaction_count'] * 0.05, 0.3)
-        amount_multiplier = min(burst['total_amount'] / 50000, 0.2)
+        amount_multiplier = min(float(burst['total_amount']) / 50000, 0.2)
         return min(base_score + count_multiplier + amount_multiplier, 1.0)
     
     def _calculate_layered_risk(self, layer) -> float:
         """Calculate risk score for layered transactions"""
         base_score = 0.6
         layer_multiplier = min(layer['chain_length'] * 0.1, 0.3)
-        amount_multiplier = min(layer['total_amount'] / 100000, 0.2)
+        amount_multiplier = min(float(layer['total_amount']) / 100000, 0.2)
         return min(base_score + layer_multiplier + amount_multiplier, 1.0)
     
-    def _calculate_cluster_risk(self, subgraph) -> float:
+    def _calculate_cluster_risk(self, cluster_size, density) -> float:
         """Calculate risk score for network clusters"""
-        base_score = 0.4
-        size_multiplier = min(len(subgraph.nodes()) * 0.02, 0.3)
-        density_multiplier = min(nx.density(subgraph) * 0.5, 0.3)
-        return min(base_score + size_multiplier + density_multiplier, 1.0)
+        # Shared with ClusterIndex, which scores clusters at transaction time
+        return cluster_risk(cluster_size, density)
     
     def _calculate_device_risk(self, device) -> float:
         """Calculate risk score for new devices"""
         base_score = 0.3
         transaction_multiplier = min(device['transaction_count'] * 0.05, 0.3)
         account_multiplier = min(device['unique_accounts'] * 0.1, 0.2)
-        amount_multiplier = min((device['total_amount'] or 0) / 10000, 0.2)
+        amount_multiplier = min(float(device['total_amount'] or 0) / 10000, 0.2)
         return min(base_score + transaction_multiplier + account_multiplier + amount_multiplier, 1.0)
     
     def _calculate_ip_risk(self, ip) -> float:
@@ -441,63 +566,126 @@ class AdvancedFraudDetection:
         
         return min(base_score + transaction_multiplier + account_multiplier, 1.0)
     
-    def create_alerts_for_patterns(self, patterns: List[Dict]) -> None:
-        """Create alerts for detected fraud patterns"""
+    def _alert_severity(self, risk_score: float) -> str:
+        """Map a pattern's risk score to an alert severity"""
+        if risk_score >= 0.8:
+            return 'critical'
+        elif risk_score >= 0.6:
+            return 'high'
+        elif risk_score >= 0.4:
+            return 'medium'
+        return 'low'
+
+    def create_alerts_for_patterns(self, patterns: List[Dict], batch_size: int = 1000) -> int:
+        """
+        Create alerts for detected fraud patterns
+
+        Alerts are written with multi-row INSERTs, one transaction per batch.
+        A pattern that already has an open or investigating alert (same
+        pattern_key, see ``pattern_key``) is skipped, so repeated runs over
+        the same window do not raise the same alert again.
+
+        Returns:
+            Number of alerts created
+        """
+        rows = {}
         for pattern in patterns:
+            key = pattern_key(pattern)
+            if key not in rows:
+                rows[key] = (
+                    'fraud',
+                    self._alert_severity(pattern['risk_score']),
+                    f"{pattern['pattern_type'].replace('_', ' ').title()} Detected",
+                    f"Suspicious {pattern['pattern_type']} with risk score {pattern['risk_score']:.2f}",
+                    pattern['risk_score'],
+                    True,
+                    key
+                )
+        rows = list(rows.values())
+
+        created = 0
+        for offset in range(0, len(rows), batch_size):
+            batch = rows[offset:offset + batch_size]
             try:
                 with self.conn.cursor() as cursor:
-                    # Determine alert severity based on risk score
-                    if pattern['risk_score'] >= 0.8:
-                        severity = 'critical'
-                    elif pattern['risk_score'] >= 0.6:
-                        severity = 'high'
-                    elif pattern['risk_score'] >= 0.4:
-                        severity = 'medium'
-                    else:
-                        severity = 'low'
-                    
-                    # Create alert
-                    alert_query = """
-                    INSERT INTO alert (alert_type, severity, title, description, risk_score, auto_generated)
-                    VALUES (%s, %s, %s, %s, %s, TRUE)
-                    """
-                    
-                    title = f"{pattern['pattern_type'].replace('_', ' ').title()} Detected"
-                    description = f"Suspicious {pattern['pattern_type']} with risk score {pattern['risk_score']:.2f}"
-                    
-                    cursor.execute(alert_query, (
-                        'fraud',
-                        severity,
-                        title,
-                        description,
-                        pattern['risk_score']
-                    ))
-                
+                    created += len(psycopg2.extras.execute_values(
+                        cursor, ALERT_INSERT_QUERY, batch, page_size=batch_size, fetch=True))
                 self.conn.commit()
-                
             except Exception as e:
-                logger.error(f"Error creating alert for pattern: {e}")
+                logger.error(f"Error creating alerts for {len(batch)} patterns: {e}")
                 self.conn.rollback()
+
+        logger.info(f"Created {created} alerts for {len(patterns)} patterns")
+        return created
     
-    def run_comprehensive_analysis(self) -> Dict:
-        """Run all fraud detection algorithms"""
+    def _run_detectors_parallel(self, timeouts: Dict[str, Optional[float]]) -> Dict[str, List[Dict]]:
+        """
+        Run the detectors concurrently, one worker process and connection each.
+
+        Processes rather than threads because the graph detectors are
+        CPU-bound Python. The detectors only read, so they need not share a
+        snapshot. A detector that misses its timeout contributes no patterns
+        and its worker is terminated.
+        """
+        started = time.monotonic()
+        found = {}
+        pool = multiprocessing.Pool(len(DETECTORS))
+        try:
+            pending = {name: pool.apply_async(_run_detector, (self.db_config, name, timeouts[name]))
+                       for name in DETECTORS}
+            for name, result in pending.items():
+                timeout = timeouts[name]
+                remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+                try:
+                    found[name] = result.get(remaining)
+                except multiprocessing.TimeoutError:
+                    logger.error(f"{name} did not finish within {timeout}s")
+                    found[name] = []
+                except Exception as e:
+                    logger.error(f"Error running {name}: {e}")
+                    found[name] = []
+        finally:
+            pool.terminate()
+            pool.join()
+        return found
+
+    def run_comprehensive_analysis(self, parallel: bool = False,
+                                   detector_timeout: Union[None, float, Dict[str, float]] = None) -> Dict:
+        """
+        Run all fraud detection algorithms
+
+        Args:
+            parallel: Run the detectors concurrently in worker processes with
+                their own connections, so the analysis takes about as long as
+                the slowest detector instead of the sum of all six
+            detector_timeout: Seconds each detector may take in parallel
+                mode, either one value or a dict keyed by detector name
+        """
         logger.info("Starting comprehensive fraud detection analysis")
         
         results = {
             'timestamp': datetime.now(),
             'patterns': [],
             'total_patterns': 0,
-            'high_risk_patterns': 0
+            'high_risk_patterns': 0,
+            'alerts_created': 0
         }
         
         # Run all detection algorithms
+        if parallel:
+            if isinstance(detector_timeout, dict):
+                timeouts = {name: detector_timeout.get(name) for name in DETECTORS}
+            else:
+                timeouts = dict.fromkeys(DETECTORS, detector_timeout)
+            found = self._run_detectors_parallel(timeouts)
+        else:
+            found = {name: getattr(self, name)() for name in DETECTORS}
+
+        # Merged in detector order, so the stable sort below gives the same
+        # order either way
         patterns = []
-        patterns.extend(self.detect_carousel_patterns())
-        patterns.extend(self.detect_velocity_bursts())
-        patterns.extend(self.detect_layered_transactions())
-        patterns.extend(self.analyze_network_clusters())
-        patterns.extend(self.detect_new_device_patterns())
-        patterns.extend(self.detect_suspicious_ip_patterns())
+        for name in DETECTORS:
+            patterns.extend(found[name])
         
         # Sort by risk score
         patterns.sort(key=lambda x: x['risk_score'], reverse=True)
@@ -508,14 +696,167 @@ class AdvancedFraudDetection:
         
         # Create alerts for high-risk patterns
         high_risk_patterns = [p for p in patterns if p['risk_score'] >= 0.6]
-        if high_risk_patterns:
-            self.create_alerts_for_patterns(high_risk_patterns)
+        results['alerts_created'] = self.create_alerts_for_patterns(high_risk_patterns)
         
         logger.info(f"Analysis complete. Found {len(patterns)} patterns, {len(high_risk_patterns)} high-risk")
         
         return results
 
+    def run_incremental_analysis(self, overlap_seconds: float = 60) -> Dict:
+        """
+        Detect path patterns among new transactions and persist them.
+
+        Carousels and layered chains are searched only around transactions
+        above each detector's high-water mark in DetectorState, then merged
+        into TransactionPattern. Velocity bursts come from a BurstMonitor
+        kept on the detector, which only reads transfers committed since the
+        previous run, and are merged by sending account. A detector that fails
+        is rolled back and keeps its mark, so the next run retries it.
+        Finally the ClusterIndex kept on the detector takes in the new
+        transfers and writes the clusters that changed to AccountCluster and
+        NetworkCluster.
+
+        Args:
+            overlap_seconds: Span of transaction_date before the mark that is
+                searched again, for transfers that committed out of id order
+        """
+        logger.info("Starting incremental fraud detection analysis")
+        store = PatternStore(self.conn)
+
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(transaction_id), 0), MAX(transaction_date) FROM transaction")
+            mark_id, mark_date = cursor.fetchone()
+        self.conn.commit()
+
+        results = {
+            'timestamp': datetime.now(),
+            'patterns': [],
+            'inserted': 0,
+            'merged': 0,
+            'expired': 0,
+            'clusters': None,
+            'alerts_created': 0
+        }
+        incremental = (
+            ('detect_carousel_patterns', 'carousel', 24, self._carousel_patterns, (24, 3, 6)),
+            ('detect_layered_transactions', 'layered_transaction', 24, self._layered_transactions, (3, 24)),
+        )
+        for name, kind, window_hours, find, args in incremental:
+            try:
+                state = store.get_state(name)
+                since = None
+                if state is not None:
+                    last_id, last_date = state
+                    if last_date is not None:
+                        last_date -= timedelta(seconds=overlap_seconds)
+                    since = (last_id, last_date)
+                patterns = find(*args, since)
+                counts = store.merge(patterns)
+                expired = store.expire(kind, window_hours * 3600)
+                store.set_state(name, mark_id, mark_date)
+                self.conn.commit()
+            except Exception as e:
+                logger.error(f"Error in incremental {name}: {e}")
+                self.conn.rollback()
+                continue
+            results['patterns'].extend(patterns)
+            results['inserted'] += counts['inserted']
+            results['merged'] += counts['merged']
+            results['expired'] += expired
+
+        try:
+            # Kept across runs, so each run only reads transfers since the last one
+            if self.burst_monitor is None:
+                self.burst_monitor = BurstMonitor(window_seconds=15 * 60, threshold_count=5, sync_interval=0)
+                self.burst_monitor.warm(self.conn)
+            else:
+                self.burst_monitor.sync(self.conn, force=True)
+            bursts = self.burst_monitor.bursts()
+            for burst in bursts:
+                burst['risk_score'] = self._calculate_velocity_risk(burst)
+            counts = store.merge(bursts)
+            expired = store.expire('velocity_burst', 15 * 60)
+            self.conn.commit()
+            results['patterns'].extend(bursts)
+            results['inserted'] += counts['inserted']
+            results['merged'] += counts['merged']
+            results['expired'] += expired
+        except Exception as e:
+            logger.error(f"Error storing velocity bursts: {e}")
+            self.conn.rollback()
+
+        try:
+            if self.cluster_index is None:
+                self.cluster_index = ClusterIndex(sync_interval=0)
+                self.cluster_index.warm(self.conn)
+            else:
+                self.cluster_index.sync(self.conn, force=True)
+            results['clusters'] = self.cluster_index.save(self.conn)
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Error updating the cluster index: {e}")
+            self.conn.rollback()
+
+        results['patterns'].sort(key=lambda x: x['risk_score'], reverse=True)
+        results['alerts_created'] = self.create_alerts_for_patterns(
+            [p for p in results['patterns'] if p['risk_score'] >= 0.6])
+
+        logger.info(f"Incremental analysis complete. {results['inserted']} new patterns, "
+                    f"{results['merged']} merged, {results['expired']} expired")
+        return results
+
+def pattern_key(pattern: Dict) -> str:
+    """
+    Stable identity of a detected pattern across runs.
+
+    Path patterns are identified by their transactions, bursts by the
+    sending account, clusters by their member accounts and device/IP
+    patterns by the device or address.
+    """
+    kind = pattern['pattern_type']
+    if kind == 'velocity_burst':
+        # A growing burst keeps its alert
+        identity = pattern['account_id']
+    elif 'transaction_ids' in pattern:
+        identity = sorted(pattern['transaction_ids'])
+    elif kind == 'network_cluster':
+        identity = sorted(pattern['accounts'])
+    elif kind == 'new_device':
+        identity = pattern['device_id']
+    elif kind == 'suspicious_ip':
+        identity = pattern['ip_address_id']
+    else:
+        identity = sorted((k, str(v)) for k, v in pattern.items())
+    return hashlib.sha256(f"{kind}:{identity}".encode()).hexdigest()
+
+def _run_detector(db_config, name: str, timeout: Optional[float]) -> List[Dict]:
+    """Worker-process entry point of the parallel analysis"""
+    detector = AdvancedFraudDetection(db_config)
+    try:
+        if timeout:
+            # Stops the detector's queries server-side even after its worker is terminated
+            with detector.conn.cursor() as cursor:
+                cursor.execute("SET statement_timeout = %s", (max(1, int(timeout * 1000)),))
+            detector.conn.commit()
+        return getattr(detector, name)()
+    finally:
+        detector.close()
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run every fraud detector once and raise alerts')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run the detectors at once, each in its own worker process')
+    parser.add_argument('--detector-timeout', type=float,
+                        help='Seconds each detector may take with --parallel (default: no limit)')
+    args = parser.parse_args(argv)
+    if args.detector_timeout is not None and not args.parallel:
+        parser.error('--detector-timeout needs --parallel')
+    return args
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     # Database configuration
     db_config = {
         'host': 'localhost',
@@ -527,7 +868,8 @@ if __name__ == "__main__":
     
     # Initialize and run fraud detection
     detector = AdvancedFraudDetection(db_config)
-    results = detector.run_comprehensive_analysis()
+    results = detector.run_comprehensive_analysis(parallel=args.parallel, detector_timeout=args.detector_timeout)
+    detector.close()
     
     # Print results
     print(f"\n=== Fraud Detection Results ===")
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the AdvancedFraudDetection detectors.
+
+For every requested size a scratch database is created from
+enhanced_schema.sql and seeded with a synthetic transfer graph: background
+P2P traffic spread over ``--span-hours`` between ``size / --tx-per-account``
+accounts, plus injected carousels (time-ordered cycles of 3-6 accounts),
+velocity bursts (a sender firing well over the burst threshold in the last
+few minutes) and layered chains (3-6 forward hops with a small amount decay).
+
+Each detector and run_comprehensive_analysis() (sequential and parallel)
+are then timed, the SQL each detector runs is captured with EXPLAIN
+(ANALYZE, BUFFERS, FORMAT JSON), and peak Python memory is measured on a
+separate tracemalloc run so tracing does not skew the timings. Results are written as JSON; ``--compare`` prints the
+speed-up against an earlier results file.
+
+Example:
+    python benchmark_detectors.py --sizes 10k,100k,1M --output bench.json
+    python benchmark_detectors.py --sizes 10k --compare bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR, parse_dsn
+
+import advanced_fraud_detection
+from advanced_fraud_detection import AdvancedFraudDetection
+from transaction_generator import TransactionGenerator
+from transaction_graph import EDGE_QUERY
+
+logger = logging.getLogger('benchmark_detectors')
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'enhanced_schema.sql')
+
+TRANSACTION_COLUMNS = ('sender_account_id', 'receiver_account_id', 'amount', 'currency',
+                       'transaction_date', 'transaction_type', 'status', 'ip_address_id',
+                       'device_id', 'description')
+
+# Detector method -> (SQL it runs, parameters for the method's defaults)
+DETECTOR_QUERIES = {
+    'detect_carousel_patterns': (EDGE_QUERY, (24,)),
+    'detect_velocity_bursts': (advanced_fraud_detection.VELOCITY_BURST_QUERY, (15,)),
+    'detect_layered_transactions': (EDGE_QUERY, (24,)),
+    'analyze_network_clusters': (advanced_fraud_detection.NETWORK_EDGE_QUERY, (7,)),
+    'detect_new_device_patterns': (advanced_fraud_detection.NEW_DEVICE_QUERY, (24,)),
+    'detect_suspicious_ip_patterns': (advanced_fraud_detection.SUSPICIOUS_IP_QUERY, None),
+}
+
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10000, '2.5M' -> 2500000"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+# ----------------------------------------------------------------------
+# Synthetic graph
+# ----------------------------------------------------------------------
+
+def carousel_edges(accounts: np.ndarray, start_age: float) -> List[Tuple[int, int, float, float]]:
+    """A cycle through ``accounts``: each hop 5-30 minutes after the previous one."""
+    amount = round(random.uniform(20000, 150000), 2)
+    edges = []
+    age = start_age
+    for i, sender in enumerate(accounts):
+        receiver = accounts[(i + 1) % len(accounts)]
+        edges.append((int(sender), int(receiver), round(amount * random.uniform(0.97, 1.0), 2), age))
+        age -= random.uniform(300, 1800)
+    return edges
+
+
+def burst_edges(sender: int, receivers: np.ndarray, within_seconds: float) -> List[Tuple[int, int, float, float]]:
+    """One sender paying every receiver inside the last ``within_seconds``."""
+    return [(int(sender), int(receiver), round(random.uniform(1000, 9000), 2), random.uniform(0, within_seconds))
+            for receiver in receivers]
+
+
+def layer_edges(accounts: np.ndarray, start_age: float) -> List[Tuple[int, int, float, float]]:
+    """Money moved forward along ``accounts``, losing 1-3% per hop."""
+    amount = random.uniform(50000, 300000)
+    edges = []
+    age = start_age
+    for sender, receiver in zip(accounts[:-1], accounts[1:]):
+        edges.append((int(sender), int(receiver), round(amount, 2), age))
+        amount *= random.uniform(0.97, 0.99)
+        age -= random.uniform(600, 3600)
+    return edges
+
+
+def injected_edges(account_ids: np.ndarray, carousels: int, bursts: int,
+                   layers: int) -> Tuple[List[Tuple[int, int, float, float]], Dict[str, int]]:
+    """
+    Edges of the injected patterns as (sender, receiver, amount, age seconds).
+
+    Carousels and layers start within the last 20 hours so they fall inside
+    the detectors' 24-hour windows; bursts use the last 10 minutes of the
+    15-minute velocity window.
+    """
+    edges = []
+    injected = {'carousels': 0, 'bursts': 0, 'layers': 0}
+    for _ in range(carousels):
+        length = random.randint(3, 6)
+        if len(account_ids) >= length:
+            edges.extend(carousel_edges(np.random.choice(account_ids, length, replace=False),
+                                        random.uniform(4 * 3600, 20 * 3600)))
+            injected['carousels'] += 1
+    # Distinct senders, so every burst is reported on its own
+    for sender in np.random.choice(account_ids, min(bursts, len(account_ids)), replace=False):
+        count = random.randint(8, 15)
+        others = account_ids[account_ids != sender]
+        if len(others) >= count:
+            edges.extend(burst_edges(sender, np.random.choice(others, count, replace=False), 600))
+            injected['bursts'] += 1
+    for _ in range(layers):
+        hops = random.randint(3, 6)
+        if len(account_ids) > hops:
+            edges.extend(layer_edges(np.random.choice(account_ids, hops + 1, replace=False),
+                                     random.uniform(7 * 3600, 20 * 3600)))
+            injected['layers'] += 1
+    return edges, injected
+
+
+def background_rows(generator: TransactionGenerator, account_ids: np.ndarray, device_ids: np.ndarray,
+                    ip_ids: np.ndarray, count: int, span_seconds: float, now: datetime) -> Iterator[Tuple]:
+    """Uniformly spread P2P transfers between random account pairs."""
+    n = len(account_ids)
+    sender_idx = np.random.randint(0, n, count)
+    receiver_idx = (sender_idx + np.random.randint(1, n, count)) % n
+    amounts = generator._generate_realistic_amounts(count)
+    ages = np.random.uniform(0, span_seconds, count)
+    devices = device_ids[np.random.randint(0, len(device_ids), count)]
+    ips = ip_ids[np.random.randint(0, len(ip_ids), count)]
+    for i in range(count):
+        yield (int(account_ids[sender_idx[i]]), int(account_ids[receiver_idx[i]]), float(amounts[i]), 'RUB',
+               now - timedelta(seconds=float(ages[i])), 'P2P', 'completed', int(ips[i]), int(devices[i]),
+               'benchmark')
+
+
+def seed_database(config: Dict[str, Any], size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Load a synthetic graph of ``size`` background transfers into an empty database."""
+    started = time.perf_counter()
+    generator = TransactionGenerator(config)
+    try:
+        num_accounts = max(50, size // args.tx_per_account)
+        num_devices = min(1000, max(10, size // 100))
+        account_ids, devices, ips = generator.bulk_load_base_data(
+            (num_accounts + 1) // 2, num_devices, min(800, max(10, size // 100)), args.chunk_size)
+        account_ids = np.asarray(account_ids, dtype=np.int64)
+        device_ids = np.asarray([d['device_id'] for d in devices], dtype=np.int64)
+        ip_ids = np.asarray([ip['ip_address_id'] for ip in ips], dtype=np.int64)
+
+        span_seconds = args.span_hours * 3600
+        cursor = generator.conn.cursor()
+        generator._ensure_transaction_partitions(cursor, datetime.now() - timedelta(seconds=span_seconds))
+        # Statistics triggers are not what is being measured
+        cursor.execute("ALTER TABLE transaction DISABLE TRIGGER USER")
+        for offset in range(0, size, args.chunk_size):
+            count = min(args.chunk_size, size - offset)
+            generator._copy_rows(cursor, 'transaction', TRANSACTION_COLUMNS,
+                                 background_rows(generator, account_ids, device_ids, ip_ids, count,
+                                                 span_seconds, datetime.now()))
+            generator.conn.commit()
+            logger.info(f"Seeded {offset + count}/{size} background transfers")
+
+        # Injected last so the burst window is as fresh as possible when timing starts
+        edges, injected = injected_edges(account_ids, args.carousels, args.bursts, args.layers)
+        now = datetime.now()
+        generator._copy_rows(cursor, 'transaction', TRANSACTION_COLUMNS, (
+            (sender, receiver, amount, 'RUB', now - timedelta(seconds=age), 'P2P', 'completed',
+             int(random.choice(ip_ids)), int(random.choice(device_ids)), 'benchmark pattern')
+            for sender, receiver, amount, age in edges))
+        cursor.execute("ALTER TABLE transaction ENABLE TRIGGER USER")
+        generator.conn.commit()
+
+        generator.conn.autocommit = True
+        for table in ('client', 'account', 'device', 'ipaddress', 'transaction'):
+            cursor.execute(f"ANALYZE {table}")
+        cursor.execute("SELECT pg_database_size(current_database())")
+        database_bytes = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        generator.conn.close()
+
+    return {
+        'accounts': len(account_ids),
+        'devices': len(device_ids),
+        'ip_addresses': len(ip_ids),
+        'transactions': size + len(edges),
+        'injected': injected,
+        'seed_seconds': round(time.perf_counter() - started, 3),
+        'database_bytes': database_bytes,
+    }
+
+
+# ----------------------------------------------------------------------
+# Measurements
+# ----------------------------------------------------------------------
+
+def measure(detector: AdvancedFraudDetection, call: Callable[[], Any], repeat: int,
+            trace_memory: bool) -> Dict[str, Any]:
+    """
+    Time ``call`` ``repeat`` times, then run it once more under tracemalloc.
+
+    The detectors log and swallow their own errors, so a run that leaves the
+    connection in an aborted transaction is reported as failed.
+    """
+    seconds = []
+    result = None
+    status = 'ok'
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        seconds.append(time.perf_counter() - started)
+        if detector.conn.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+            status = 'failed'
+        detector.conn.rollback()
+        if status != 'ok':
+            break
+
+    measured = {
+        'status': status,
+        'seconds': [round(s, 4) for s in seconds],
+        'best_seconds': round(min(seconds), 4),
+        'median_seconds': round(statistics.median(seconds), 4),
+        'patterns': len(result['patterns']) if isinstance(result, dict) else len(result or []),
+    }
+    if trace_memory and status == 'ok':
+        tracemalloc.start()
+        try:
+            call()
+            measured['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            detector.conn.rollback()
+    return measured
+
+
+def explain(conn, query: str, params: Optional[Sequence]) -> Dict[str, Any]:
+    """EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) of one detector query."""
+    statement = 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + query.strip().rstrip(';')
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(statement, params)
+            plan = cursor.fetchone()[0][0]
+    except psycopg2.extensions.QueryCanceledError:
+        conn.rollback()
+        return {'status': 'timeout'}
+    except psycopg2.Error as e:
+        conn.rollback()
+        return {'status': 'failed', 'error': str(e).strip()}
+    conn.rollback()
+    return {
+        'status': 'ok',
+        'planning_ms': plan.get('Planning Time'),
+        'execution_ms': plan.get('Execution Time'),
+        'plan': plan['Plan'],
+    }
+
+
+def benchmark_database(config: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """Time every detector, then the full analysis, against one database."""
+    results = {}
+    detector = AdvancedFraudDetection(config)
+    try:
+        for name in args.detectors:
+            logger.info(f"Timing {name}")
+            results[name] = measure(detector, getattr(detector, name), args.repeat, not args.no_memory)
+        if not args.skip_comprehensive:
+            logger.info("Timing run_comprehensive_analysis")
+            results['run_comprehensive_analysis'] = measure(
+                detector, detector.run_comprehensive_analysis, args.repeat, not args.no_memory)
+            logger.info("Timing run_comprehensive_analysis(parallel=True)")
+            results['run_comprehensive_analysis_parallel'] = measure(
+                detector, lambda: detector.run_comprehensive_analysis(parallel=True),
+                args.repeat, not args.no_memory)
+    finally:
+        detector.close()
+
+    if not args.no_plans:
+        conn = psycopg2.connect(**config)
+        try:
+            for name in args.detectors:
+                query, params = DETECTOR_QUERIES[name]
+                results[name]['explain'] = explain(conn, query, params)
+        finally:
+            conn.close()
+    return results
+
+
+# ----------------------------------------------------------------------
+# Scratch databases
+# ----------------------------------------------------------------------
+
+def create_database(admin_config: Dict[str, Any], name: str) -> Dict[str, Any]:
+    admin = psycopg2.connect(**admin_config)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+            cursor.execute(f"CREATE DATABASE {name}")
+    finally:
+        admin.close()
+    config = dict(admin_config, dbname=name)
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cursor, open(SCHEMA_FILE, encoding='utf-8') as f:
+            cursor.execute(f.read())
+        conn.commit()
+    finally:
+        conn.close()
+    return config
+
+
+def drop_database(admin_config: Dict[str, Any], name: str) -> None:
+    admin = psycopg2.connect(**admin_config)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+    finally:
+        admin.close()
+
+
+def database_info(config: Dict[str, Any]) -> Dict[str, Any]:
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            version = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM transaction")
+            transactions = cursor.fetchone()[0]
+            cursor.execute("SELECT pg_database_size(current_database())")
+            database_bytes = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    return {'server_version': version, 'transactions': transactions, 'database_bytes': database_bytes}
+
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    previous = {}
+    for run in (baseline or {}).get('runs', []):
+        for name, measured in run['detectors'].items():
+            previous[(run['size'], name)] = measured.get('best_seconds')
+
+    for run in report['runs']:
+        print(f"\n=== {run['size']:,} transfers, {run.get('accounts', '?')} accounts ===")
+        header = f"{'detector':<32}{'status':>8}{'best s':>10}{'median s':>10}{'patterns':>10}{'peak MB':>10}{'plan ms':>10}"
+        if baseline:
+            header += f"{'vs base':>9}"
+        print(header)
+        for name, measured in run['detectors'].items():
+            peak = measured.get('peak_memory_bytes')
+            plan_ms = measured.get('explain', {}).get('execution_ms')
+            line = (f"{name:<32}{measured['status']:>8}{measured['best_seconds']:>10.3f}"
+                    f"{measured['median_seconds']:>10.3f}{measured['patterns']:>10}"
+                    f"{peak / 2**20 if peak is not None else float('nan'):>10.1f}"
+                    f"{plan_ms if plan_ms is not None else float('nan'):>10.1f}")
+            before = previous.get((run['size'], name))
+            if baseline:
+                line += f"{before / measured['best_seconds']:>8.2f}x" if before and measured['best_seconds'] else f"{'-':>9}"
+            print(line)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sizes', default='10k,100k',
+                        help='Comma-separated background transfer counts, e.g. 10k,100k,1M,10M')
+    parser.add_argument('--tx-per-account', type=int, default=20,
+                        help='Graph density: background transfers per account')
+    parser.add_argument('--span-hours', type=float, default=168.0,
+                        help='Background transfers are spread over this many hours')
+    parser.add_argument('--carousels', type=int, default=20, help='Carousels to inject')
+    parser.add_argument('--bursts', type=int, default=20, help='Velocity bursts to inject')
+    parser.add_argument('--layers', type=int, default=20, help='Layered chains to inject')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the synthetic graph')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per COPY chunk')
+    parser.add_argument('--detectors', default=','.join(DETECTOR_QUERIES),
+                        help='Comma-separated detector methods to time')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per detector')
+    parser.add_argument('--statement-timeout', type=int, default=600,
+                        help='Per-statement timeout in seconds (0 disables)')
+    parser.add_argument('--skip-comprehensive', action='store_true', help='Do not time run_comprehensive_analysis')
+    parser.add_argument('--no-plans', action='store_true', help='Do not capture EXPLAIN ANALYZE plans')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc run')
+    parser.add_argument('--existing', action='store_true',
+                        help='Benchmark the configured database as it is instead of seeding scratch ones')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch databases')
+    parser.add_argument('--output', default='benchmark_results.json', help='Results file')
+    parser.add_argument('--compare', help='Earlier results file to compare best times against')
+    parser.add_argument('--dsn', help='libpq connection string; overrides the --db-* options')
+    parser.add_argument('--db-host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--db-port', default=os.environ.get('DB_PORT', '5432'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'antifraud_p2p'),
+                        help='Database for --existing; otherwise used to create the scratch databases')
+    parser.add_argument('--db-user', default=os.environ.get('DB_USER', 'antifraud_user'))
+    parser.add_argument('--db-password', default=os.environ.get('DB_PASSWORD', 'antifraud_pass'))
+    args = parser.parse_args(argv)
+    args.sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+    args.detectors = [d.strip() for d in args.detectors.split(',') if d.strip()]
+    unknown = set(args.detectors) - set(DETECTOR_QUERIES)
+    if unknown:
+        parser.error(f"unknown detectors: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    if args.dsn:
+        config = dict(parse_dsn(args.dsn))
+    else:
+        config = {'host': args.db_host, 'port': args.db_port, 'dbname': args.db_name,
+                  'user': args.db_user, 'password': args.db_password}
+    if args.statement_timeout:
+        config['options'] = f"-c statement_timeout={args.statement_timeout * 1000}"
+
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': {key: value for key, value in vars(args).items()
+                     if key not in ('db_password', 'dsn', 'output', 'compare')},
+        'runs': [],
+    }
+
+    if args.existing:
+        info = database_info(config)
+        report['host']['server_version'] = info.pop('server_version')
+        run = dict(info, size=info['transactions'], database='existing')
+        run['detectors'] = benchmark_database(config, args)
+        report['runs'].append(run)
+    else:
+        for size in args.sizes:
+            name = f"antifraud_bench_{size}"
+            logger.info(f"Seeding {name}")
+            scratch = create_database(config, name)
+            try:
+                run = dict(seed_database(scratch, size, args), size=size, database=name)
+                report['host']['server_version'] = database_info(scratch)['server_version']
+                run['detectors'] = benchmark_database(scratch, args)
+            finally:
+                if not args.keep:
+                    drop_database(config, name)
+            report['runs'].append(run)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    logger.info(f"Results written to {args.output}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    return 0 if all(m['status'] == 'ok' for run in report['runs'] for m in run['detectors'].values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -104,14 +104,17 @@ CREATE TABLE IPAddress (
     reputation_score DECIMAL(5,2) DEFAULT 0.0
 );
 
--- Create enhanced Transaction table
+-- Create enhanced Transaction table, range-partitioned by day on transaction_date.
+-- Recent-window queries only scan the partitions they need and retention is a
+-- DROP TABLE. The primary key has to include the partition key, so tables that
+-- point at a transaction keep transaction_id without a foreign key.
 CREATE TABLE Transaction (
-    transaction_id SERIAL PRIMARY KEY,
+    transaction_id SERIAL,
     sender_account_id INTEGER NOT NULL,
     receiver_account_id INTEGER NOT NULL,
     amount DECIMAL(15,2) NOT NULL,
     currency CHAR(3) DEFAULT 'RUB',
-    transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    transaction_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     transaction_type VARCHAR(20) CHECK (transaction_type IN ('P2P', 'merchant', 'ATM', 'other')),
     status VARCHAR(20) CHECK (status IN ('completed', 'pending', 'failed', 'reversed', 'flagged', 'blocked')),
     ip_address_id INTEGER,
@@ -123,6 +126,9 @@ CREATE TABLE Transaction (
     fraud_score DECIMAL(5,2) DEFAULT 0.0,
     is_flagged BOOLEAN DEFAULT FALSE,
     flagged_reason TEXT,
+    -- Rule points of the last batch re-scoring (fraud_detection.py)
+    batch_score DECIMAL(7,2),
+    rescored_at TIMESTAMP,
     is_suspicious BOOLEAN DEFAULT FALSE,
     risk_factors TEXT[],
     processing_time_ms INTEGER,
@@ -131,11 +137,101 @@ CREATE TABLE Transaction (
     chargeback_risk DECIMAL(5,2) DEFAULT 0.0,
     velocity_score DECIMAL(5,2) DEFAULT 0.0,
     anomaly_score DECIMAL(5,2) DEFAULT 0.0,
+    PRIMARY KEY (transaction_id, transaction_date),
     FOREIGN KEY (sender_account_id) REFERENCES Account(account_id),
     FOREIGN KEY (receiver_account_id) REFERENCES Account(account_id),
     FOREIGN KEY (ip_address_id) REFERENCES IPAddress(ip_address_id),
     FOREIGN KEY (device_id) REFERENCES Device(device_id)
-);
+) PARTITION BY RANGE (transaction_date);
+
+-- Catches rows for days without a partition until maintenance moves them
+CREATE TABLE transaction_default PARTITION OF Transaction DEFAULT;
+
+-- Create the daily partition transaction_pYYYYMMDD for p_day if it is missing
+CREATE OR REPLACE FUNCTION create_transaction_partition(p_day DATE)
+RETURNS TEXT AS $$
+DECLARE
+    partition_name TEXT := 'transaction_p' || to_char(p_day, 'YYYYMMDD');
+    lower_bound TIMESTAMP := p_day;
+    upper_bound TIMESTAMP := p_day + 1;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM transaction_default
+               WHERE transaction_date >= lower_bound AND transaction_date < upper_bound) THEN
+        -- Rows for this day already sit in the default partition; move them
+        -- into a standalone table first, then attach it
+        EXECUTE format('CREATE TABLE %I (LIKE transaction INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM transaction_default WHERE transaction_date >= %L AND transaction_date < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            lower_bound, upper_bound, partition_name);
+        EXECUTE format('ALTER TABLE transaction ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    ELSE
+        EXECUTE format('CREATE TABLE %I PARTITION OF transaction FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create daily partitions for every day in [p_from, p_to]
+CREATE OR REPLACE FUNCTION create_transaction_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    current_day DATE := p_from;
+    created INTEGER := 0;
+BEGIN
+    WHILE current_day <= p_to LOOP
+        IF to_regclass('transaction_p' || to_char(current_day, 'YYYYMMDD')) IS NULL THEN
+            PERFORM create_transaction_partition(current_day);
+            created := created + 1;
+        END IF;
+        current_day := current_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Drop partitions older than the retention period and pre-create upcoming ones.
+-- Meant to run daily (cron, pg_cron or application start-up); runs with the
+-- owner's rights so application roles may call it.
+CREATE OR REPLACE FUNCTION maintain_transaction_partitions(
+    p_retention_days INTEGER DEFAULT 90,
+    p_premake_days INTEGER DEFAULT 7
+) RETURNS INTEGER AS $$
+DECLARE
+    cutoff DATE := CURRENT_DATE - p_retention_days;
+    first_day DATE;
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'transaction'::regclass
+        AND c.relname ~ '^transaction_p[0-9]{8}$'
+        AND to_date(substring(c.relname FROM 14), 'YYYYMMDD') < cutoff
+    LOOP
+        EXECUTE format('DROP TABLE %I', part.relname);
+    END LOOP;
+
+    DELETE FROM transaction_default WHERE transaction_date < cutoff;
+
+    IF to_regprocedure('compact_stats_counters(date)') IS NOT NULL THEN
+        PERFORM compact_stats_counters(cutoff);
+    END IF;
+
+    -- Give rows that fell into the default partition a proper home as well
+    SELECT LEAST(MIN(transaction_date)::DATE, CURRENT_DATE) INTO first_day FROM transaction_default;
+    RETURN create_transaction_partitions(COALESCE(first_day, CURRENT_DATE), CURRENT_DATE + p_premake_days);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+SELECT maintain_transaction_partitions();
 
 -- Create enhanced Rules table
 CREATE TABLE Rule (
@@ -153,7 +249,12 @@ CREATE TABLE Rule (
     last_modified_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     created_by VARCHAR(100),
     auto_block BOOLEAN DEFAULT FALSE,
-    notification_required BOOLEAN DEFAULT TRUE
+    notification_required BOOLEAN DEFAULT TRUE,
+    -- Check this row configures in the scoring engine (rule_engine.py) and the
+    -- scorer it belongs to: 'transfer' (dashboard check of a new transfer) or
+    -- 'batch' (re-scoring stored transactions); rows without a code are not scored
+    rule_code VARCHAR(50),
+    rule_set VARCHAR(20) DEFAULT 'batch' CHECK (rule_set IN ('transfer', 'batch'))
 );
 
 -- Create enhanced Blacklists table
@@ -206,6 +307,7 @@ CREATE TABLE TransactionPattern (
     is_active BOOLEAN DEFAULT TRUE,
     detected_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     description TEXT,
+    pattern_key VARCHAR(64),
     FOREIGN KEY (client_id) REFERENCES Client(client_id)
 );
 
@@ -227,9 +329,9 @@ CREATE TABLE Alert (
     resolution_notes TEXT,
     risk_score DECIMAL(5,2),
     auto_generated BOOLEAN DEFAULT TRUE,
+    pattern_key VARCHAR(64),
     FOREIGN KEY (client_id) REFERENCES Client(client_id),
     FOREIGN KEY (account_id) REFERENCES Account(account_id),
-    FOREIGN KEY (transaction_id) REFERENCES Transaction(transaction_id),
     FOREIGN KEY (rule_id) REFERENCES Rule(rule_id)
 );
 
@@ -282,14 +384,41 @@ CREATE TABLE RiskScoreHistory (
     rule_ids INTEGER[],
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (client_id) REFERENCES Client(client_id),
-    FOREIGN KEY (account_id) REFERENCES Account(account_id),
-    FOREIGN KEY (transaction_id) REFERENCES Transaction(transaction_id)
+    FOREIGN KEY (account_id) REFERENCES Account(account_id)
+);
+
+-- Progress of the incremental pattern detectors: the next run only searches
+-- around transactions above the mark (see pattern_store.py)
+CREATE TABLE DetectorState (
+    detector VARCHAR(50) PRIMARY KEY,
+    last_transaction_id INTEGER NOT NULL DEFAULT 0,
+    last_transaction_date TIMESTAMP,
+    last_run TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Connected clusters of the transfer graph and the cluster of every account,
+-- maintained by ClusterIndex (see security_dashboard/cluster_index.py); the
+-- cluster id is the id of one of its accounts
+CREATE TABLE NetworkCluster (
+    cluster_id INTEGER PRIMARY KEY,
+    cluster_size INTEGER NOT NULL,
+    edge_count INTEGER NOT NULL,
+    density DECIMAL(6,5),
+    risk_score DECIMAL(5,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE AccountCluster (
+    account_id INTEGER PRIMARY KEY,
+    cluster_id INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (account_id) REFERENCES Account(account_id)
 );
 
 -- Enhanced indexes for better query performance
-CREATE INDEX idx_transaction_date ON Transaction(transaction_date);
-CREATE INDEX idx_transaction_sender ON Transaction(sender_account_id);
-CREATE INDEX idx_transaction_receiver ON Transaction(receiver_account_id);
+CREATE INDEX idx_transaction_date ON Transaction(transaction_date DESC, transaction_id DESC);
+CREATE INDEX idx_transaction_sender ON Transaction(sender_account_id, transaction_date DESC, transaction_id DESC);
+CREATE INDEX idx_transaction_receiver ON Transaction(receiver_account_id, transaction_date DESC, transaction_id DESC);
 CREATE INDEX idx_transaction_amount ON Transaction(amount);
 CREATE INDEX idx_transaction_fraud_score ON Transaction(fraud_score);
 CREATE INDEX idx_transaction_flagged ON Transaction(is_flagged);
@@ -305,6 +434,7 @@ CREATE INDEX idx_ip_risk_score ON IPAddress(risk_score);
 CREATE INDEX idx_client_relationship_1 ON ClientRelationship(client_id_1);
 CREATE INDEX idx_client_relationship_2 ON ClientRelationship(client_id_2);
 CREATE INDEX idx_alert_client ON Alert(client_id);
+CREATE INDEX idx_alert_transaction ON Alert(transaction_id);
 CREATE INDEX idx_alert_status ON Alert(status);
 CREATE INDEX idx_alert_date ON Alert(alert_date);
 CREATE INDEX idx_session_client ON Session(client_id);
@@ -312,12 +442,28 @@ CREATE INDEX idx_session_date ON Session(session_start);
 CREATE INDEX idx_velocity_client_metric ON VelocityCounter(client_id, metric_type, time_window);
 CREATE INDEX idx_pattern_client ON TransactionPattern(client_id);
 CREATE INDEX idx_pattern_active ON TransactionPattern(is_active);
+-- One active pattern per ring / chain / bursting sender; later runs merge into it
+CREATE UNIQUE INDEX idx_pattern_active_key ON TransactionPattern(pattern_key) WHERE is_active;
+CREATE INDEX idx_account_cluster ON AccountCluster(cluster_id);
+CREATE INDEX idx_risk_history_transaction ON RiskScoreHistory(transaction_id);
 
 -- Create composite indexes for complex queries
 CREATE INDEX idx_transaction_composite ON Transaction(sender_account_id, transaction_date, amount);
 CREATE INDEX idx_client_risk_composite ON Client(risk_level, is_blocked, account_status);
 CREATE INDEX idx_alert_severity_status ON Alert(severity, status, alert_date);
 
+-- At most one unresolved alert per detected pattern, so repeated detector
+-- runs do not re-alert on what is already being handled
+CREATE UNIQUE INDEX idx_alert_open_pattern ON Alert(pattern_key)
+    WHERE status IN ('open', 'investigating');
+
+-- Keyset pagination of the dashboard transaction lists: every list ordering
+-- and filter combination is a range scan starting right after the cursor
+-- (date/sender/receiver orderings are covered by the indexes above)
+CREATE INDEX idx_transaction_status_keyset ON Transaction(status, transaction_date DESC, transaction_id DESC);
+CREATE INDEX idx_transaction_flagged_keyset ON Transaction(COALESCE(fraud_score, 0) DESC, transaction_date DESC, transaction_id DESC)
+    WHERE is_flagged;
+
 -- Create functions for automatic calculations
 CREATE OR REPLACE FUNCTION update_client_stats()
 RETURNS TRIGGER AS $$
@@ -368,6 +514,170 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Dashboard counters kept up to date by triggers, so /api/stats never scans
+-- Transaction or Client. Each backend writes its own slot row to avoid a hot
+-- row under concurrent inserts. Per-day metrics are bucketed by transaction
+-- date (dropping a partition drops its buckets); client metrics use the
+-- DATE 'epoch' bucket.
+CREATE TABLE StatsCounter (
+    metric VARCHAR(50) NOT NULL,
+    bucket_date DATE NOT NULL,
+    slot SMALLINT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, bucket_date, slot)
+);
+
+CREATE OR REPLACE FUNCTION bump_stats_counter(p_metric VARCHAR, p_bucket DATE, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO StatsCounter (metric, bucket_date, slot, value, updated_at)
+    VALUES (p_metric, p_bucket, pg_backend_pid() % 16, p_delta, LOCALTIMESTAMP)
+    ON CONFLICT (metric, bucket_date, slot)
+    DO UPDATE SET value = StatsCounter.value + EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION track_transaction_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_stats_counter('transactions', NEW.transaction_date::DATE, 1);
+        IF NEW.is_flagged THEN
+            PERFORM bump_stats_counter('flagged_transactions', NEW.transaction_date::DATE, 1);
+        END IF;
+    ELSIF COALESCE(OLD.is_flagged, FALSE) <> COALESCE(NEW.is_flagged, FALSE) THEN
+        PERFORM bump_stats_counter('flagged_transactions', NEW.transaction_date::DATE,
+                                   CASE WHEN NEW.is_flagged THEN 1 ELSE -1 END);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_track_transaction_stats
+    AFTER INSERT OR UPDATE OF is_flagged ON Transaction
+    FOR EACH ROW
+    EXECUTE FUNCTION track_transaction_stats();
+
+CREATE OR REPLACE FUNCTION track_client_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_high_risk INTEGER := 0;
+    new_high_risk INTEGER := 0;
+    old_blocked INTEGER := 0;
+    new_blocked INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_high_risk := (COALESCE(OLD.risk_level, 0) > 0.5)::INTEGER;
+        old_blocked := COALESCE(OLD.is_blocked, FALSE)::INTEGER;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_high_risk := (COALESCE(NEW.risk_level, 0) > 0.5)::INTEGER;
+        new_blocked := COALESCE(NEW.is_blocked, FALSE)::INTEGER;
+    END IF;
+    PERFORM bump_stats_counter('high_risk_clients', DATE 'epoch', new_high_risk - old_high_risk);
+    PERFORM bump_stats_counter('blocked_clients', DATE 'epoch', new_blocked - old_blocked);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_track_client_stats
+    AFTER INSERT OR UPDATE OF risk_level, is_blocked OR DELETE ON Client
+    FOR EACH ROW
+    EXECUTE FUNCTION track_client_stats();
+
+-- Forget day buckets before p_cutoff and fold the slots of past days into
+-- slot 0; called by maintain_transaction_partitions()
+CREATE OR REPLACE FUNCTION compact_stats_counters(p_cutoff DATE)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM StatsCounter WHERE bucket_date > DATE 'epoch' AND bucket_date < p_cutoff;
+
+    WITH folded AS (
+        DELETE FROM StatsCounter
+        WHERE bucket_date > DATE 'epoch' AND bucket_date < CURRENT_DATE AND slot <> 0
+        RETURNING metric, bucket_date, value
+    )
+    INSERT INTO StatsCounter (metric, bucket_date, slot, value)
+    SELECT metric, bucket_date, 0, SUM(value) FROM folded GROUP BY metric, bucket_date
+    ON CONFLICT (metric, bucket_date, slot)
+    DO UPDATE SET value = StatsCounter.value + EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recount everything from the base tables (after bulk loads with triggers
+-- disabled, or to reconcile)
+CREATE OR REPLACE FUNCTION refresh_stats_counters()
+RETURNS VOID AS $$
+BEGIN
+    -- Writers block on their counter update until the recount commits, so
+    -- nothing is counted twice or lost
+    LOCK TABLE StatsCounter IN EXCLUSIVE MODE;
+    DELETE FROM StatsCounter;
+    INSERT INTO StatsCounter (metric, bucket_date, slot, value)
+    SELECT 'transactions', transaction_date::DATE, 0, COUNT(*) FROM Transaction GROUP BY 2
+    UNION ALL
+    SELECT 'flagged_transactions', transaction_date::DATE, 0, COUNT(*) FROM Transaction WHERE is_flagged GROUP BY 2
+    UNION ALL
+    SELECT 'high_risk_clients', DATE 'epoch', 0, COUNT(*) FROM Client WHERE risk_level > 0.5
+    UNION ALL
+    SELECT 'blocked_clients', DATE 'epoch', 0, COUNT(*) FROM Client WHERE is_blocked;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One-row dashboard summary; as_of is the time the counters were read
+CREATE OR REPLACE VIEW v_dashboard_stats AS
+SELECT
+    COALESCE(SUM(value) FILTER (WHERE metric = 'transactions'), 0)::BIGINT AS total_transactions,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'transactions' AND bucket_date = CURRENT_DATE), 0)::BIGINT AS today_transactions,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'flagged_transactions'), 0)::BIGINT AS flagged_transactions,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'high_risk_clients'), 0)::BIGINT AS high_risk_clients,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'blocked_clients'), 0)::BIGINT AS blocked_clients,
+    MAX(updated_at) AS last_change,
+    LOCALTIMESTAMP AS as_of
+FROM StatsCounter;
+
+-- Dashboard push channel: small NOTIFY payloads on 'dashboard_events' for
+-- new transactions, status/flag changes and alerts. Listeners read the rows
+-- themselves; notifications are delivered on commit and dropped on rollback.
+CREATE OR REPLACE FUNCTION notify_transaction_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_events', json_build_object(
+        'table', 'transaction',
+        'op', lower(TG_OP),
+        'id', NEW.transaction_id,
+        'date', to_char(NEW.transaction_date, 'YYYY-MM-DD"T"HH24:MI:SS.US')
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_notify_transaction
+    AFTER INSERT OR UPDATE OF status, is_flagged, fraud_score ON Transaction
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_transaction_event();
+
+CREATE OR REPLACE FUNCTION notify_alert_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_events', json_build_object(
+        'table', 'alert',
+        'op', lower(TG_OP),
+        'id', NEW.alert_id
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_notify_alert
+    AFTER INSERT OR UPDATE OF status ON Alert
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_alert_event();
+
 -- Enhanced sample data for testing
 INSERT INTO Client (first_name, last_name, date_of_birth, phone_number, email, kyc_status, risk_level, risk_category) VALUES
 ('Ivan', 'Petrov', '1990-05-15', '+79991234567', 'ivan.petrov@email.com', 'verified', 0.1, 'low'),
@@ -408,17 +718,27 @@ INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, transac
 (2, 5, 25000.00, 'P2P', 'completed', 2, 2, 0.2, FALSE, NULL);
 
 -- Enhanced rules with categories and priorities
-INSERT INTO Rule (rule_name, rule_description, rule_category, rule_condition, weight, threshold, time_window, priority, auto_block) VALUES
-('HighAmount', 'Transaction amount exceeds daily limit', 'amount', 'amount > daily_limit', 5.0, 100000.0, NULL, 1, FALSE),
-('NewDevice', 'Transaction from a newly registered device', 'device', 'device_age_hours < 24', 3.0, NULL, '24h', 2, FALSE),
-('HighRiskIP', 'Transaction from a high-risk IP address', 'network', 'ip_risk_score > 0.8', 4.0, 0.8, NULL, 1, TRUE),
-('VelocityBurst', 'Multiple transactions in short time period', 'velocity', 'transaction_count > 10', 3.0, 10, '1hour', 2, FALSE),
-('UnusualAmount', 'Transaction deviates from user average', 'behavior', 'amount > avg_amount * 5', 2.5, NULL, NULL, 3, FALSE),
-('ProxyDetected', 'Transaction from proxy/VPN', 'network', 'is_proxy = TRUE', 4.5, NULL, NULL, 1, TRUE),
-('TorDetected', 'Transaction from Tor network', 'network', 'is_tor = TRUE', 5.0, NULL, NULL, 1, TRUE),
-('CarouselPattern', 'Circular transaction pattern detected', 'network', 'carousel_pattern = TRUE', 4.0, NULL, NULL, 2, FALSE),
-('FailedLogins', 'Multiple failed login attempts', 'behavior', 'failed_attempts > 5', 3.5, 5, '1hour', 2, FALSE),
-('CrossBorder', 'Transaction from unusual location', 'location', 'country != usual_country', 2.0, NULL, NULL, 3, FALSE);
+INSERT INTO Rule (rule_name, rule_description, rule_category, rule_condition, weight, threshold, time_window, priority, auto_block, rule_code, rule_set) VALUES
+('HighAmount', 'Transaction amount exceeds daily limit', 'amount', 'amount > daily_limit', 5.0, 10000.0, NULL, 1, FALSE, 'HIGH_AMOUNT', 'batch'),
+('NewDevice', 'Transaction from a newly registered device', 'device', 'device_age_hours < 24', 3.0, NULL, '24h', 2, FALSE, NULL, 'batch'),
+('HighRiskIP', 'Transaction from a high-risk IP address', 'network', 'ip_risk_score > 0.8', 4.0, 0.8, NULL, 1, TRUE, 'HIGH_RISK_IP', 'batch'),
+('VelocityBurst', 'Multiple transactions in short time period', 'velocity', 'transaction_count > 10', 3.0, 10, '1hour', 2, FALSE, NULL, 'batch'),
+('UnusualAmount', 'Transaction deviates from user average', 'behavior', 'amount > avg_amount * 5', 2.5, NULL, NULL, 3, FALSE, NULL, 'batch'),
+('ProxyDetected', 'Transaction from proxy/VPN', 'network', 'is_proxy = TRUE', 4.5, NULL, NULL, 1, TRUE, NULL, 'batch'),
+('TorDetected', 'Transaction from Tor network', 'network', 'is_tor = TRUE', 5.0, NULL, NULL, 1, TRUE, NULL, 'batch'),
+('CarouselPattern', 'Circular transaction pattern detected', 'network', 'carousel_pattern = TRUE', 4.0, NULL, NULL, 2, FALSE, NULL, 'batch'),
+('FailedLogins', 'Multiple failed login attempts', 'behavior', 'failed_attempts > 5', 3.5, 5, '1hour', 2, FALSE, NULL, 'batch'),
+('CrossBorder', 'Transaction from unusual location', 'location', 'country != usual_country', 2.0, NULL, NULL, 3, FALSE, NULL, 'batch'),
+('HighRiskDevice', 'Transaction from a high-risk device', 'device', 'device_risk_score > 0.8', 3.0, 0.8, NULL, 2, FALSE, 'HIGH_RISK_DEVICE', 'batch'),
+-- Dashboard check of a new transfer (score capped at 1.0)
+('TransferHighAmount', 'Transfer above 100,000', 'amount', 'amount > threshold', 0.30, 100000.0, NULL, 1, FALSE, 'HIGH_AMOUNT', 'transfer'),
+('TransferMediumAmount', 'Transfer above 50,000 up to 100,000', 'amount', 'amount > threshold', 0.15, 50000.0, NULL, 1, FALSE, 'MEDIUM_AMOUNT', 'transfer'),
+('TransferRiskySender', 'Sender client risk level above threshold', 'behavior', 'sender_risk > threshold', 0.40, 0.5, NULL, 2, FALSE, 'HIGH_RISK_SENDER', 'transfer'),
+('TransferRiskyReceiver', 'Receiver client risk level above threshold', 'behavior', 'receiver_risk > threshold', 0.30, 0.5, NULL, 3, FALSE, 'HIGH_RISK_RECEIVER', 'transfer'),
+('TransferBlockedReceiver', 'Receiver client is blocked', 'behavior', 'receiver_blocked = TRUE', 0.50, NULL, NULL, 4, FALSE, 'BLOCKED_RECEIVER', 'transfer'),
+('TransferRoundAmount', 'Amount is a multiple of 10,000', 'amount', 'amount % threshold = 0', 0.10, 10000.0, NULL, 5, FALSE, 'ROUND_AMOUNT', 'transfer'),
+('TransferVelocity', 'Sender made many transfers within the window', 'velocity', 'transaction_count >= threshold', 0.25, 5, '1hour', 6, FALSE, 'HIGH_VELOCITY', 'transfer'),
+('TransferNightTime', 'Transfer made between 00:00 and 06:00', 'behavior', 'hour in time_window', 0.15, NULL, '00:00-06:00', 7, FALSE, 'NIGHT_TRANSACTION', 'transfer');
 
 -- Sample alerts
 INSERT INTO Alert (alert_type, severity, client_id, account_id, transaction_id, rule_id, title, description, risk_score) VALUES
@@ -8,8 +8,52 @@ to detect suspicious transactions.
 
 import psycopg2
 from psycopg2 import sql
+import psycopg2.extras
 import datetime
-from typing import List, Dict, Any
+import time
+import numpy as np
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from security_dashboard.rule_engine import RuleEngine, number
+
+# The dashboard schema (init_db.sql) keeps no risk score for devices
+DEVICE_RISK_QUERY = """
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'device' AND column_name = 'risk_score'
+    )
+"""
+
+# Stores the batch score of every scored row (execute_values) and flags or
+# unflags the rows the batch owns, those whose flagged_reason it wrote. Flags
+# with any other reason were set by an analyst or the dashboard and are left
+# alone. The self-join reads each row as it was before the update, so
+# RETURNING can report what changed.
+BATCH_SCORE_UPDATE = """
+    UPDATE Transaction AS t
+    SET batch_score = v.score,
+        rescored_at = CURRENT_TIMESTAMP,
+        is_flagged = CASE
+            WHEN v.flagged THEN TRUE
+            WHEN t.flagged_reason LIKE 'High fraud score: %%' THEN FALSE
+            ELSE t.is_flagged
+        END,
+        flagged_reason = CASE
+            WHEN t.is_flagged AND t.flagged_reason NOT LIKE 'High fraud score: %%' THEN t.flagged_reason
+            WHEN v.flagged THEN 'High fraud score: ' || v.score
+            WHEN t.flagged_reason LIKE 'High fraud score: %%' THEN NULL
+            ELSE t.flagged_reason
+        END
+    FROM (VALUES %s) AS v(transaction_id, score, flagged),
+         Transaction AS old
+    WHERE t.transaction_id = v.transaction_id
+    AND old.transaction_id = t.transaction_id
+    AND old.transaction_date = t.transaction_date
+    RETURNING old.is_flagged IS TRUE, t.is_flagged
+"""
+
 
 class FraudDetectionSystem:
     def __init__(self, db_config: Dict[str, str]):
@@ -21,6 +65,9 @@ class FraudDetectionSystem:
         """
         self.db_config = db_config
         self.connection = None
+        # 'batch' rules of the Rule table, shared by both scorers below
+        self.rules = RuleEngine('batch')
+        self._device_risk = None
     
     def connect(self):
         """Establish connection to the database."""
@@ -51,35 +98,45 @@ class FraudDetectionSystem:
             return []
         
         try:
-            cursor = self.connection.cursor()
-            query = """
-                SELECT t.transaction_id, t.amount, t.transaction_date, 
-                       s.account_number as sender_account,
-                       r.account_number as receiver_account
-                FROM Transaction t
-                JOIN Account s ON t.sender_account_id = s.account_id
-                JOIN Account r ON t.receiver_account_id = r.account_id
-                WHERE t.amount > %s
-                ORDER BY t.amount DESC
-            """
-            cursor.execute(query, (threshold,))
-            results = cursor.fetchall()
-            
-            transactions = []
-            for row in results:
-                transactions.append({
-                    'transaction_id': row[0],
-                    'amount': float(row[1]),
-                    'transaction_date': row[2],
-                    'sender_account': row[3],
-                    'receiver_account': row[4]
-                })
-            
-            return transactions
+            return list(self.iter_high_amount_transactions(threshold))
         except Exception as e:
             print(f"Error detecting high amount transactions: {e}")
             return []
     
+    def iter_high_amount_transactions(self, threshold: float = 10000.0,
+                                      itersize: int = 10000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream transactions with amounts exceeding the threshold.
+        
+        Rows come from a server-side cursor ``itersize`` at a time, so memory
+        stays flat however many transactions match. Errors propagate.
+        
+        Args:
+            threshold: Amount threshold for flagging transactions
+            itersize: Rows fetched per round-trip
+        """
+        query = """
+            SELECT t.transaction_id, t.amount, t.transaction_date, 
+                   s.account_number as sender_account,
+                   r.account_number as receiver_account
+            FROM Transaction t
+            JOIN Account s ON t.sender_account_id = s.account_id
+            JOIN Account r ON t.receiver_account_id = r.account_id
+            WHERE t.amount > %s
+            ORDER BY t.amount DESC
+        """
+        with self.connection.cursor(name='high_amount_transactions') as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, (threshold,))
+            for transaction_id, amount, transaction_date, sender_account, receiver_account in cursor:
+                yield {
+                    'transaction_id': transaction_id,
+                    'amount': float(amount),
+                    'transaction_date': transaction_date,
+                    'sender_account': sender_account,
+                    'receiver_account': receiver_account
+                }
+    
     def detect_new_devices(self, hours: int = 24) -> List[Dict[str, Any]]:
         """
         Detect transactions made with newly registered devices.
@@ -95,33 +152,41 @@ class FraudDetectionSystem:
             return []
         
         try:
-            cursor = self.connection.cursor()
-            query = """
-                SELECT t.transaction_id, t.transaction_date, d.device_fingerprint,
-                       s.account_number as sender_account
-                FROM Transaction t
-                JOIN Device d ON t.device_id = d.device_id
-                JOIN Account s ON t.sender_account_id = s.account_id
-                WHERE d.first_seen_date >= NOW() - INTERVAL '%s hours'
-                ORDER BY t.transaction_date DESC
-            """
-            cursor.execute(query, (hours,))
-            results = cursor.fetchall()
-            
-            transactions = []
-            for row in results:
-                transactions.append({
-                    'transaction_id': row[0],
-                    'transaction_date': row[1],
-                    'device_fingerprint': row[2],
-                    'sender_account': row[3]
-                })
-            
-            return transactions
+            return list(self.iter_new_devices(hours))
         except Exception as e:
             print(f"Error detecting transactions with new devices: {e}")
             return []
     
+    def iter_new_devices(self, hours: int = 24, itersize: int = 10000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream transactions made with newly registered devices.
+        
+        Same server-side cursor streaming as iter_high_amount_transactions.
+        
+        Args:
+            hours: Time window in hours to consider a device as "new"
+            itersize: Rows fetched per round-trip
+        """
+        query = """
+            SELECT t.transaction_id, t.transaction_date, d.device_fingerprint,
+                   s.account_number as sender_account
+            FROM Transaction t
+            JOIN Device d ON t.device_id = d.device_id
+            JOIN Account s ON t.sender_account_id = s.account_id
+            WHERE d.first_seen_date >= NOW() - INTERVAL '%s hours'
+            ORDER BY t.transaction_date DESC
+        """
+        with self.connection.cursor(name='new_device_transactions') as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, (hours,))
+            for transaction_id, transaction_date, device_fingerprint, sender_account in cursor:
+                yield {
+                    'transaction_id': transaction_id,
+                    'transaction_date': transaction_date,
+                    'device_fingerprint': device_fingerprint,
+                    'sender_account': sender_account
+                }
+    
     def detect_frequent_transactions(self, account_id: int, minutes: int = 60) -> int:
         """
         Count transactions for an account within a time window.
@@ -153,6 +218,14 @@ class FraudDetectionSystem:
             print(f"Error counting frequent transactions: {e}")
             return 0
     
+    def _device_risk_column(self) -> str:
+        """Select expression of a transaction's device risk (NULL if the schema has none)."""
+        if self._device_risk is None:
+            with self.connection.cursor() as cursor:
+                cursor.execute(DEVICE_RISK_QUERY)
+                self._device_risk = 'd.risk_score' if cursor.fetchone()[0] else 'NULL::numeric'
+        return self._device_risk
+    
     def calculate_fraud_score(self, transaction_id: int) -> float:
         """
         Calculate fraud score for a transaction based on rules.
@@ -172,12 +245,12 @@ class FraudDetectionSystem:
             
             # Get transaction details
             query = """
-                SELECT t.amount, d.risk_score, i.risk_score
+                SELECT t.amount, {device_risk}, i.risk_score
                 FROM Transaction t
                 LEFT JOIN Device d ON t.device_id = d.device_id
                 LEFT JOIN IPAddress i ON t.ip_address_id = i.ip_address_id
                 WHERE t.transaction_id = %s
-            """
+            """.format(device_risk=self._device_risk_column())
             cursor.execute(query, (transaction_id,))
             result = cursor.fetchone()
             
@@ -187,26 +260,158 @@ class FraudDetectionSystem:
             
             amount, device_risk, ip_risk = result
             
-            # Simple scoring algorithm
-            score = 0.0
-            
-            # High amount rule
-            if amount and amount > 10000:
-                score += 5.0
-            
-            # High-risk device rule
-            if device_risk and device_risk > 0.8:
-                score += 3.0
-            
-            # High-risk IP rule
-            if ip_risk and ip_risk > 0.8:
-                score += 4.0
+            self.rules.ensure_ready(self.connection)
+            score, _, _, _ = self.rules.plan.evaluate({
+                'amount': number(amount),
+                'device_risk': number(device_risk),
+                'ip_risk': number(ip_risk)
+            })
             
             return score
         except Exception as e:
             print(f"Error calculating fraud score: {e}")
             return 0.0
     
+    def score_arrays(self, amounts: np.ndarray, device_risks: np.ndarray,
+                     ip_risks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized equivalent of calculate_fraud_score.
+        
+        Args:
+            amounts: Transaction amounts (NaN for NULL)
+            device_risks: Device risk scores (NaN for missing device)
+            ip_risks: IP risk scores (NaN for missing IP)
+            
+        Returns:
+            Array of fraud scores and mask of rows hit by an auto-block rule
+        """
+        scores, _, blocked = self.rules.plan.evaluate_arrays(
+            {'amount': amounts, 'device_risk': device_risks, 'ip_risk': ip_risks},
+            len(amounts)
+        )
+        return scores, blocked
+    
+    def _iter_scoring_chunks(self, transaction_ids: Optional[Iterable[int]],
+                             start_date: Optional[datetime.datetime],
+                             end_date: Optional[datetime.datetime],
+                             chunk_size: int) -> Iterator[List[Tuple]]:
+        """Yield (transaction_id, amount, device_risk, ip_risk) rows in chunks."""
+        select = """
+            SELECT t.transaction_id, t.amount, {device_risk}, i.risk_score
+            FROM Transaction t
+            LEFT JOIN Device d ON t.device_id = d.device_id
+            LEFT JOIN IPAddress i ON t.ip_address_id = i.ip_address_id
+        """.format(device_risk=self._device_risk_column())
+        if transaction_ids is not None:
+            ids = iter(transaction_ids)
+            with self.connection.cursor() as cursor:
+                while True:
+                    batch = list(islice(ids, chunk_size))
+                    if not batch:
+                        break
+                    cursor.execute(select + " WHERE t.transaction_id = ANY(%s)", (batch,))
+                    yield cursor.fetchall()
+            return
+        
+        conditions = []
+        params = []
+        if start_date is not None:
+            conditions.append("t.transaction_date >= %s")
+            params.append(start_date)
+        if end_date is not None:
+            conditions.append("t.transaction_date < %s")
+            params.append(end_date)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        
+        # Server-side cursor: rows are streamed from PostgreSQL in chunks
+        with self.connection.cursor(name='fraud_score_batch') as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(select + where, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+    
+    def calculate_fraud_scores_batch(self, transaction_ids: Optional[Iterable[int]] = None,
+                                     start_date: Optional[datetime.datetime] = None,
+                                     end_date: Optional[datetime.datetime] = None,
+                                     chunk_size: int = 50000,
+                                     write_back: bool = True,
+                                     flag_threshold: float = 5.0) -> Dict[str, Any]:
+        """
+        Re-score many transactions at once.
+        
+        Either an iterable of transaction ids or a date range selects the
+        transactions. Rows are pulled in chunks, scored with NumPy and, when
+        write_back is set, one UPDATE per chunk through a separate
+        connection (so the read cursor stays open) stores each row's score in
+        batch_score and rescored_at. Rows that score high are flagged; a flag
+        the batch set earlier is cleared once the row no longer scores high.
+        Flags set by analysts or the dashboard are kept. fraud_score is left
+        alone.
+        
+        Args:
+            transaction_ids: IDs of the transactions to score
+            start_date: Inclusive lower bound on transaction_date
+            end_date: Exclusive upper bound on transaction_date
+            chunk_size: Rows per fetch and per bulk update
+            write_back: Store the scores and flag the transactions that
+                score high
+            flag_threshold: Scores above this flag the transaction
+            
+        Returns:
+            Summary with the number of scored and flagged rows, of rows
+            newly flagged in the database and of batch flags cleared
+        """
+        summary = {'scored': 0, 'flagged': 0, 'updated': 0, 'cleared': 0, 'elapsed_seconds': 0.0}
+        if not self.connection:
+            print("Not connected to database")
+            return summary
+        
+        started = time.perf_counter()
+        writer = None
+        try:
+            self.rules.ensure_ready(self.connection, force=True)
+            if write_back:
+                writer = psycopg2.connect(**self.db_config)
+            
+            for rows in self._iter_scoring_chunks(transaction_ids, start_date, end_date, chunk_size):
+                data = np.array(
+                    [(amount, device_risk, ip_risk) for _, amount, device_risk, ip_risk in rows],
+                    dtype=float
+                ).reshape(-1, 3)
+                ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                scores, blocked = self.score_arrays(data[:, 0], data[:, 1], data[:, 2])
+                flagged = (scores > flag_threshold) | blocked
+                
+                summary['scored'] += len(rows)
+                summary['flagged'] += int(flagged.sum())
+                
+                if writer is not None:
+                    updates = list(zip(ids.tolist(), np.round(scores, 2).tolist(), flagged.tolist()))
+                    with writer.cursor() as cursor:
+                        changes = psycopg2.extras.execute_values(
+                            cursor, BATCH_SCORE_UPDATE, updates,
+                            template="(%s, %s::numeric, %s)", page_size=chunk_size, fetch=True
+                        )
+                    writer.commit()
+                    summary['updated'] += sum(1 for was, now in changes if now and not was)
+                    summary['cleared'] += sum(1 for was, now in changes if was and not now)
+            
+            self.connection.rollback()
+        except Exception as e:
+            print(f"Error calculating fraud scores in batch: {e}")
+            self.connection.rollback()
+            if writer is not None:
+                writer.rollback()
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        return summary
+    
     def flag_suspicious_transaction(self, transaction_id: int, reason: str):
         """
         Flag a transaction as suspicious in the database.
@@ -273,6 +478,14 @@ def main():
         if score > 5.0:
             fds.flag_suspicious_transaction(1, f"High fraud score: {score}")
         
+        # Example 4: Re-score the last day of traffic in bulk
+        print("\n=== Batch Re-scoring ===")
+        summary = fds.calculate_fraud_scores_batch(
+            start_date=datetime.datetime.now() - datetime.timedelta(days=1)
+        )
+        print(f"Scored {summary['scored']} transactions, flagged {summary['flagged']}, "
+              f"updated {summary['updated']} in {summary['elapsed_seconds']}s")
+        
     except Exception as e:
         print(f"Error in main execution: {e}")
     finally:
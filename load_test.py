@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness for the create-transaction path.
+
+Builds a stream of transfers between the accounts of a local database with
+TransactionGenerator's amount model, mixing in its fraudulent patterns
+(carousels and velocity bursts), and fires it from concurrent workers at
+either
+
+- ``http``: a running dashboard (``POST /api/create-transaction``), or
+- ``score``: the dashboard's fraud check called in-process (``check_fraud``
+  with the same velocity store and compiled rules), without HTTP or writes.
+
+The report gives throughput, p50/p95/p99 latency and the completed / review /
+blocked / rejected / error split. ``--max-p99`` and ``--max-error-rate`` make
+the run exit non-zero when a limit is exceeded, so it can gate a deploy.
+
+Example:
+    python load_test.py --mode http --url http://localhost:5000 \\
+        --concurrency 16 --requests 5000 --fraud-ratio 0.05
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from transaction_generator import TransactionGenerator
+
+ACCOUNTS_QUERY = """
+    SELECT a.account_id, a.balance, a.is_active,
+           c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
+    FROM Account a
+    JOIN Client c ON a.client_id = c.client_id
+    WHERE a.is_active
+    ORDER BY a.account_id
+"""
+
+# Placeholders for generate_fraudulent_transactions; device and IP ids are
+# not part of a transfer request
+NO_DEVICES = [{'device_id': None}]
+NO_IPS = [{'ip_address_id': None, 'threat_level': 'low'}]
+
+
+def build_transfers(generator: TransactionGenerator, accounts: List[Dict], count: int,
+                    fraud_ratio: float) -> List[Dict[str, Any]]:
+    """
+    Build ``count`` transfer requests.
+
+    Normal transfers go between two random accounts with an amount from
+    TransactionGenerator._generate_realistic_amount. About ``fraud_ratio``
+    of the stream comes from generate_fraudulent_transactions, kept in
+    order so that a burst or carousel reaches the server back to back.
+    """
+    transfers = []
+    while len(transfers) < count:
+        if random.random() < fraud_ratio:
+            pattern = generator.generate_fraudulent_transactions(accounts, NO_DEVICES, NO_IPS)
+            for tx in pattern[:count - len(transfers)]:
+                transfers.append({
+                    'sender_account_id': tx['sender_account_id'],
+                    'receiver_account_id': tx['receiver_account_id'],
+                    'amount': round(tx['amount'], 2),
+                    'description': 'load-test: ' + tx['description'],
+                    'kind': 'fraud'
+                })
+            continue
+        sender, receiver = random.sample(accounts, 2)
+        transfers.append({
+            'sender_account_id': sender['account_id'],
+            'receiver_account_id': receiver['account_id'],
+            'amount': generator._generate_realistic_amount(),
+            'description': 'load-test',
+            'kind': 'normal'
+        })
+    return transfers
+
+
+class HttpTarget:
+    """Posts transfers to a running dashboard over one keep-alive connection per worker."""
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.https = parsed.scheme == 'https'
+        self.path = (parsed.path.rstrip('/') or '') + '/api/create-transaction'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def __call__(self, transfer: Dict[str, Any]) -> str:
+        body = json.dumps({key: transfer[key] for key in
+                           ('sender_account_id', 'receiver_account_id', 'amount', 'description')})
+        conn = self._connection()
+        try:
+            conn.request('POST', self.path, body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            return 'error'
+        if response.status >= 500:
+            return 'error'
+        if response.status == 403:
+            # Sender client is blocked
+            return 'blocked'
+        if response.status >= 400:
+            return 'rejected'
+        return json.loads(payload).get('status', 'error')
+
+
+class ScoreTarget:
+    """Runs the dashboard's fraud check in-process for each transfer."""
+
+    def __init__(self, db_config: Dict[str, Any], accounts: List[Dict]):
+        # The dashboard reads its database settings from the environment
+        os.environ.update({
+            'DB_HOST': str(db_config['host']),
+            'DB_NAME': str(db_config['database']),
+            'DB_USER': str(db_config['user']),
+            'DB_PASSWORD': str(db_config['password']),
+            'DB_PORT': str(db_config['port']),
+        })
+        from security_dashboard import app as dashboard
+
+        self.dashboard = dashboard
+        self.db_config = db_config
+        self.accounts = {account['account_id']: account for account in accounts}
+        self._local = threading.local()
+        self._next_id = 10 ** 12
+        self._id_lock = threading.Lock()
+
+    def _cursor(self):
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            conn = psycopg2.connect(**self.db_config)
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            self._local.cursor = cursor
+        return cursor
+
+    def __call__(self, transfer: Dict[str, Any]) -> str:
+        sender = self.accounts[transfer['sender_account_id']]
+        receiver = self.accounts[transfer['receiver_account_id']]
+        if sender['is_blocked']:
+            return 'blocked'
+        cursor = self._cursor()
+        result = self.dashboard.check_fraud(cursor, sender, receiver, transfer['amount'])
+        # End the read-only transaction of the velocity / rule refresh queries
+        cursor.connection.rollback()
+        status = self.dashboard.transaction_status(result['score'])
+        # Count the transfer towards the sender's velocity as a commit would
+        with self._id_lock:
+            self._next_id += 1
+            transaction_id = self._next_id
+        self.dashboard.velocity_store.record(transaction_id, sender['account_id'], datetime.now(),
+                                             transfer['amount'])
+        return status
+
+
+def run(target, transfers: List[Dict[str, Any]], concurrency: int,
+        duration: Optional[float]) -> Dict[str, Any]:
+    """
+    Send the transfers from ``concurrency`` workers pulling from one queue.
+
+    Returns:
+        Report with throughput, latency percentiles and outcome rates
+    """
+    latencies = np.zeros(len(transfers))
+    outcomes = [None] * len(transfers)
+    position = iter(range(len(transfers)))
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    def worker():
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None or (deadline and time.perf_counter() > deadline):
+                return
+            t0 = time.perf_counter()
+            try:
+                outcome = target(transfers[index])
+            except Exception:
+                outcome = 'error'
+            latencies[index] = time.perf_counter() - t0
+            outcomes[index] = outcome
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    done = [i for i, outcome in enumerate(outcomes) if outcome is not None]
+    counts = Counter(outcomes[i] for i in done)
+    sent = len(done)
+    answered = sent - counts['error']
+    ms = latencies[done] * 1000 if done else np.zeros(1)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    fraud = [i for i in done if transfers[i]['kind'] == 'fraud']
+    return {
+        'requests': sent,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(sent / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(float(p50), 2),
+            'p95': round(float(p95), 2),
+            'p99': round(float(p99), 2),
+            'max': round(float(ms.max()), 2)
+        },
+        'outcomes': dict(counts),
+        'error_rate': round(counts['error'] / sent, 4) if sent else 0.0,
+        'block_rate': round(counts['blocked'] / answered, 4) if answered else 0.0,
+        'review_rate': round(counts['review'] / answered, 4) if answered else 0.0,
+        'fraud_pattern_block_rate': round(
+            sum(outcomes[i] in ('blocked', 'review') for i in fraud) / len(fraud), 4
+        ) if fraud else None,
+    }
+
+
+def print_report(mode: str, concurrency: int, report: Dict[str, Any]) -> None:
+    latency = report['latency_ms']
+    print(f"=== create-transaction load test ({mode}, {concurrency} workers) ===")
+    print(f"Requests:   {report['requests']} in {report['elapsed_seconds']}s "
+          f"({report['throughput_rps']} req/s)")
+    print(f"Latency ms: p50 {latency['p50']}  p95 {latency['p95']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+    print(f"Outcomes:   {', '.join(f'{k} {v}' for k, v in sorted(report['outcomes'].items()))}")
+    print(f"Rates:      error {report['error_rate']:.2%}  blocked {report['block_rate']:.2%}  "
+          f"review {report['review_rate']:.2%}")
+    if report['fraud_pattern_block_rate'] is not None:
+        print(f"Fraud patterns sent to review or blocked: {report['fraud_pattern_block_rate']:.2%}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--mode', choices=('http', 'score'), default='http')
+    parser.add_argument('--url', default='http://localhost:5000', help='Dashboard base URL (http mode)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent transfer streams')
+    parser.add_argument('--requests', type=int, default=1000, help='Transfers to send')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds')
+    parser.add_argument('--fraud-ratio', type=float, default=0.05,
+                        help='Share of the stream drawn from the fraudulent patterns')
+    parser.add_argument('--timeout', type=float, default=30.0, help='HTTP timeout in seconds')
+    parser.add_argument('--seed', type=int, help='Seed for a reproducible transfer stream')
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--max-p99', type=float, help='Fail if p99 latency exceeds this many ms')
+    parser.add_argument('--max-error-rate', type=float, help='Fail if the error rate exceeds this fraction')
+    parser.add_argument('--db-host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--db-port', default=os.environ.get('DB_PORT', '5432'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'antifraud_p2p'))
+    parser.add_argument('--db-user', default=os.environ.get('DB_USER', 'antifraud_user'))
+    parser.add_argument('--db-password', default=os.environ.get('DB_PASSWORD', 'antifraud_pass'))
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+
+    db_config = {
+        'host': args.db_host,
+        'database': args.db_name,
+        'user': args.db_user,
+        'password': args.db_password,
+        'port': args.db_port
+    }
+    generator = TransactionGenerator(db_config)
+    try:
+        with generator.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(ACCOUNTS_QUERY)
+            accounts = cursor.fetchall()
+    finally:
+        generator.conn.close()
+    if len(accounts) < 3:
+        print("Need at least 3 active accounts; generate data with transaction_generator.py first")
+        return 2
+
+    transfers = build_transfers(generator, accounts, args.requests, args.fraud_ratio)
+    if args.mode == 'http':
+        target = HttpTarget(args.url, args.timeout)
+    else:
+        target = ScoreTarget(db_config, accounts)
+
+    report = run(target, transfers, args.concurrency, args.duration)
+    report.update(mode=args.mode, concurrency=args.concurrency)
+    print_report(args.mode, args.concurrency, report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failed = []
+    if args.max_p99 is not None and report['latency_ms']['p99'] > args.max_p99:
+        failed.append(f"p99 {report['latency_ms']['p99']}ms > {args.max_p99}ms")
+    if args.max_error_rate is not None and report['error_rate'] > args.max_error_rate:
+        failed.append(f"error rate {report['error_rate']} > {args.max_error_rate}")
+    for reason in failed:
+        print(f"FAILED: {reason}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+-- Convert an existing, unpartitioned Transaction table (schema.sql plus
+-- schema_additions.sql) to the daily range partitioning of enhanced_schema.sql.
+--
+--   psql -d antifraud_p2p -v ON_ERROR_STOP=1 -f migrate_transaction_partitions.sql
+--
+-- The old table is renamed, the partitioned table is created with the same
+-- columns, defaults and checks, and every row is copied into one partition
+-- per day. The serial sequence, the outgoing foreign keys, the indexes, the
+-- triggers and the views on Transaction are carried over; foreign keys that
+-- point at Transaction (Alert, RiskScoreHistory) are replaced by plain
+-- indexes, as the new primary key is (transaction_id, transaction_date).
+-- Unique indexes other than the primary key cannot be carried over and are
+-- reported instead. Privileges granted on Transaction and on its views have
+-- to be granted again.
+--
+-- Everything runs in one transaction that holds an exclusive lock on
+-- Transaction while the rows are copied. On a database that is already
+-- partitioned the script only (re)creates the maintenance functions.
+--
+-- maintain_transaction_partitions() drops partitions older than its retention
+-- period (90 days by default), so archive older transactions before the
+-- dashboard or a cron job first calls it.
+
+BEGIN;
+
+-- Create the daily partition transaction_pYYYYMMDD for p_day if it is missing
+CREATE OR REPLACE FUNCTION create_transaction_partition(p_day DATE)
+RETURNS TEXT AS $$
+DECLARE
+    partition_name TEXT := 'transaction_p' || to_char(p_day, 'YYYYMMDD');
+    lower_bound TIMESTAMP := p_day;
+    upper_bound TIMESTAMP := p_day + 1;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM transaction_default
+               WHERE transaction_date >= lower_bound AND transaction_date < upper_bound) THEN
+        -- Rows for this day already sit in the default partition; move them
+        -- into a standalone table first, then attach it
+        EXECUTE format('CREATE TABLE %I (LIKE transaction INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM transaction_default WHERE transaction_date >= %L AND transaction_date < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            lower_bound, upper_bound, partition_name);
+        EXECUTE format('ALTER TABLE transaction ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    ELSE
+        EXECUTE format('CREATE TABLE %I PARTITION OF transaction FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create daily partitions for every day in [p_from, p_to]
+CREATE OR REPLACE FUNCTION create_transaction_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    current_day DATE := p_from;
+    created INTEGER := 0;
+BEGIN
+    WHILE current_day <= p_to LOOP
+        IF to_regclass('transaction_p' || to_char(current_day, 'YYYYMMDD')) IS NULL THEN
+            PERFORM create_transaction_partition(current_day);
+            created := created + 1;
+        END IF;
+        current_day := current_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Drop partitions older than the retention period and pre-create upcoming ones.
+-- Meant to run daily (cron, pg_cron or application start-up); runs with the
+-- owner's rights so application roles may call it.
+CREATE OR REPLACE FUNCTION maintain_transaction_partitions(
+    p_retention_days INTEGER DEFAULT 90,
+    p_premake_days INTEGER DEFAULT 7
+) RETURNS INTEGER AS $$
+DECLARE
+    cutoff DATE := CURRENT_DATE - p_retention_days;
+    first_day DATE;
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'transaction'::regclass
+        AND c.relname ~ '^transaction_p[0-9]{8}$'
+        AND to_date(substring(c.relname FROM 14), 'YYYYMMDD') < cutoff
+    LOOP
+        EXECUTE format('DROP TABLE %I', part.relname);
+    END LOOP;
+
+    DELETE FROM transaction_default WHERE transaction_date < cutoff;
+
+    IF to_regprocedure('compact_stats_counters(date)') IS NOT NULL THEN
+        PERFORM compact_stats_counters(cutoff);
+    END IF;
+
+    -- Give rows that fell into the default partition a proper home as well
+    SELECT LEAST(MIN(transaction_date)::DATE, CURRENT_DATE) INTO first_day FROM transaction_default;
+    RETURN create_transaction_partitions(COALESCE(first_day, CURRENT_DATE), CURRENT_DATE + p_premake_days);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DO $$
+DECLARE
+    item RECORD;
+    drop_views TEXT[] := '{}';
+    view_defs TEXT[] := '{}';
+    index_defs TEXT[] := '{}';
+    trigger_defs TEXT[] := '{}';
+    foreign_keys TEXT[] := '{}';
+    id_sequence TEXT;
+    first_day DATE;
+    copied BIGINT;
+    statement TEXT;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'transaction'::regclass) THEN
+        RAISE NOTICE 'Transaction is already partitioned';
+        RETURN;
+    END IF;
+
+    LOCK TABLE transaction IN ACCESS EXCLUSIVE MODE;
+
+    -- Views on Transaction, and views on those views, innermost first
+    FOR item IN
+        WITH RECURSIVE dependent(oid, depth) AS (
+            SELECT DISTINCT r.ev_class, 1
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE d.classid = 'pg_rewrite'::regclass
+            AND d.refobjid = 'transaction'::regclass
+            AND r.ev_class <> 'transaction'::regclass
+            UNION
+            SELECT r.ev_class, dependent.depth + 1
+            FROM dependent
+            JOIN pg_depend d ON d.refobjid = dependent.oid AND d.classid = 'pg_rewrite'::regclass
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE r.ev_class <> dependent.oid
+        )
+        SELECT c.oid, c.relkind, MAX(dependent.depth) AS depth
+        FROM dependent
+        JOIN pg_class c ON c.oid = dependent.oid
+        GROUP BY c.oid, c.relkind
+        ORDER BY depth
+    LOOP
+        drop_views := format(
+            CASE WHEN item.relkind = 'm' THEN 'DROP MATERIALIZED VIEW %s' ELSE 'DROP VIEW %s' END,
+            item.oid::regclass) || drop_views;
+        view_defs := view_defs || format(
+            CASE WHEN item.relkind = 'm' THEN 'CREATE MATERIALIZED VIEW %s AS %s' ELSE 'CREATE VIEW %s AS %s' END,
+            item.oid::regclass, pg_get_viewdef(item.oid));
+    END LOOP;
+
+    -- The primary key and unique indexes have to include transaction_date
+    FOR item IN
+        SELECT i.indexrelid, i.indisunique, i.indisprimary
+        FROM pg_index i
+        WHERE i.indrelid = 'transaction'::regclass
+    LOOP
+        IF NOT item.indisunique THEN
+            index_defs := index_defs || pg_get_indexdef(item.indexrelid);
+        ELSIF NOT item.indisprimary THEN
+            RAISE WARNING 'Unique index % is not carried over', item.indexrelid::regclass;
+        END IF;
+    END LOOP;
+
+    FOR item IN
+        SELECT oid FROM pg_trigger WHERE tgrelid = 'transaction'::regclass AND NOT tgisinternal
+    LOOP
+        trigger_defs := trigger_defs || pg_get_triggerdef(item.oid);
+    END LOOP;
+
+    FOR item IN
+        SELECT conname, pg_get_constraintdef(oid) AS def
+        FROM pg_constraint
+        WHERE conrelid = 'transaction'::regclass AND contype = 'f'
+    LOOP
+        foreign_keys := foreign_keys || format('ALTER TABLE transaction ADD CONSTRAINT %I %s', item.conname, item.def);
+    END LOOP;
+
+    -- Foreign keys into Transaction become indexes on the referencing column
+    FOR item IN
+        SELECT c.conname, c.conrelid::regclass AS tablename, a.attname, c.conkey[1] AS attnum, c.conrelid
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        WHERE c.confrelid = 'transaction'::regclass AND c.contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', item.tablename, item.conname);
+        IF NOT EXISTS (SELECT 1 FROM pg_index WHERE indrelid = item.conrelid AND indkey[0] = item.attnum) THEN
+            EXECUTE format('CREATE INDEX %I ON %s (%I)', item.conname || '_idx', item.tablename, item.attname);
+        END IF;
+    END LOOP;
+
+    -- Outermost first
+    FOREACH statement IN ARRAY drop_views LOOP
+        EXECUTE statement;
+    END LOOP;
+
+    ALTER TABLE transaction RENAME TO transaction_unpartitioned;
+    id_sequence := pg_get_serial_sequence('transaction_unpartitioned', 'transaction_id');
+
+    CREATE TABLE transaction (
+        LIKE transaction_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS
+    ) PARTITION BY RANGE (transaction_date);
+    CREATE TABLE transaction_default PARTITION OF transaction DEFAULT;
+
+    SELECT MIN(transaction_date)::DATE INTO first_day FROM transaction_unpartitioned;
+    PERFORM create_transaction_partitions(LEAST(COALESCE(first_day, CURRENT_DATE), CURRENT_DATE), CURRENT_DATE + 7);
+    INSERT INTO transaction SELECT * FROM transaction_unpartitioned;
+    GET DIAGNOSTICS copied = ROW_COUNT;
+
+    IF id_sequence IS NOT NULL THEN
+        -- Keep the sequence when the old table is dropped
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY transaction.transaction_id', id_sequence);
+    END IF;
+    -- Frees the names of its primary key and indexes
+    DROP TABLE transaction_unpartitioned;
+
+    ALTER TABLE transaction ADD PRIMARY KEY (transaction_id, transaction_date);
+    FOREACH statement IN ARRAY foreign_keys || index_defs || trigger_defs || view_defs LOOP
+        EXECUTE statement;
+    END LOOP;
+
+    RAISE NOTICE 'Moved % transactions into the partitioned table', copied;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,195 @@
+"""
+Persistence of detected transaction patterns and detector progress.
+
+Carousels, layered chains and velocity bursts found by AdvancedFraudDetection
+are kept in TransactionPattern. A pattern stays active while it keeps
+receiving transactions: a later run that finds more of the same pattern (the
+same ring of accounts, originator/beneficiary pair or bursting sender) merges
+into the active row instead of adding another one, and patterns with nothing
+new for longer than their detector's window are deactivated.
+
+DetectorState keeps each detector's high-water mark, the highest
+transaction id and date it has processed, so the next run only has to look
+at transactions above it.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2.extras
+
+# Detector pattern_type -> TransactionPattern.pattern_type
+PATTERN_TYPES = {
+    'carousel': 'carousel',
+    'layered_transaction': 'layered',
+    'velocity_burst': 'burst',
+}
+
+UPSERT_PATTERN_QUERY = """
+    INSERT INTO TransactionPattern (pattern_type, pattern_key, client_id, account_ids, transaction_ids,
+                                    start_date, end_date, transaction_count, total_amount, risk_score,
+                                    description)
+    VALUES %s
+    ON CONFLICT (pattern_key) WHERE is_active DO UPDATE SET
+        account_ids = ARRAY(
+            SELECT a FROM unnest(TransactionPattern.account_ids || EXCLUDED.account_ids) WITH ORDINALITY u(a, i)
+            GROUP BY a ORDER BY MIN(i)
+        ),
+        transaction_ids = ARRAY(
+            SELECT DISTINCT x FROM unnest(TransactionPattern.transaction_ids || EXCLUDED.transaction_ids) x
+            ORDER BY x
+        ),
+        start_date = LEAST(TransactionPattern.start_date, EXCLUDED.start_date),
+        end_date = GREATEST(TransactionPattern.end_date, EXCLUDED.end_date),
+        transaction_count = GREATEST(TransactionPattern.transaction_count, EXCLUDED.transaction_count),
+        total_amount = GREATEST(TransactionPattern.total_amount, EXCLUDED.total_amount),
+        risk_score = GREATEST(TransactionPattern.risk_score, EXCLUDED.risk_score),
+        description = EXCLUDED.description
+    RETURNING pattern_id, pattern_key, xmax <> 0 AS merged
+"""
+
+# Merged rows get their totals back from the union of their transactions;
+# adding the two sides would count shared transactions twice
+RECOUNT_PATTERNS_QUERY = """
+    UPDATE TransactionPattern p
+    SET transaction_count = s.transaction_count,
+        total_amount = s.total_amount,
+        start_date = s.start_date,
+        end_date = s.end_date
+    FROM (
+        SELECT p.pattern_id, COUNT(*) AS transaction_count, SUM(t.amount) AS total_amount,
+               MIN(t.transaction_date) AS start_date, MAX(t.transaction_date) AS end_date
+        FROM TransactionPattern p
+        JOIN Transaction t ON t.transaction_id = ANY(p.transaction_ids)
+        WHERE p.pattern_id = ANY(%s)
+        GROUP BY p.pattern_id
+    ) s
+    WHERE p.pattern_id = s.pattern_id
+"""
+
+
+def merge_key(pattern: Dict) -> str:
+    """
+    Identity under which later detections merge into an active pattern.
+
+    A carousel is its ring of accounts, a layered chain its originator and
+    final beneficiary, a burst its sending account.
+    """
+    kind = pattern['pattern_type']
+    if kind == 'carousel':
+        identity = sorted(set(pattern['account_path']))
+    elif kind == 'layered_transaction':
+        identity = (pattern['originator'], pattern['final_beneficiary'])
+    elif kind == 'velocity_burst':
+        identity = pattern['account_id']
+    else:
+        raise ValueError(f"{kind} patterns are not stored in TransactionPattern")
+    return hashlib.sha256(f"{kind}:{identity}".encode()).hexdigest()
+
+
+def _pattern_row(pattern: Dict) -> Tuple:
+    kind = pattern['pattern_type']
+    transaction_ids = sorted(set(pattern.get('transaction_ids') or []))
+    if kind == 'carousel':
+        account_ids = pattern['account_path'][:-1]
+        start_date, end_date = pattern['first_date'], pattern['latest_date']
+        description = f"Carousel through {len(account_ids)} accounts"
+    elif kind == 'layered_transaction':
+        account_ids = list(dict.fromkeys(pattern['account_chain'] + [pattern['final_beneficiary']]))
+        start_date, end_date = pattern['first_date'], pattern['latest_date']
+        description = f"Layered transfers from {pattern['originator']} to {pattern['final_beneficiary']}"
+    else:
+        account_ids = [pattern['account_id']]
+        start_date, end_date = pattern['first_transaction'], pattern['last_transaction']
+        description = f"{pattern['transaction_count']} transfers within {pattern['time_window_minutes']} minutes"
+    return (
+        PATTERN_TYPES[kind],
+        merge_key(pattern),
+        pattern.get('client_id'),
+        [int(a) for a in account_ids],
+        [int(t) for t in transaction_ids] or None,
+        start_date,
+        end_date,
+        len(transaction_ids) or pattern['transaction_count'],
+        pattern['total_amount'],
+        round(pattern['risk_score'], 2),
+        description
+    )
+
+
+class PatternStore:
+    """TransactionPattern and DetectorState access on one connection; the caller commits"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_state(self, detector: str) -> Optional[Tuple[int, Optional[datetime]]]:
+        """(last transaction id, last transaction date) processed by ``detector``, or None"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT last_transaction_id, last_transaction_date FROM DetectorState WHERE detector = %s
+            """, (detector,))
+            return cursor.fetchone()
+
+    def set_state(self, detector: str, last_transaction_id: int, last_transaction_date: Optional[datetime]) -> None:
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO DetectorState (detector, last_transaction_id, last_transaction_date, last_run)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (detector) DO UPDATE SET
+                    last_transaction_id = GREATEST(DetectorState.last_transaction_id, EXCLUDED.last_transaction_id),
+                    last_transaction_date = GREATEST(DetectorState.last_transaction_date, EXCLUDED.last_transaction_date),
+                    last_run = EXCLUDED.last_run
+            """, (detector, last_transaction_id, last_transaction_date))
+
+    def merge(self, patterns: List[Dict], page_size: int = 1000) -> Dict[str, int]:
+        """
+        Insert patterns or merge them into the active pattern with the same key.
+
+        Returns:
+            {'inserted': ..., 'merged': ...}
+        """
+        rows = {}
+        combined = set()
+        for pattern in patterns:
+            row = _pattern_row(pattern)
+            key = row[1]
+            if key in rows:
+                # One statement cannot update a row twice, so detections of the
+                # same pattern within this run are combined here first
+                previous = rows[key]
+                row = row[:3] + (
+                    list(dict.fromkeys(previous[3] + row[3])),
+                    sorted(set((previous[4] or []) + (row[4] or []))) or None,
+                    min(previous[5], row[5]),
+                    max(previous[6], row[6]),
+                    max(previous[7], row[7]),
+                    max(previous[8], row[8]),
+                    max(previous[9], row[9]),
+                    row[10]
+                )
+                combined.add(key)
+            rows[key] = row
+
+        if not rows:
+            return {'inserted': 0, 'merged': 0}
+        with self.conn.cursor() as cursor:
+            returned = psycopg2.extras.execute_values(
+                cursor, UPSERT_PATTERN_QUERY, list(rows.values()), page_size=page_size, fetch=True)
+            merged = sum(1 for _, _, was_merged in returned if was_merged)
+            recount = [pattern_id for pattern_id, key, was_merged in returned
+                       if (was_merged or key in combined) and rows[key][4]]
+            if recount:
+                cursor.execute(RECOUNT_PATTERNS_QUERY, (recount,))
+        return {'inserted': len(returned) - merged, 'merged': merged}
+
+    def expire(self, pattern_type: str, idle_seconds: float) -> int:
+        """Deactivate patterns of ``pattern_type`` with no transaction in the last ``idle_seconds``"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE TransactionPattern SET is_active = FALSE
+                WHERE is_active AND pattern_type = %s
+                AND end_date < LOCALTIMESTAMP - %s * INTERVAL '1 second'
+            """, (PATTERN_TYPES[pattern_type], idle_seconds))
+            return cursor.rowcount
@@ -1,4 +1,9 @@
 -- Anti-fraud Database Schema for P2P Transfers
+--
+-- LEGACY: the original schema, kept for databases created from it. Its
+-- Transaction table is not partitioned. New databases use enhanced_schema.sql;
+-- existing ones are brought up to date with schema_additions.sql followed by
+-- migrate_transaction_partitions.sql (see SETUP.md).
 
 -- Create Client table
 CREATE TABLE Client (
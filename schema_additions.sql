@@ -50,20 +50,23 @@ ALTER TABLE IPAddress ADD COLUMN IF NOT EXISTS transaction_count INTEGER DEFAULT
 ALTER TABLE IPAddress ADD COLUMN IF NOT EXISTS unique_clients_used INTEGER DEFAULT 0;
 ALTER TABLE IPAddress ADD COLUMN IF NOT EXISTS reputation_score DECIMAL(5,2) DEFAULT 0.0;
 
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS location_city VARCHAR(100);
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS location_country VARCHAR(100);
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS risk_factors TEXT[];
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS processing_time_ms INTEGER;
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS merchant_category_code VARCHAR(10);
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS reference_number VARCHAR(100);
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS chargeback_risk DECIMAL(5,2) DEFAULT 0.0;
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS velocity_score DECIMAL(5,2) DEFAULT 0.0;
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS anomaly_score DECIMAL(5,2) DEFAULT 0.0;
-ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS is_suspicious BOOLEAN DEFAULT FALSE;
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS location_city VARCHAR(100);
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS location_country VARCHAR(100);
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS risk_factors TEXT[];
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS processing_time_ms INTEGER;
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS merchant_category_code VARCHAR(10);
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS reference_number VARCHAR(100);
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS chargeback_risk DECIMAL(5,2) DEFAULT 0.0;
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS velocity_score DECIMAL(5,2) DEFAULT 0.0;
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS anomaly_score DECIMAL(5,2) DEFAULT 0.0;
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS is_suspicious BOOLEAN DEFAULT FALSE;
+-- Rule points of the last batch re-scoring (fraud_detection.py)
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS batch_score DECIMAL(7,2);
+ALTER TABLE Transaction ADD COLUMN IF NOT EXISTS rescored_at TIMESTAMP;
 
 -- Add new status to Transaction check constraint
-ALTER TABLE "Transaction" DROP CONSTRAINT IF EXISTS transaction_status_check;
-ALTER TABLE "Transaction" ADD CONSTRAINT transaction_status_check 
+ALTER TABLE Transaction DROP CONSTRAINT IF EXISTS transaction_status_check;
+ALTER TABLE Transaction ADD CONSTRAINT transaction_status_check 
     CHECK (status IN ('completed', 'pending', 'failed', 'reversed', 'flagged', 'blocked'));
 
 ALTER TABLE Rule ADD COLUMN IF NOT EXISTS rule_category VARCHAR(50) CHECK (rule_category IN ('amount', 'velocity', 'behavior', 'network', 'device', 'location'));
@@ -103,9 +106,15 @@ CREATE TABLE IF NOT EXISTS TransactionPattern (
     is_active BOOLEAN DEFAULT TRUE,
     detected_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     description TEXT,
+    pattern_key VARCHAR(64),
     FOREIGN KEY (client_id) REFERENCES Client(client_id)
 );
 
+ALTER TABLE TransactionPattern ADD COLUMN IF NOT EXISTS pattern_key VARCHAR(64);
+
+-- Alert and RiskScoreHistory keep transaction_id without a foreign key: the
+-- primary key of the partitioned Transaction table includes transaction_date
+-- (see migrate_transaction_partitions.sql)
 CREATE TABLE IF NOT EXISTS Alert (
     alert_id SERIAL PRIMARY KEY,
     alert_type VARCHAR(50) CHECK (alert_type IN ('fraud', 'suspicious', 'high_risk', 'blocked', 'velocity')),
@@ -123,12 +132,14 @@ CREATE TABLE IF NOT EXISTS Alert (
     resolution_notes TEXT,
     risk_score DECIMAL(5,2),
     auto_generated BOOLEAN DEFAULT TRUE,
+    pattern_key VARCHAR(64),
     FOREIGN KEY (client_id) REFERENCES Client(client_id),
     FOREIGN KEY (account_id) REFERENCES Account(account_id),
-    FOREIGN KEY (transaction_id) REFERENCES Transaction(transaction_id),
     FOREIGN KEY (rule_id) REFERENCES Rule(rule_id)
 );
 
+ALTER TABLE Alert ADD COLUMN IF NOT EXISTS pattern_key VARCHAR(64);
+
 CREATE TABLE IF NOT EXISTS Session (
     session_id SERIAL PRIMARY KEY,
     client_id INTEGER NOT NULL,
@@ -175,18 +186,46 @@ CREATE TABLE IF NOT EXISTS RiskScoreHistory (
     rule_ids INTEGER[],
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (client_id) REFERENCES Client(client_id),
-    FOREIGN KEY (account_id) REFERENCES Account(account_id),
-    FOREIGN KEY (transaction_id) REFERENCES Transaction(transaction_id)
+    FOREIGN KEY (account_id) REFERENCES Account(account_id)
+);
+
+-- Progress of the incremental pattern detectors: the next run only searches
+-- around transactions above the mark (see pattern_store.py)
+CREATE TABLE IF NOT EXISTS DetectorState (
+    detector VARCHAR(50) PRIMARY KEY,
+    last_transaction_id INTEGER NOT NULL DEFAULT 0,
+    last_transaction_date TIMESTAMP,
+    last_run TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Connected clusters of the transfer graph and the cluster of every account,
+-- maintained by ClusterIndex (see security_dashboard/cluster_index.py); the
+-- cluster id is the id of one of its accounts
+CREATE TABLE IF NOT EXISTS NetworkCluster (
+    cluster_id INTEGER PRIMARY KEY,
+    cluster_size INTEGER NOT NULL,
+    edge_count INTEGER NOT NULL,
+    density DECIMAL(6,5),
+    risk_score DECIMAL(5,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS AccountCluster (
+    account_id INTEGER PRIMARY KEY,
+    cluster_id INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (account_id) REFERENCES Account(account_id)
 );
 
 -- Create additional indexes
-CREATE INDEX IF NOT EXISTS idx_transaction_amount ON "Transaction"(amount);
-CREATE INDEX IF NOT EXISTS idx_transaction_fraud_score ON "Transaction"(fraud_score);
-CREATE INDEX IF NOT EXISTS idx_transaction_flagged ON "Transaction"(is_flagged);
+CREATE INDEX IF NOT EXISTS idx_transaction_amount ON Transaction(amount);
+CREATE INDEX IF NOT EXISTS idx_transaction_fraud_score ON Transaction(fraud_score);
+CREATE INDEX IF NOT EXISTS idx_transaction_flagged ON Transaction(is_flagged);
 CREATE INDEX IF NOT EXISTS idx_client_risk_level ON Client(risk_level);
 CREATE INDEX IF NOT EXISTS idx_device_risk_score ON Device(risk_score);
 CREATE INDEX IF NOT EXISTS idx_ip_risk_score ON IPAddress(risk_score);
 CREATE INDEX IF NOT EXISTS idx_alert_client ON Alert(client_id);
+CREATE INDEX IF NOT EXISTS idx_alert_transaction ON Alert(transaction_id);
 CREATE INDEX IF NOT EXISTS idx_alert_status ON Alert(status);
 CREATE INDEX IF NOT EXISTS idx_alert_date ON Alert(alert_date);
 CREATE INDEX IF NOT EXISTS idx_session_client ON Session(client_id);
@@ -194,12 +233,21 @@ CREATE INDEX IF NOT EXISTS idx_session_date ON Session(session_start);
 CREATE INDEX IF NOT EXISTS idx_velocity_client_metric ON VelocityCounter(client_id, metric_type, time_window);
 CREATE INDEX IF NOT EXISTS idx_pattern_client ON TransactionPattern(client_id);
 CREATE INDEX IF NOT EXISTS idx_pattern_active ON TransactionPattern(is_active);
+-- One active pattern per ring / chain / bursting sender; later runs merge into it
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pattern_active_key ON TransactionPattern(pattern_key) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_account_cluster ON AccountCluster(cluster_id);
+CREATE INDEX IF NOT EXISTS idx_risk_history_transaction ON RiskScoreHistory(transaction_id);
 
 -- Create composite indexes
-CREATE INDEX IF NOT EXISTS idx_transaction_composite ON "Transaction"(sender_account_id, transaction_date, amount);
+CREATE INDEX IF NOT EXISTS idx_transaction_composite ON Transaction(sender_account_id, transaction_date, amount);
 CREATE INDEX IF NOT EXISTS idx_client_risk_composite ON Client(risk_level, is_blocked, account_status);
 CREATE INDEX IF NOT EXISTS idx_alert_severity_status ON Alert(severity, status, alert_date);
 
+-- At most one unresolved alert per detected pattern, so repeated detector
+-- runs do not re-alert on what is already being handled
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alert_open_pattern ON Alert(pattern_key)
+    WHERE status IN ('open', 'investigating');
+
 -- Create functions for automatic calculations
 CREATE OR REPLACE FUNCTION update_client_stats()
 RETURNS TRIGGER AS $$
@@ -226,9 +274,9 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
-DROP TRIGGER IF EXISTS trigger_update_client_stats ON "Transaction";
+DROP TRIGGER IF EXISTS trigger_update_client_stats ON Transaction;
 CREATE TRIGGER trigger_update_client_stats
-    AFTER INSERT ON "Transaction"
+    AFTER INSERT ON Transaction
     FOR EACH ROW
     EXECUTE FUNCTION update_client_stats();
 
@@ -0,0 +1,10 @@
+"""
+Security dashboard for the anti-fraud system.
+
+A package, so that the root detectors and tools share its modules (the rule
+engine, the transaction feeds, burst detection and the cluster index) with
+the dashboard instead of keeping copies. Run it from the repository root:
+
+    python -m security_dashboard.app
+    hypercorn security_dashboard.asgi_app:app --bind 0.0.0.0:5000
+"""
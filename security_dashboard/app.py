@@ -1,8 +1,18 @@
-from flask import Flask, render_template, request, jsonify
-import psycopg2
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from psycopg2.extras import RealDictCursor
+import base64
+import json
 import os
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from decimal import Decimal
+
+from security_dashboard.db_pool import ConnectionPool
+from security_dashboard.velocity import VelocityStore
+from security_dashboard.carousel_monitor import CarouselMonitor
+from security_dashboard.cluster_index import ClusterIndex
+from security_dashboard.event_stream import EventHub
+from security_dashboard.rule_engine import RuleEngine, score_transfer, score_transfers, transfer_features
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
@@ -15,89 +25,275 @@ DB_CONFIG = {
     'port': os.environ.get('DB_PORT', '5432')
 }
 
+# Connection pool shared by all request handlers
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    minconn=int(os.environ.get('DB_POOL_MIN', '2')),
+    maxconn=int(os.environ.get('DB_POOL_MAX', '20')),
+    timeout=float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+    max_lifetime=float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+    health_check_after=float(os.environ.get('DB_POOL_HEALTH_CHECK_AFTER', '30'))
+)
+
+# Per-account sliding-window transaction counters used by the fraud check
+velocity_store = VelocityStore(
+    sync_interval=float(os.environ.get('VELOCITY_SYNC_INTERVAL', '5'))
+)
+
+# Scoring rules for new transfers, compiled from the FraudRule / Rule table
+fraud_rules = RuleEngine(
+    'transfer',
+    cap=1.0,
+    refresh_interval=float(os.environ.get('RULES_REFRESH_INTERVAL', '5'))
+)
+
+# Days of transactions kept; older daily partitions are dropped on start-up
+PARTITION_RETENTION_DAYS = int(os.environ.get('PARTITION_RETENTION_DAYS', '90'))
+
+# Temporal transfer graph used to spot carousels as soon as they close
+carousel_monitor = CarouselMonitor(
+    window_seconds=float(os.environ.get('CAROUSEL_WINDOW_HOURS', '24')) * 3600,
+    max_length=int(os.environ.get('CAROUSEL_MAX_LENGTH', '6')),
+    sync_interval=float(os.environ.get('VELOCITY_SYNC_INTERVAL', '5'))
+)
+
+# Connected clusters of the transfer graph, so a transfer's response carries
+# the risk of the cluster its sender is in
+cluster_index = ClusterIndex(
+    window_seconds=float(os.environ.get('CLUSTER_WINDOW_DAYS', '7')) * 86400,
+    rebuild_seconds=float(os.environ.get('CLUSTER_REBUILD_SECONDS', '3600')),
+    sync_interval=float(os.environ.get('VELOCITY_SYNC_INTERVAL', '5'))
+)
+
+@contextmanager
 def get_db_connection():
-    """Create a database connection."""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+    """Borrow a pooled database connection; it is returned even on errors."""
+    with db_pool.connection() as conn:
+        yield conn
 
 @app.route('/')
 def index():
     """Main dashboard page."""
     return render_template('index.html')
 
+# Columns returned by the transaction list endpoints
+TRANSACTION_LIST_COLUMNS = """
+    t.transaction_id, t.amount, t.currency, t.transaction_date,
+    t.status, t.is_flagged, t.fraud_score, t.flagged_reason,
+    s.account_number as sender_account,
+    r.account_number as receiver_account,
+    c1.first_name as sender_first_name,
+    c1.last_name as sender_last_name,
+    c2.first_name as receiver_first_name,
+    c2.last_name as receiver_last_name
+"""
+
+# Keyset orderings: name -> (sort expression, row field) pairs, all descending.
+# Each ordering is backed by a matching index, see the schema scripts.
+TRANSACTION_ORDERINGS = {
+    'date': (('t.transaction_date', 'transaction_date'),
+             ('t.transaction_id', 'transaction_id')),
+    'score': (('COALESCE(t.fraud_score, 0)', 'fraud_score'),
+              ('t.transaction_date', 'transaction_date'),
+              ('t.transaction_id', 'transaction_id')),
+}
+
+# Cursor value parsers, by row field
+CURSOR_FIELD_TYPES = {
+    'transaction_date': datetime.fromisoformat,
+    'transaction_id': int,
+    'fraud_score': Decimal,
+}
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values):
+    """Opaque page token for the key values of the last row of a page."""
+    payload = json.dumps([0 if v is None else v for v in values], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """Key values of a page token, parsed according to the row ``fields``."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [CURSOR_FIELD_TYPES[field](str(value)) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_transaction_filters(args):
+    """
+    Build WHERE conditions from query-string filters.
+
+    Supported filters: status (comma-separated), min_score, max_score,
+    date_from, date_to (ISO 8601; date_to is exclusive) and account_id.
+    The account filter is returned separately because it is answered with
+    one index scan per direction instead of an OR.
+
+    Raises:
+        ValueError: If a filter value cannot be parsed
+    """
+    conditions = []
+    params = []
+
+    statuses = [value for value in args.get('status', '').split(',') if value]
+    if statuses:
+        conditions.append('t.status = ANY(%s)')
+        params.append(statuses)
+
+    for name, operator in (('min_score', '>='), ('max_score', '<=')):
+        if args.get(name):
+            try:
+                params.append(float(args[name]))
+            except ValueError:
+                raise ValueError(f'Invalid {name}')
+            conditions.append(f't.fraud_score {operator} %s')
+
+    for name, operator in (('date_from', '>='), ('date_to', '<')):
+        if args.get(name):
+            try:
+                params.append(datetime.fromisoformat(args[name]))
+            except ValueError:
+                raise ValueError(f'Invalid {name}')
+            conditions.append(f't.transaction_date {operator} %s')
+
+    account_id = None
+    if args.get('account_id'):
+        try:
+            account_id = int(args['account_id'])
+        except ValueError:
+            raise ValueError('Invalid account_id')
+
+    return conditions, params, account_id
+
+
+def build_transaction_page_query(args, ordering, base_conditions=()):
+    """
+    Build the query for one keyset page of transactions.
+
+    The page is chosen from Transaction alone (an index range scan that
+    starts right after the cursor) and only those rows are joined with
+    accounts and clients, so every page costs the same as the first.
+
+    Returns:
+        (query, params, limit); the query fetches up to limit + 1 rows
+
+    Raises:
+        ValueError: If a parameter cannot be parsed
+    """
+    keys = TRANSACTION_ORDERINGS[ordering]
+    conditions, params, account_id = parse_transaction_filters(args)
+    conditions = list(base_conditions) + conditions
+
+    try:
+        limit = min(max(int(args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('Invalid limit')
+
+    if args.get('cursor'):
+        key_columns = ', '.join(expression for expression, _ in keys)
+        conditions.append(f'({key_columns}) < ({", ".join(["%s"] * len(keys))})')
+        values = decode_cursor(args['cursor'], [field for _, field in keys])
+        params.extend(values)
+        if keys[0][1] == 'transaction_date':
+            # Plain bound so that newer daily partitions are pruned
+            conditions.append('t.transaction_date <= %s')
+            params.append(values[0])
+
+    order_by = ', '.join(f'{expression} DESC' for expression, _ in keys)
+
+    def page_query(extra_condition):
+        where = conditions + [extra_condition] if extra_condition else conditions
+        return f"""
+            SELECT t.* FROM Transaction t
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY {order_by}
+            LIMIT %s
+        """
+
+    if account_id is None:
+        page = page_query(None)
+        page_params = params + [limit + 1]
+    else:
+        # Sent and received transfers each walk their own index, then merge
+        page = f"""
+            SELECT * FROM (
+                ({page_query('t.sender_account_id = %s')})
+                UNION ALL
+                ({page_query('t.receiver_account_id = %s AND t.sender_account_id <> %s')})
+            ) t
+            ORDER BY {order_by}
+            LIMIT %s
+        """
+        page_params = (params + [account_id, limit + 1] +
+                       params + [account_id, account_id, limit + 1] + [limit + 1])
+
+    query = f"""
+        SELECT {TRANSACTION_LIST_COLUMNS}
+        FROM ({page}) t
+        JOIN Account s ON t.sender_account_id = s.account_id
+        JOIN Account r ON t.receiver_account_id = r.account_id
+        JOIN Client c1 ON s.client_id = c1.client_id
+        JOIN Client c2 ON r.client_id = c2.client_id
+        ORDER BY {order_by}
+    """
+    return query, page_params, limit
+
+
+def finish_transaction_page(rows, ordering, limit):
+    """
+    Trim the look-ahead row off a page.
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][field] for _, field in TRANSACTION_ORDERINGS[ordering]])
+    return rows, next_cursor
+
+
+def fetch_transaction_page(cursor, args, ordering, base_conditions=()):
+    """Fetch one keyset page of transactions, see build_transaction_page_query."""
+    query, params, limit = build_transaction_page_query(args, ordering, base_conditions)
+    cursor.execute(query, params)
+    return finish_transaction_page(cursor.fetchall(), ordering, limit)
+
+
 @app.route('/api/transactions')
 def get_transactions():
-    """Get recent transactions with fraud scores."""
+    """Get transactions with fraud scores, newest first, one keyset page at a time."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get flagged transactions
-        query = """
-            SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
-                   t.status, t.is_flagged, t.fraud_score, t.flagged_reason,
-                   s.account_number as sender_account,
-                   r.account_number as receiver_account,
-                   c1.first_name as sender_first_name,
-                   c1.last_name as sender_last_name,
-                   c2.first_name as receiver_first_name,
-                   c2.last_name as receiver_last_name
-            FROM Transaction t
-            JOIN Account s ON t.sender_account_id = s.account_id
-            JOIN Account r ON t.receiver_account_id = r.account_id
-            JOIN Client c1 ON s.client_id = c1.client_id
-            JOIN Client c2 ON r.client_id = c2.client_id
-            ORDER BY t.transaction_date DESC
-            LIMIT 50
-        """
-        cursor.execute(query)
-        transactions = cursor.fetchall()
-        
-        conn.close()
-        return jsonify({'transactions': transactions})
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                transactions, next_cursor = fetch_transaction_page(cursor, request.args, 'date')
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            return jsonify({'transactions': transactions, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/flagged-transactions')
 def get_flagged_transactions():
-    """Get transactions flagged as suspicious."""
+    """Get transactions flagged as suspicious, highest fraud score first."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
-                   t.status, t.fraud_score, t.flagged_reason,
-                   s.account_number as sender_account,
-                   r.account_number as receiver_account,
-                   c1.first_name as sender_first_name,
-                   c1.last_name as sender_last_name,
-                   c2.first_name as receiver_first_name,
-                   c2.last_name as receiver_last_name
-            FROM Transaction t
-            JOIN Account s ON t.sender_account_id = s.account_id
-            JOIN Account r ON t.receiver_account_id = r.account_id
-            JOIN Client c1 ON s.client_id = c1.client_id
-            JOIN Client c2 ON r.client_id = c2.client_id
-            WHERE t.is_flagged = TRUE
-            ORDER BY t.fraud_score DESC, t.transaction_date DESC
-            LIMIT 50
-        """
-        cursor.execute(query)
-        transactions = cursor.fetchall()
-        
-        conn.close()
-        return jsonify({'transactions': transactions})
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                transactions, next_cursor = fetch_transaction_page(
+                    cursor, request.args, 'score', base_conditions=['t.is_flagged = TRUE']
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            return jsonify({'transactions': transactions, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -105,25 +301,21 @@ def get_flagged_transactions():
 def get_high_risk_clients():
     """Get clients with high risk levels."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT client_id, first_name, last_name, phone_number, email, 
-                   risk_level, is_blocked
-            FROM Client
-            WHERE risk_level > 0.5 OR is_blocked = TRUE
-            ORDER BY risk_level DESC
-            LIMIT 50
-        """
-        cursor.execute(query)
-        clients = cursor.fetchall()
-        
-        conn.close()
-        return jsonify({'clients': clients})
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            query = """
+                SELECT client_id, first_name, last_name, phone_number, email, 
+                       risk_level, is_blocked
+                FROM Client
+                WHERE risk_level > 0.5 OR is_blocked = TRUE
+                ORDER BY risk_level DESC
+                LIMIT 50
+            """
+            cursor.execute(query)
+            clients = cursor.fetchall()
+
+            return jsonify({'clients': clients})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -131,27 +323,23 @@ def get_high_risk_clients():
 def get_transaction_patterns():
     """Get transaction patterns for spike detection."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get transaction counts by hour for the last 24 hours
-        query = """
-            SELECT 
-                DATE_TRUNC('hour', transaction_date) as hour,
-                COUNT(*) as transaction_count
-            FROM Transaction
-            WHERE transaction_date >= NOW() - INTERVAL '24 hours'
-            GROUP BY DATE_TRUNC('hour', transaction_date)
-            ORDER BY hour
-        """
-        cursor.execute(query)
-        patterns = cursor.fetchall()
-        
-        conn.close()
-        return jsonify({'patterns': patterns})
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            # Get transaction counts by hour for the last 24 hours
+            query = """
+                SELECT 
+                    DATE_TRUNC('hour', transaction_date) as hour,
+                    COUNT(*) as transaction_count
+                FROM Transaction
+                WHERE transaction_date >= NOW() - INTERVAL '24 hours'
+                GROUP BY DATE_TRUNC('hour', transaction_date)
+                ORDER BY hour
+            """
+            cursor.execute(query)
+            patterns = cursor.fetchall()
+
+            return jsonify({'patterns': patterns})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -159,62 +347,57 @@ def get_transaction_patterns():
 def get_client_details(client_id):
     """Get detailed information about a specific client."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get client details
-        client_query = """
-            SELECT client_id, first_name, last_name, date_of_birth, 
-                   phone_number, email, registration_date, kyc_status, 
-                   risk_level, is_blocked
-            FROM Client
-            WHERE client_id = %s
-        """
-        cursor.execute(client_query, (client_id,))
-        client = cursor.fetchone()
-        
-        if not client:
-            conn.close()
-            return jsonify({'error': 'Client not found'}), 404
-        
-        # Get client accounts
-        accounts_query = """
-            SELECT account_id, account_number, account_type, balance, 
-                   opening_date, is_active
-            FROM Account
-            WHERE client_id = %s
-        """
-        cursor.execute(accounts_query, (client_id,))
-        accounts = cursor.fetchall()
-        
-        # Get recent transactions for this client (as sender)
-        transactions_query = """
-            SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
-                   t.status, t.fraud_score, t.is_flagged,
-                   r.account_number as receiver_account,
-                   c.first_name as receiver_first_name,
-                   c.last_name as receiver_last_name
-            FROM Transaction t
-            JOIN Account r ON t.receiver_account_id = r.account_id
-            JOIN Client c ON r.client_id = c.client_id
-            WHERE t.sender_account_id IN (
-                SELECT account_id FROM Account WHERE client_id = %s
-            )
-            ORDER BY t.transaction_date DESC
-            LIMIT 20
-        """
-        cursor.execute(transactions_query, (client_id,))
-        transactions = cursor.fetchall()
-        
-        conn.close()
-        return jsonify({
-            'client': client,
-            'accounts': accounts,
-            'transactions': transactions
-        })
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            # Get client details
+            client_query = """
+                SELECT client_id, first_name, last_name, date_of_birth, 
+                       phone_number, email, registration_date, kyc_status, 
+                       risk_level, is_blocked
+                FROM Client
+                WHERE client_id = %s
+            """
+            cursor.execute(client_query, (client_id,))
+            client = cursor.fetchone()
+
+            if not client:
+                return jsonify({'error': 'Client not found'}), 404
+
+            # Get client accounts
+            accounts_query = """
+                SELECT account_id, account_number, account_type, balance, 
+                       opening_date, is_active
+                FROM Account
+                WHERE client_id = %s
+            """
+            cursor.execute(accounts_query, (client_id,))
+            accounts = cursor.fetchall()
+
+            # Get recent transactions for this client (as sender)
+            transactions_query = """
+                SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
+                       t.status, t.fraud_score, t.is_flagged,
+                       r.account_number as receiver_account,
+                       c.first_name as receiver_first_name,
+                       c.last_name as receiver_last_name
+                FROM Transaction t
+                JOIN Account r ON t.receiver_account_id = r.account_id
+                JOIN Client c ON r.client_id = c.client_id
+                WHERE t.sender_account_id IN (
+                    SELECT account_id FROM Account WHERE client_id = %s
+                )
+                ORDER BY t.transaction_date DESC
+                LIMIT 20
+            """
+            cursor.execute(transactions_query, (client_id,))
+            transactions = cursor.fetchall()
+
+            return jsonify({
+                'client': client,
+                'accounts': accounts,
+                'transactions': transactions
+            })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -222,44 +405,39 @@ def get_client_details(client_id):
 def get_transaction_details(transaction_id):
     """Get detailed information about a specific transaction."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
-                   t.transaction_type, t.status, t.location_coordinates,
-                   t.description, t.fraud_score, t.is_flagged, t.flagged_reason,
-                   s.account_number as sender_account,
-                   r.account_number as receiver_account,
-                   c1.first_name as sender_first_name,
-                   c1.last_name as sender_last_name,
-                   c1.phone_number as sender_phone,
-                   c2.first_name as receiver_first_name,
-                   c2.last_name as receiver_last_name,
-                   c2.phone_number as receiver_phone,
-                   d.device_fingerprint, d.device_type, d.os, d.browser,
-                   i.ip_address, i.country, i.city
-            FROM Transaction t
-            JOIN Account s ON t.sender_account_id = s.account_id
-            JOIN Account r ON t.receiver_account_id = r.account_id
-            JOIN Client c1 ON s.client_id = c1.client_id
-            JOIN Client c2 ON r.client_id = c2.client_id
-            LEFT JOIN Device d ON t.device_id = d.device_id
-            LEFT JOIN IPAddress i ON t.ip_address_id = i.ip_address_id
-            WHERE t.transaction_id = %s
-        """
-        cursor.execute(query, (transaction_id,))
-        transaction = cursor.fetchone()
-        
-        if not transaction:
-            conn.close()
-            return jsonify({'error': 'Transaction not found'}), 404
-        
-        conn.close()
-        return jsonify({'transaction': transaction})
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            query = """
+                SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
+                       t.transaction_type, t.status, t.location_coordinates,
+                       t.description, t.fraud_score, t.is_flagged, t.flagged_reason,
+                       s.account_number as sender_account,
+                       r.account_number as receiver_account,
+                       c1.first_name as sender_first_name,
+                       c1.last_name as sender_last_name,
+                       c1.phone_number as sender_phone,
+                       c2.first_name as receiver_first_name,
+                       c2.last_name as receiver_last_name,
+                       c2.phone_number as receiver_phone,
+                       d.device_fingerprint, d.device_type, d.os, d.browser,
+                       i.ip_address, i.country, i.city
+                FROM Transaction t
+                JOIN Account s ON t.sender_account_id = s.account_id
+                JOIN Account r ON t.receiver_account_id = r.account_id
+                JOIN Client c1 ON s.client_id = c1.client_id
+                JOIN Client c2 ON r.client_id = c2.client_id
+                LEFT JOIN Device d ON t.device_id = d.device_id
+                LEFT JOIN IPAddress i ON t.ip_address_id = i.ip_address_id
+                WHERE t.transaction_id = %s
+            """
+            cursor.execute(query, (transaction_id,))
+            transaction = cursor.fetchone()
+
+            if not transaction:
+                return jsonify({'error': 'Transaction not found'}), 404
+
+            return jsonify({'transaction': transaction})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -274,22 +452,18 @@ def flag_transaction():
         if not transaction_id or not reason:
             return jsonify({'error': 'Missing transaction_id or reason'}), 400
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor()
-        
-        query = """
-            UPDATE Transaction 
-            SET is_flagged = TRUE, flagged_reason = %s 
-            WHERE transaction_id = %s
-        """
-        cursor.execute(query, (reason, transaction_id))
-        conn.commit()
-        
-        conn.close()
-        return jsonify({'success': True, 'message': 'Transaction flagged successfully'})
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            query = """
+                UPDATE Transaction 
+                SET is_flagged = TRUE, flagged_reason = %s 
+                WHERE transaction_id = %s
+            """
+            cursor.execute(query, (reason, transaction_id))
+            conn.commit()
+
+            return jsonify({'success': True, 'message': 'Transaction flagged successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -304,22 +478,18 @@ def block_client():
         if not client_id:
             return jsonify({'error': 'Missing client_id'}), 400
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor()
-        
-        query = """
-            UPDATE Client 
-            SET is_blocked = TRUE 
-            WHERE client_id = %s
-        """
-        cursor.execute(query, (client_id,))
-        conn.commit()
-        
-        conn.close()
-        return jsonify({'success': True, 'message': 'Client blocked successfully'})
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            query = """
+                UPDATE Client 
+                SET is_blocked = TRUE 
+                WHERE client_id = %s
+            """
+            cursor.execute(query, (client_id,))
+            conn.commit()
+
+            return jsonify({'success': True, 'message': 'Client blocked successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -328,25 +498,21 @@ def block_client():
 def get_accounts():
     """Get all active accounts for transaction creation."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT a.account_id, a.account_number, a.account_type, a.balance, a.currency,
-                   c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
-            FROM Account a
-            JOIN Client c ON a.client_id = c.client_id
-            WHERE a.is_active = TRUE
-            ORDER BY c.last_name, c.first_name
-        """
-        cursor.execute(query)
-        accounts = cursor.fetchall()
-        
-        conn.close()
-        return jsonify({'accounts': accounts})
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            query = """
+                SELECT a.account_id, a.account_number, a.account_type, a.balance, a.currency,
+                       c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
+                FROM Account a
+                JOIN Client c ON a.client_id = c.client_id
+                WHERE a.is_active = TRUE
+                ORDER BY c.last_name, c.first_name
+            """
+            cursor.execute(query)
+            accounts = cursor.fetchall()
+
+            return jsonify({'accounts': accounts})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -355,224 +521,299 @@ def get_accounts():
 def create_transaction():
     """Create a new transaction with fraud check."""
     try:
-        data = request.get_json()
-        sender_account_id = data.get('sender_account_id')
-        receiver_account_id = data.get('receiver_account_id')
-        amount = data.get('amount')
-        description = data.get('description', '')
-        
-        # Validation
-        if not all([sender_account_id, receiver_account_id, amount]):
-            return jsonify({'error': 'Missing required fields'}), 400
-        
-        if sender_account_id == receiver_account_id:
-            return jsonify({'error': 'Sender and receiver cannot be the same'}), 400
-        
         try:
-            amount = float(amount)
-            if amount <= 0:
-                return jsonify({'error': 'Amount must be positive'}), 400
-        except ValueError:
-            return jsonify({'error': 'Invalid amount'}), 400
-        
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+            sender_account_id, receiver_account_id, amount, description = parse_transfer_request(request.get_json())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Check sender account and get client info
-        cursor.execute("""
-            SELECT a.account_id, a.balance, a.is_active,
-                   c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
-            FROM Account a
-            JOIN Client c ON a.client_id = c.client_id
-            WHERE a.account_id = %s
-        """, (sender_account_id,))
-        sender = cursor.fetchone()
-        
-        if not sender:
-            conn.close()
-            return jsonify({'error': 'Sender account not found'}), 404
-        
-        if sender['is_blocked']:
-            conn.close()
-            return jsonify({
-                'error': 'Transaction blocked',
-                'reason': 'Sender client is blocked',
-                'fraud_check': {
-                    'passed': False,
-                    'score': 1.0,
-                    'flags': ['BLOCKED_CLIENT']
-                }
-            }), 403
-        
-        if not sender['is_active']:
-            conn.close()
-            return jsonify({'error': 'Sender account is not active'}), 400
-        
-        if sender['balance'] < amount:
-            conn.close()
-            return jsonify({'error': 'Insufficient funds'}), 400
-        
-        # Check receiver account
-        cursor.execute("""
-            SELECT a.account_id, a.is_active,
-                   c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
-            FROM Account a
-            JOIN Client c ON a.client_id = c.client_id
-            WHERE a.account_id = %s
-        """, (receiver_account_id,))
-        receiver = cursor.fetchone()
-        
-        if not receiver:
-            conn.close()
-            return jsonify({'error': 'Receiver account not found'}), 404
-        
-        # Perform fraud check
-        fraud_result = check_fraud(cursor, sender, receiver, amount)
-        
-        # Determine transaction status based on fraud check
-        if fraud_result['score'] >= 0.8:
-            status = 'blocked'
-        elif fraud_result['score'] >= 0.5:
-            status = 'review'
-        else:
-            status = 'completed'
-        
-        # Create the transaction
-        cursor.execute("""
-            INSERT INTO Transaction 
-            (sender_account_id, receiver_account_id, amount, currency, 
-             transaction_type, status, description, fraud_score, is_flagged, flagged_reason)
-            VALUES (%s, %s, %s, 'RUB', 'transfer', %s, %s, %s, %s, %s)
-            RETURNING transaction_id, transaction_date
-        """, (
-            sender_account_id,
-            receiver_account_id,
-            amount,
-            status,
-            description,
-            fraud_result['score'],
-            fraud_result['is_flagged'],
-            fraud_result['reason'] if fraud_result['is_flagged'] else None
-        ))
-        
-        new_transaction = cursor.fetchone()
-        
-        # Update balances if transaction is completed
-        if status == 'completed':
-            cursor.execute("""
-                UPDATE Account SET balance = balance - %s WHERE account_id = %s
-            """, (amount, sender_account_id))
-            cursor.execute("""
-                UPDATE Account SET balance = balance + %s WHERE account_id = %s
-            """, (amount, receiver_account_id))
-        
-        # Create alert if flagged
-        if fraud_result['is_flagged']:
-            severity = 'critical' if fraud_result['score'] >= 0.8 else 'high' if fraud_result['score'] >= 0.6 else 'medium'
-            cursor.execute("""
-                INSERT INTO Alert (transaction_id, client_id, alert_type, severity, status, notes)
-                VALUES (%s, %s, %s, %s, 'open', %s)
-            """, (
-                new_transaction['transaction_id'],
-                sender['client_id'],
-                fraud_result['flags'][0] if fraud_result['flags'] else 'suspicious',
-                severity,
-                fraud_result['reason']
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            # Warm-up and catch-up queries run before the row locks are taken;
+            # only in-memory scoring happens while they are held
+            refresh_fraud_state(conn)
+            conn.commit()
+
+            # Lock both accounts; balances stay valid until commit
+            cursor.execute(TRANSFER_ACCOUNTS_QUERY, (sender_account_id, receiver_account_id))
+            accounts = {row['account_id']: row for row in cursor.fetchall()}
+            sender = accounts.get(sender_account_id)
+            receiver = accounts.get(receiver_account_id)
+
+            if not sender:
+                return jsonify({'error': 'Sender account not found'}), 404
+
+            if sender['is_blocked']:
+                return jsonify({
+                    'error': 'Transaction blocked',
+                    'reason': 'Sender client is blocked',
+                    'fraud_check': {
+                        'passed': False,
+                        'score': 1.0,
+                        'flags': ['BLOCKED_CLIENT']
+                    }
+                }), 403
+
+            if not sender['is_active']:
+                return jsonify({'error': 'Sender account is not active'}), 400
+
+            if sender['balance'] < amount:
+                return jsonify({'error': 'Insufficient funds'}), 400
+
+            if not receiver:
+                return jsonify({'error': 'Receiver account not found'}), 404
+
+            # Perform fraud check
+            fraud_result = evaluate_fraud_rules(sender, receiver, amount, velocity_counts(sender['account_id']))
+
+            # Determine transaction status based on fraud check
+            status = transaction_status(fraud_result['score'])
+
+            # Transaction, balance transfer and alert in one statement
+            cursor.execute(TRANSFER_WRITE_QUERY, transfer_write_params(
+                sender, receiver, amount, description, status, fraud_result
             ))
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'transaction_id': new_transaction['transaction_id'],
-            'transaction_date': new_transaction['transaction_date'].isoformat(),
-            'status': status,
-            'fraud_check': fraud_result,
-            'message': get_status_message(status, fraud_result)
-        })
-        
+            new_transaction = cursor.fetchone()
+
+            # Left to carousel_monitor.record below even if another request's
+            # catch-up sees the committed row first
+            carousel_monitor.claim(new_transaction['transaction_id'])
+            try:
+                conn.commit()
+            except Exception:
+                carousel_monitor.release(new_transaction['transaction_id'])
+                raise
+            # The transfer is committed from here on: a failure below must not
+            # turn it into an error response, or the client may send it again
+            carousels, cluster = [], None
+            try:
+                velocity_store.record(
+                    new_transaction['transaction_id'],
+                    sender['account_id'],
+                    new_transaction['transaction_date'],
+                    amount
+                )
+
+                # A transfer that closes a money loop is alerted on right away
+                carousels = carousel_monitor.record(
+                    new_transaction['transaction_id'],
+                    sender_account_id,
+                    receiver_account_id,
+                    new_transaction['transaction_date'],
+                    amount
+                )
+                for carousel in carousels:
+                    cursor.execute("""
+                        INSERT INTO Alert (transaction_id, client_id, alert_type, severity, status, notes)
+                        VALUES (%s, %s, 'carousel', 'high', 'open', %s)
+                    """, (
+                        new_transaction['transaction_id'],
+                        sender['client_id'],
+                        carousel_alert_note(carousel)
+                    ))
+                if carousels:
+                    conn.commit()
+
+                cluster = cluster_index.record(
+                    new_transaction['transaction_id'],
+                    sender_account_id,
+                    receiver_account_id,
+                    new_transaction['transaction_date']
+                )
+            except Exception:
+                # The catch-up picks up whatever was not recorded
+                carousel_monitor.release(new_transaction['transaction_id'])
+                app.logger.exception('Post-commit processing of transaction %s failed',
+                                     new_transaction['transaction_id'])
+
+            return jsonify({
+                'success': True,
+                'transaction_id': new_transaction['transaction_id'],
+                'transaction_date': new_transaction['transaction_date'].isoformat(),
+                'status': status,
+                'fraud_check': fraud_result,
+                'carousels': carousels,
+                'cluster': cluster,
+                'message': get_status_message(status, fraud_result)
+            })
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def parse_transfer_request(data):
+    """
+    Validate a create-transaction request body.
+
+    Returns:
+        (sender_account_id, receiver_account_id, amount, description)
+
+    Raises:
+        ValueError: With the message returned to the client
+    """
+    data = data or {}
+    sender_account_id = data.get('sender_account_id')
+    receiver_account_id = data.get('receiver_account_id')
+    amount = data.get('amount')
+    description = data.get('description', '')
+
+    if not all([sender_account_id, receiver_account_id, amount]):
+        raise ValueError('Missing required fields')
+
+    try:
+        sender_account_id = int(sender_account_id)
+        receiver_account_id = int(receiver_account_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid account id')
+
+    if sender_account_id == receiver_account_id:
+        raise ValueError('Sender and receiver cannot be the same')
+
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid amount')
+    if amount <= 0:
+        raise ValueError('Amount must be positive')
+
+    return sender_account_id, receiver_account_id, amount, description
+
+
+# Both accounts of a transfer, locked in account_id order so that concurrent
+# transfers between the same accounts queue up instead of deadlocking
+TRANSFER_ACCOUNTS_QUERY = """
+    SELECT a.account_id, a.balance, a.is_active,
+           c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
+    FROM Account a
+    JOIN Client c ON a.client_id = c.client_id
+    WHERE a.account_id IN (%s, %s)
+    ORDER BY a.account_id
+    FOR UPDATE OF a
+"""
+
+# Inserts the transaction, moves the money if it is completed and raises the
+# alert if it is flagged, in one round-trip; parameters from
+# transfer_write_params
+TRANSFER_WRITE_QUERY = """
+    WITH new_transaction AS (
+        INSERT INTO Transaction
+        (sender_account_id, receiver_account_id, amount, currency,
+         transaction_type, status, description, fraud_score, is_flagged, flagged_reason)
+        VALUES (%s, %s, %s, 'RUB', 'transfer', %s, %s, %s, %s, %s)
+        RETURNING transaction_id, transaction_date
+    ), balances AS (
+        UPDATE Account
+        SET balance = balance + CASE WHEN account_id = %s THEN -%s::numeric ELSE %s::numeric END
+        WHERE account_id IN (%s, %s) AND %s::boolean
+    ), alert AS (
+        INSERT INTO Alert (transaction_id, client_id, alert_type, severity, status, notes)
+        SELECT transaction_id, %s::integer, %s::varchar, %s::varchar, 'open', %s::text
+        FROM new_transaction
+        WHERE %s::boolean
+    )
+    SELECT transaction_id, transaction_date FROM new_transaction
+"""
+
+
+def transfer_write_params(sender, receiver, amount, description, status, fraud_result):
+    """Parameters of TRANSFER_WRITE_QUERY."""
+    flagged = fraud_result['is_flagged']
+    return (
+        sender['account_id'],
+        receiver['account_id'],
+        amount,
+        status,
+        description,
+        fraud_result['score'],
+        flagged,
+        fraud_result['reason'] if flagged else None,
+        # Balance transfer
+        sender['account_id'],
+        amount,
+        amount,
+        sender['account_id'],
+        receiver['account_id'],
+        status == 'completed',
+        # Alert
+        sender['client_id'],
+        fraud_result['flags'][0] if fraud_result['flags'] else 'suspicious',
+        alert_severity(fraud_result['score']),
+        fraud_result['reason'],
+        flagged
+    )
+
+
+def transaction_status(score):
+    """Status of a new transaction given its fraud score."""
+    if score >= 0.8:
+        return 'blocked'
+    elif score >= 0.5:
+        return 'review'
+    return 'completed'
+
+
+def alert_severity(score):
+    """Severity of the alert raised for a flagged transaction."""
+    return 'critical' if score >= 0.8 else 'high' if score >= 0.6 else 'medium'
+
+
+def carousel_alert_note(carousel):
+    return 'Карусельная схема: счета {} ({} переводов, {:,.2f} ₽)'.format(
+        ' → '.join(str(a) for a in carousel['account_path']),
+        carousel['transaction_count'],
+        carousel['total_amount']
+    )
+
+
+def refresh_fraud_state(conn):
+    """Warm or catch up the velocity counters, fraud rules, carousel graph and cluster index."""
+    velocity_store.ensure_ready(conn)
+    fraud_rules.ensure_ready(conn)
+    carousel_monitor.ensure_ready(conn)
+    cluster_index.ensure_ready(conn)
+
+
 def check_fraud(cursor, sender, receiver, amount):
     """Check transaction for fraud indicators."""
-    flags = []
-    score = 0.0
-    reasons = []
-    
-    # Rule 1: Large amount (> 100,000)
-    if amount > 100000:
-        flags.append('HIGH_AMOUNT')
-        score += 0.3
-        reasons.append(f'Большая сумма перевода: {amount:,.2f} ₽')
-    elif amount > 50000:
-        flags.append('MEDIUM_AMOUNT')
-        score += 0.15
-        reasons.append(f'Повышенная сумма перевода: {amount:,.2f} ₽')
-    
-    # Rule 2: Sender risk level
-    sender_risk = float(sender['risk_level']) if sender['risk_level'] else 0
-    if sender_risk > 0.5:
-        flags.append('HIGH_RISK_SENDER')
-        score += sender_risk * 0.4
-        reasons.append(f'Высокий риск отправителя: {sender_risk:.2f}')
-    
-    # Rule 3: Receiver risk level
-    receiver_risk = float(receiver['risk_level']) if receiver['risk_level'] else 0
-    if receiver_risk > 0.5:
-        flags.append('HIGH_RISK_RECEIVER')
-        score += receiver_risk * 0.3
-        reasons.append(f'Высокий риск получателя: {receiver_risk:.2f}')
-    
-    # Rule 4: Receiver is blocked
-    if receiver['is_blocked']:
-        flags.append('BLOCKED_RECEIVER')
-        score += 0.5
-        reasons.append('Получатель заблокирован')
-    
-    # Rule 5: Round amount (suspicious pattern)
-    if amount >= 10000 and amount % 10000 == 0:
-        flags.append('ROUND_AMOUNT')
-        score += 0.1
-        reasons.append('Подозрительно круглая сумма')
-    
-    # Rule 6: Check for velocity (multiple transactions in short time)
-    cursor.execute("""
-        SELECT COUNT(*) as tx_count
-        FROM Transaction
-        WHERE sender_account_id = %s
-        AND transaction_date >= NOW() - INTERVAL '1 hour'
-    """, (sender['account_id'],))
-    velocity = cursor.fetchone()
-    if velocity and velocity['tx_count'] >= 5:
-        flags.append('HIGH_VELOCITY')
-        score += 0.25
-        reasons.append(f'Много транзакций за час: {velocity["tx_count"]}')
-    
-    # Rule 7: Night time transaction (00:00 - 06:00)
-    from datetime import datetime
-    current_hour = datetime.now().hour
-    if 0 <= current_hour < 6:
-        flags.append('NIGHT_TRANSACTION')
-        score += 0.15
-        reasons.append('Транзакция в ночное время')
-    
-    # Cap score at 1.0
-    score = min(score, 1.0)
-    
+    velocity_store.ensure_ready(cursor.connection)
+    fraud_rules.ensure_ready(cursor.connection)
+    return evaluate_fraud_rules(sender, receiver, amount, velocity_counts(sender['account_id']))
+
+
+def velocity_counts(account_id):
+    """Transfers sent by the account in each window the fraud rules look at."""
     return {
-        'score': round(score, 2),
-        'is_flagged': score >= 0.4 or len(flags) >= 2,
-        'flags': flags,
-        'reason': '; '.join(reasons) if reasons else None
+        window: velocity_store.count(account_id, window)
+        for window in fraud_rules.plan.velocity_windows
     }
 
 
+def evaluate_fraud_rules(sender, receiver, amount, velocity):
+    """
+    Score a transfer against the compiled fraud rules.
+
+    Args:
+        sender: Sender account row (account_id, risk_level, ...)
+        receiver: Receiver account row (risk_level, is_blocked, ...)
+        amount: Transfer amount
+        velocity: Window name -> transfers sent by the sender account in it
+    """
+    features = transfer_features(sender, receiver, amount, velocity, datetime.now().hour)
+    return score_transfer(fraud_rules.plan, features)
+
+
+def check_fraud_batch(amounts, sender_risks, receiver_risks, receiver_blocked, hours, velocity):
+    """
+    Columnar check_fraud for backfills and replays of historical traffic.
+
+    Takes one NumPy array per input of check_fraud (velocity as a dict of
+    window -> counts, see fraud_rules.plan.velocity_windows) and returns
+    arrays that match check_fraud row for row (see tests/test_rule_engine.py).
+    """
+    return score_transfers(fraud_rules.plan, amounts, sender_risks, receiver_risks,
+                           receiver_blocked, hours, velocity)
+
+
 def get_status_message(status, fraud_result):
     """Get user-friendly status message."""
     if status == 'completed':
@@ -586,52 +827,214 @@ def get_status_message(status, fraud_result):
     return 'Неизвестный статус'
 
 
+def read_dashboard_stats(cursor):
+    """Dashboard counters as a JSON-ready dict."""
+    # Counters are maintained by triggers (see StatsCounter), so this
+    # reads a few hundred rows whatever the size of the tables
+    cursor.execute("SELECT * FROM v_dashboard_stats")
+    return format_dashboard_stats(cursor.fetchone())
+
+
+def format_dashboard_stats(stats):
+    """JSON-ready dict from a v_dashboard_stats row."""
+    return {
+        'total_transactions': stats['total_transactions'],
+        'today_transactions': stats['today_transactions'],
+        'flagged_transactions': stats['flagged_transactions'],
+        'high_risk_clients': stats['high_risk_clients'],
+        'blocked_clients': stats['blocked_clients'],
+        'as_of': stats['as_of'].isoformat(),
+        'last_change': stats['last_change'].isoformat() if stats['last_change'] else None
+    }
+
+
 @app.route('/api/stats')
 def get_stats():
     """Get dashboard statistics."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            return jsonify(read_dashboard_stats(cursor))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Rows behind a batch of dashboard notifications; the date range lets the
+# planner skip unrelated daily partitions
+TRANSACTION_EVENT_QUERY = f"""
+    SELECT {TRANSACTION_LIST_COLUMNS}
+    FROM Transaction t
+    JOIN Account s ON t.sender_account_id = s.account_id
+    JOIN Account r ON t.receiver_account_id = r.account_id
+    JOIN Client c1 ON s.client_id = c1.client_id
+    JOIN Client c2 ON r.client_id = c2.client_id
+    WHERE t.transaction_id = ANY(%s)
+    AND t.transaction_date BETWEEN %s AND %s
+    ORDER BY t.transaction_date, t.transaction_id
+"""
+
+ALERT_EVENT_QUERY = """
+    SELECT a.alert_id, a.transaction_id, a.client_id, a.alert_type,
+           a.severity, a.status, a.created_at, a.notes,
+           c.first_name, c.last_name
+    FROM Alert a
+    LEFT JOIN Client c ON a.client_id = c.client_id
+    WHERE a.alert_id = ANY(%s)
+    ORDER BY a.alert_id
+"""
+
+
+def group_dashboard_notifications(notifications):
+    """
+    Split NOTIFY payloads into transactions (id -> payload) and alert ids.
+
+    An insert followed by an update of the same row in one batch is still
+    reported as an insert.
+    """
+    transactions = {}
+    alert_ids = set()
+    for notification in notifications:
+        if notification.get('table') == 'transaction':
+            key = notification['id']
+            if transactions.get(key, {}).get('op') != 'insert':
+                transactions[key] = notification
+        elif notification.get('table') == 'alert':
+            alert_ids.add(notification['id'])
+    return transactions, sorted(alert_ids)
+
+
+def parse_event_date(value):
+    """
+    transaction_date of a NOTIFY payload.
+
+    Triggers created before the payload switched to a fixed format send
+    json_build_object's timestamp, which drops trailing zeros of the
+    fraction ('...T12:34:56.12345'); datetime.fromisoformat accepts that
+    only from Python 3.11 on, so the fraction is padded to microseconds.
+    """
+    head, dot, fraction = value.partition('.')
+    if dot:
+        value = head + '.' + fraction.ljust(6, '0')
+    return datetime.fromisoformat(value)
+
+
+def transaction_event_params(transactions):
+    dates = [parse_event_date(n['date']) for n in transactions.values()]
+    return list(transactions), min(dates), max(dates)
+
+
+def load_dashboard_events(notifications):
+    """
+    Turn a batch of NOTIFY payloads into dashboard events.
+
+    Rows are read once per batch, whatever the number of connected
+    dashboards; a batch that touched transactions also carries fresh stats.
+    """
+    transactions, alert_ids = group_dashboard_notifications(notifications)
+
+    events = []
+    with get_db_connection() as conn:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Total transactions
-        cursor.execute("SELECT COUNT(*) as total FROM Transaction")
-        total_transactions = cursor.fetchone()['total']
-        
-        # Today's transactions
-        cursor.execute("""
-            SELECT COUNT(*) as today 
-            FROM Transaction 
-            WHERE DATE(transaction_date) = CURRENT_DATE
-        """)
-        today_transactions = cursor.fetchone()['today']
-        
-        # Flagged transactions
-        cursor.execute("SELECT COUNT(*) as flagged FROM Transaction WHERE is_flagged = TRUE")
-        flagged_transactions = cursor.fetchone()['flagged']
-        
-        # High risk clients
-        cursor.execute("SELECT COUNT(*) as high_risk FROM Client WHERE risk_level > 0.5")
-        high_risk_clients = cursor.fetchone()['high_risk']
-        
-        # Blocked clients
-        cursor.execute("SELECT COUNT(*) as blocked FROM Client WHERE is_blocked = TRUE")
-        blocked_clients = cursor.fetchone()['blocked']
-        
-        conn.close()
-        
+
+        if transactions:
+            cursor.execute(TRANSACTION_EVENT_QUERY, transaction_event_params(transactions))
+            for row in cursor.fetchall():
+                row['op'] = transactions[row['transaction_id']]['op']
+                events.append(('transaction', row))
+
+        if alert_ids:
+            cursor.execute(ALERT_EVENT_QUERY, (alert_ids,))
+            events.extend(('alert', row) for row in cursor.fetchall())
+
+        if transactions:
+            events.append(('stats', read_dashboard_stats(cursor)))
+
+    return events
+
+
+# Pushes new transactions, alerts and stats to open dashboards
+dashboard_events = EventHub(
+    DB_CONFIG,
+    load_dashboard_events,
+    history=int(os.environ.get('EVENT_HISTORY', '1000')),
+    heartbeat=float(os.environ.get('EVENT_HEARTBEAT', '15'))
+)
+
+
+@app.route('/api/events')
+def stream_events():
+    """Server-sent events: transaction, alert, stats and reset."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    response = Response(
+        stream_with_context(dashboard_events.subscribe(last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/event-stats')
+def get_event_stats():
+    """Get push channel statistics."""
+    return jsonify(dashboard_events.stats())
+
+
+@app.route('/api/fraud-rules')
+def get_fraud_rules():
+    """Get the compiled fraud rule plan (evaluation order, auto-block rules)."""
+    try:
+        with get_db_connection() as conn:
+            fraud_rules.ensure_ready(conn)
+        return jsonify(fraud_rules.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/account/<int:account_id>/velocity')
+def get_account_velocity(account_id):
+    """Get sliding-window transaction counters for an account."""
+    try:
+        with get_db_connection() as conn:
+            velocity_store.ensure_ready(conn)
         return jsonify({
-            'total_transactions': total_transactions,
-            'today_transactions': today_transactions,
-            'flagged_transactions': flagged_transactions,
-            'high_risk_clients': high_risk_clients,
-            'blocked_clients': blocked_clients
+            'account_id': account_id,
+            'windows': velocity_store.snapshot(account_id)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/account/<int:account_id>/cluster')
+def get_account_cluster(account_id):
+    """Get the transfer-graph cluster an account belongs to."""
+    try:
+        with get_db_connection() as conn:
+            cluster_index.ensure_ready(conn)
+        return jsonify({
+            'account_id': account_id,
+            'cluster': cluster_index.lookup(account_id)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/pool-stats')
+def get_pool_stats():
+    """Get database connection pool statistics."""
+    return jsonify(db_pool.stats())
+
+
 if __name__ == '__main__':
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT maintain_transaction_partitions(%s)", (PARTITION_RETENTION_DAYS,))
+            conn.commit()
+            velocity_store.warm(conn)
+            carousel_monitor.warm(conn)
+            cluster_index.warm(conn)
+            fraud_rules.ensure_ready(conn, force=True)
+    except Exception as e:
+        print(f"Start-up maintenance / warm-up failed, retrying on first request: {e}")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
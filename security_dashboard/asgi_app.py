@@ -0,0 +1,559 @@
+"""
+Asynchronous (ASGI) serving mode for the security dashboard.
+
+Serves the same routes as app.py on Quart with an asyncpg connection pool:
+requests wait for PostgreSQL on one event loop instead of holding one thread
+each, so a single process can keep hundreds of dashboard and
+transaction-creation requests in flight. Query building, fraud rules and
+the in-memory velocity, carousel and cluster state are shared with app.py.
+
+Run from the repository root with:
+    hypercorn security_dashboard.asgi_app:app --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import itertools
+import os
+import re
+
+import asyncpg
+from quart import Quart, jsonify, make_response, render_template, request
+
+from security_dashboard.app import (
+    ALERT_EVENT_QUERY,
+    DB_CONFIG,
+    PARTITION_RETENTION_DAYS,
+    TRANSACTION_EVENT_QUERY,
+    TRANSFER_ACCOUNTS_QUERY,
+    TRANSFER_WRITE_QUERY,
+    build_transaction_page_query,
+    carousel_alert_note,
+    carousel_monitor,
+    cluster_index,
+    evaluate_fraud_rules,
+    finish_transaction_page,
+    format_dashboard_stats,
+    fraud_rules,
+    get_status_message,
+    group_dashboard_notifications,
+    parse_transfer_request,
+    transaction_event_params,
+    transaction_status,
+    transfer_write_params,
+    velocity_counts,
+    velocity_store,
+)
+from security_dashboard.event_stream import AsyncEventHub
+
+app = Quart(__name__, template_folder='templates', static_folder='static')
+
+ASYNC_DB_CONFIG = dict(DB_CONFIG, port=int(DB_CONFIG['port']))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+
+# Created on start-up, once the event loop is running
+db_pool = None
+
+
+def pg(query):
+    """Rewrite psycopg2 ``%s`` placeholders as asyncpg ``$1, $2, ...``."""
+    counter = itertools.count(1)
+    return re.sub(r'%s', lambda _: f'${next(counter)}', query)
+
+
+def db_connection():
+    """Borrow a pooled connection: ``async with db_connection() as conn``."""
+    return db_pool.acquire(timeout=DB_POOL_TIMEOUT)
+
+
+async def fetch_all(query, *args):
+    """Run one query on its own pooled connection and return dict rows."""
+    async with db_connection() as conn:
+        return [dict(row) for row in await conn.fetch(query, *args)]
+
+
+@app.before_serving
+async def startup():
+    global db_pool
+    db_pool = await asyncpg.create_pool(
+        min_size=int(os.environ.get('DB_POOL_MIN', '2')),
+        max_size=int(os.environ.get('DB_POOL_MAX', '20')),
+        max_inactive_connection_lifetime=float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+        **ASYNC_DB_CONFIG
+    )
+    try:
+        async with db_connection() as conn:
+            await conn.execute("SELECT maintain_transaction_partitions($1)", PARTITION_RETENTION_DAYS)
+            await velocity_store.warm_async(conn)
+            await carousel_monitor.warm_async(conn)
+            await cluster_index.warm_async(conn)
+            await fraud_rules.ensure_ready_async(conn, force=True)
+    except Exception as e:
+        print(f"Start-up maintenance / warm-up failed, retrying on first request: {e}")
+
+
+@app.after_serving
+async def shutdown():
+    await dashboard_events.stop()
+    await db_pool.close()
+
+
+@app.route('/')
+async def index():
+    """Main dashboard page."""
+    return await render_template('index.html')
+
+
+async def transaction_page(ordering, base_conditions=()):
+    try:
+        query, params, limit = build_transaction_page_query(request.args, ordering, base_conditions)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = await fetch_all(pg(query), *params)
+    transactions, next_cursor = finish_transaction_page(rows, ordering, limit)
+    return jsonify({'transactions': transactions, 'next_cursor': next_cursor})
+
+
+@app.route('/api/transactions')
+async def get_transactions():
+    """Get transactions with fraud scores, newest first, one keyset page at a time."""
+    try:
+        return await transaction_page('date')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/flagged-transactions')
+async def get_flagged_transactions():
+    """Get transactions flagged as suspicious, highest fraud score first."""
+    try:
+        return await transaction_page('score', base_conditions=['t.is_flagged = TRUE'])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/high-risk-clients')
+async def get_high_risk_clients():
+    """Get clients with high risk levels."""
+    try:
+        clients = await fetch_all("""
+            SELECT client_id, first_name, last_name, phone_number, email,
+                   risk_level, is_blocked
+            FROM Client
+            WHERE risk_level > 0.5 OR is_blocked = TRUE
+            ORDER BY risk_level DESC
+            LIMIT 50
+        """)
+        return jsonify({'clients': clients})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/transaction-patterns')
+async def get_transaction_patterns():
+    """Get transaction patterns for spike detection."""
+    try:
+        patterns = await fetch_all("""
+            SELECT
+                DATE_TRUNC('hour', transaction_date) as hour,
+                COUNT(*) as transaction_count
+            FROM Transaction
+            WHERE transaction_date >= NOW() - INTERVAL '24 hours'
+            GROUP BY DATE_TRUNC('hour', transaction_date)
+            ORDER BY hour
+        """)
+        return jsonify({'patterns': patterns})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/client/<int:client_id>')
+async def get_client_details(client_id):
+    """Get detailed information about a specific client."""
+    try:
+        # The three lookups are independent, so each runs on its own
+        # connection at the same time
+        clients, accounts, transactions = await asyncio.gather(
+            fetch_all("""
+                SELECT client_id, first_name, last_name, date_of_birth,
+                       phone_number, email, registration_date, kyc_status,
+                       risk_level, is_blocked
+                FROM Client
+                WHERE client_id = $1
+            """, client_id),
+            fetch_all("""
+                SELECT account_id, account_number, account_type, balance,
+                       opening_date, is_active
+                FROM Account
+                WHERE client_id = $1
+            """, client_id),
+            fetch_all("""
+                SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
+                       t.status, t.fraud_score, t.is_flagged,
+                       r.account_number as receiver_account,
+                       c.first_name as receiver_first_name,
+                       c.last_name as receiver_last_name
+                FROM Transaction t
+                JOIN Account r ON t.receiver_account_id = r.account_id
+                JOIN Client c ON r.client_id = c.client_id
+                WHERE t.sender_account_id IN (
+                    SELECT account_id FROM Account WHERE client_id = $1
+                )
+                ORDER BY t.transaction_date DESC
+                LIMIT 20
+            """, client_id)
+        )
+
+        if not clients:
+            return jsonify({'error': 'Client not found'}), 404
+
+        return jsonify({
+            'client': clients[0],
+            'accounts': accounts,
+            'transactions': transactions
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/transaction/<int:transaction_id>')
+async def get_transaction_details(transaction_id):
+    """Get detailed information about a specific transaction."""
+    try:
+        rows = await fetch_all("""
+            SELECT t.transaction_id, t.amount, t.currency, t.transaction_date,
+                   t.transaction_type, t.status, t.location_coordinates,
+                   t.description, t.fraud_score, t.is_flagged, t.flagged_reason,
+                   s.account_number as sender_account,
+                   r.account_number as receiver_account,
+                   c1.first_name as sender_first_name,
+                   c1.last_name as sender_last_name,
+                   c1.phone_number as sender_phone,
+                   c2.first_name as receiver_first_name,
+                   c2.last_name as receiver_last_name,
+                   c2.phone_number as receiver_phone,
+                   d.device_fingerprint, d.device_type, d.os, d.browser,
+                   i.ip_address, i.country, i.city
+            FROM Transaction t
+            JOIN Account s ON t.sender_account_id = s.account_id
+            JOIN Account r ON t.receiver_account_id = r.account_id
+            JOIN Client c1 ON s.client_id = c1.client_id
+            JOIN Client c2 ON r.client_id = c2.client_id
+            LEFT JOIN Device d ON t.device_id = d.device_id
+            LEFT JOIN IPAddress i ON t.ip_address_id = i.ip_address_id
+            WHERE t.transaction_id = $1
+        """, transaction_id)
+
+        if not rows:
+            return jsonify({'error': 'Transaction not found'}), 404
+
+        return jsonify({'transaction': rows[0]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/flag-transaction', methods=['POST'])
+async def flag_transaction():
+    """Flag a transaction as suspicious."""
+    try:
+        data = await request.get_json()
+        transaction_id = data.get('transaction_id')
+        reason = data.get('reason')
+
+        if not transaction_id or not reason:
+            return jsonify({'error': 'Missing transaction_id or reason'}), 400
+
+        async with db_connection() as conn:
+            await conn.execute("""
+                UPDATE Transaction
+                SET is_flagged = TRUE, flagged_reason = $1
+                WHERE transaction_id = $2
+            """, reason, int(transaction_id))
+
+        return jsonify({'success': True, 'message': 'Transaction flagged successfully'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/block-client', methods=['POST'])
+async def block_client():
+    """Block a client."""
+    try:
+        data = await request.get_json()
+        client_id = data.get('client_id')
+
+        if not client_id:
+            return jsonify({'error': 'Missing client_id'}), 400
+
+        async with db_connection() as conn:
+            await conn.execute("""
+                UPDATE Client
+                SET is_blocked = TRUE
+                WHERE client_id = $1
+            """, int(client_id))
+
+        return jsonify({'success': True, 'message': 'Client blocked successfully'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/accounts')
+async def get_accounts():
+    """Get all active accounts for transaction creation."""
+    try:
+        accounts = await fetch_all("""
+            SELECT a.account_id, a.account_number, a.account_type, a.balance, a.currency,
+                   c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked
+            FROM Account a
+            JOIN Client c ON a.client_id = c.client_id
+            WHERE a.is_active = TRUE
+            ORDER BY c.last_name, c.first_name
+        """)
+        return jsonify({'accounts': accounts})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/create-transaction', methods=['POST'])
+async def create_transaction():
+    """Create a new transaction with fraud check."""
+    try:
+        try:
+            sender_account_id, receiver_account_id, amount, description = parse_transfer_request(
+                await request.get_json()
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        async with db_connection() as conn:
+            # Warm-up and catch-up queries run before the row locks are
+            # taken; only in-memory scoring happens while they are held
+            await velocity_store.ensure_ready_async(conn)
+            await fraud_rules.ensure_ready_async(conn)
+            await carousel_monitor.ensure_ready_async(conn)
+            await cluster_index.ensure_ready_async(conn)
+
+            new_transaction = None
+            try:
+                async with conn.transaction():
+                    # Lock both accounts; balances stay valid until commit
+                    rows = await conn.fetch(pg(TRANSFER_ACCOUNTS_QUERY), sender_account_id, receiver_account_id)
+                    accounts = {row['account_id']: row for row in rows}
+                    sender = accounts.get(sender_account_id)
+                    receiver = accounts.get(receiver_account_id)
+
+                    if not sender:
+                        return jsonify({'error': 'Sender account not found'}), 404
+
+                    if sender['is_blocked']:
+                        return jsonify({
+                            'error': 'Transaction blocked',
+                            'reason': 'Sender client is blocked',
+                            'fraud_check': {
+                                'passed': False,
+                                'score': 1.0,
+                                'flags': ['BLOCKED_CLIENT']
+                            }
+                        }), 403
+
+                    if not sender['is_active']:
+                        return jsonify({'error': 'Sender account is not active'}), 400
+
+                    if sender['balance'] < amount:
+                        return jsonify({'error': 'Insufficient funds'}), 400
+
+                    if not receiver:
+                        return jsonify({'error': 'Receiver account not found'}), 404
+
+                    # Perform fraud check
+                    fraud_result = evaluate_fraud_rules(sender, receiver, amount, velocity_counts(sender['account_id']))
+
+                    status = transaction_status(fraud_result['score'])
+
+                    # Transaction, balance transfer and alert in one statement
+                    new_transaction = await conn.fetchrow(pg(TRANSFER_WRITE_QUERY), *transfer_write_params(
+                        sender, receiver, amount, description, status, fraud_result
+                    ))
+
+                    # Left to carousel_monitor.record below even if another
+                    # request's catch-up sees the committed row first
+                    carousel_monitor.claim(new_transaction['transaction_id'])
+            except BaseException:
+                if new_transaction is not None:
+                    carousel_monitor.release(new_transaction['transaction_id'])
+                raise
+
+            # The transfer is committed from here on: a failure below must not
+            # turn it into an error response, or the client may send it again
+            carousels, cluster = [], None
+            try:
+                velocity_store.record(
+                    new_transaction['transaction_id'],
+                    sender['account_id'],
+                    new_transaction['transaction_date'],
+                    amount
+                )
+
+                # A transfer that closes a money loop is alerted on right away
+                carousels = carousel_monitor.record(
+                    new_transaction['transaction_id'],
+                    sender['account_id'],
+                    receiver['account_id'],
+                    new_transaction['transaction_date'],
+                    amount
+                )
+                if carousels:
+                    await conn.executemany("""
+                        INSERT INTO Alert (transaction_id, client_id, alert_type, severity, status, notes)
+                        VALUES ($1, $2, 'carousel', 'high', 'open', $3)
+                    """, [
+                        (new_transaction['transaction_id'], sender['client_id'], carousel_alert_note(carousel))
+                        for carousel in carousels
+                    ])
+
+                cluster = cluster_index.record(
+                    new_transaction['transaction_id'],
+                    sender['account_id'],
+                    receiver['account_id'],
+                    new_transaction['transaction_date']
+                )
+            except Exception:
+                # The catch-up picks up whatever was not recorded
+                carousel_monitor.release(new_transaction['transaction_id'])
+                app.logger.exception('Post-commit processing of transaction %s failed',
+                                     new_transaction['transaction_id'])
+
+        return jsonify({
+            'success': True,
+            'transaction_id': new_transaction['transaction_id'],
+            'transaction_date': new_transaction['transaction_date'].isoformat(),
+            'status': status,
+            'fraud_check': fraud_result,
+            'carousels': carousels,
+            'cluster': cluster,
+            'message': get_status_message(status, fraud_result)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/stats')
+async def get_stats():
+    """Get dashboard statistics."""
+    try:
+        async with db_connection() as conn:
+            stats = await conn.fetchrow("SELECT * FROM v_dashboard_stats")
+        return jsonify(format_dashboard_stats(stats))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+async def load_dashboard_events(notifications):
+    """Async counterpart of app.load_dashboard_events."""
+    transactions, alert_ids = group_dashboard_notifications(notifications)
+
+    events = []
+    async with db_connection() as conn:
+        if transactions:
+            rows = await conn.fetch(pg(TRANSACTION_EVENT_QUERY), *transaction_event_params(transactions))
+            for row in rows:
+                row = dict(row)
+                row['op'] = transactions[row['transaction_id']]['op']
+                events.append(('transaction', row))
+
+        if alert_ids:
+            rows = await conn.fetch(pg(ALERT_EVENT_QUERY), alert_ids)
+            events.extend(('alert', dict(row)) for row in rows)
+
+        if transactions:
+            stats = await conn.fetchrow("SELECT * FROM v_dashboard_stats")
+            events.append(('stats', format_dashboard_stats(stats)))
+
+    return events
+
+
+# Pushes new transactions, alerts and stats to open dashboards
+dashboard_events = AsyncEventHub(
+    lambda: asyncpg.connect(**ASYNC_DB_CONFIG),
+    load_dashboard_events,
+    history=int(os.environ.get('EVENT_HISTORY', '1000')),
+    heartbeat=float(os.environ.get('EVENT_HEARTBEAT', '15'))
+)
+
+
+@app.route('/api/events')
+async def stream_events():
+    """Server-sent events: transaction, alert, stats and reset."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    response = await make_response(
+        dashboard_events.subscribe(last_event_id),
+        {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+    # Streams stay open for as long as the dashboard does
+    response.timeout = None
+    return response
+
+
+@app.route('/api/event-stats')
+async def get_event_stats():
+    """Get push channel statistics."""
+    return jsonify(dashboard_events.stats())
+
+
+@app.route('/api/fraud-rules')
+async def get_fraud_rules():
+    """Get the compiled fraud rule plan (evaluation order, auto-block rules)."""
+    try:
+        async with db_connection() as conn:
+            await fraud_rules.ensure_ready_async(conn)
+        return jsonify(fraud_rules.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/account/<int:account_id>/velocity')
+async def get_account_velocity(account_id):
+    """Get sliding-window transaction counters for an account."""
+    try:
+        async with db_connection() as conn:
+            await velocity_store.ensure_ready_async(conn)
+        return jsonify({
+            'account_id': account_id,
+            'windows': velocity_store.snapshot(account_id)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/account/<int:account_id>/cluster')
+async def get_account_cluster(account_id):
+    """Get the transfer-graph cluster an account belongs to."""
+    try:
+        async with db_connection() as conn:
+            await cluster_index.ensure_ready_async(conn)
+        return jsonify({
+            'account_id': account_id,
+            'cluster': cluster_index.lookup(account_id)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/pool-stats')
+async def get_pool_stats():
+    """Get database connection pool statistics."""
+    return jsonify({
+        'size': db_pool.get_size(),
+        'idle': db_pool.get_idle_size(),
+        'in_use': db_pool.get_size() - db_pool.get_idle_size(),
+        'minconn': db_pool.get_min_size(),
+        'maxconn': db_pool.get_max_size()
+    })
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
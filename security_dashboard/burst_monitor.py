@@ -0,0 +1,190 @@
+"""
+Streaming velocity-burst detection.
+
+A burst is a run of transfers from one account with at least
+``threshold_count`` of them inside some ``window_seconds`` span. Transfers
+are consumed in time order; each sender keeps a deque of its transfers in
+the trailing window, so adding one is O(1) amortised and a burst is known
+the moment its window reaches the threshold. Later transfers that keep the
+window at or above the threshold extend the same burst.
+
+BurstDetector is the bare algorithm: the batch detector in
+advanced_fraud_detection.py replays a window of history through it, and
+BurstMonitor feeds it live from TransactionFeed, so both report the same
+bursts for the same transfers as long as each sender's transfers reach the
+monitor in time order. A straggler committed after a later transfer of the
+same sender is still counted, but only over the window ending at its own
+time.
+"""
+
+import bisect
+from collections import deque
+
+from security_dashboard.transaction_feed import TransactionFeed, from_epoch, to_epoch
+
+
+class _Burst:
+    __slots__ = ('client_id', 'account_id', 'transaction_ids', 'amounts', 'first', 'last')
+
+    def __init__(self, client_id, account_id, entries):
+        self.client_id = client_id
+        self.account_id = account_id
+        self.transaction_ids = [transaction_id for _, transaction_id, _ in entries]
+        self.amounts = [amount for _, _, amount in entries]
+        self.first = entries[0][0]
+        self.last = entries[-1][0]
+
+    def extend(self, entries):
+        known = set(self.transaction_ids)
+        for ts, transaction_id, amount in entries:
+            if transaction_id not in known:
+                self.transaction_ids.append(transaction_id)
+                self.amounts.append(amount)
+                self.first = min(self.first, ts)
+                self.last = max(self.last, ts)
+
+    def pattern(self, window_seconds):
+        total = round(sum(self.amounts), 2)
+        return {
+            'pattern_type': 'velocity_burst',
+            'client_id': self.client_id,
+            'account_id': self.account_id,
+            'transaction_ids': sorted(self.transaction_ids),
+            'transaction_count': len(self.transaction_ids),
+            'total_amount': total,
+            'avg_amount': total / len(self.transaction_ids),
+            'time_window_minutes': window_seconds / 60,
+            'first_transaction': from_epoch(self.first),
+            'last_transaction': from_epoch(self.last)
+        }
+
+
+class BurstDetector:
+    """Per-sender sliding windows over transfers fed in time order."""
+
+    def __init__(self, window_seconds=900, threshold_count=5):
+        self.window_seconds = window_seconds
+        self.threshold_count = threshold_count
+        self._windows = {}  # sender -> deque of (ts, transaction_id, amount)
+        self._open = {}     # sender -> its latest burst
+        self._bursts = []   # every burst, in the order they started
+
+    def add(self, transaction_id, ts, sender, client_id, amount):
+        """
+        Add one transfer; returns the burst it starts as a pattern dict, or None.
+
+        A transfer that arrives after a later one of the same sender is
+        slotted into place and counted over the window ending at its own time.
+        """
+        window = self._windows.get(sender)
+        if window is None:
+            window = self._windows[sender] = deque()
+        entry = (ts, transaction_id, float(amount))
+        if not window or ts >= window[-1][0]:
+            window.append(entry)
+            cutoff = ts - self.window_seconds
+            while window[0][0] < cutoff:
+                window.popleft()
+            entries = window
+        else:
+            times = [e[0] for e in window]
+            window.insert(bisect.bisect_right(times, ts), entry)
+            entries = [e for e in window if ts - self.window_seconds <= e[0] <= ts]
+
+        if len(entries) < self.threshold_count:
+            return None
+        burst = self._open.get(sender)
+        if burst is not None and burst.last >= ts - self.window_seconds:
+            burst.extend(entries)
+            return None
+        burst = _Burst(client_id, sender, list(entries))
+        self._open[sender] = burst
+        self._bursts.append(burst)
+        return burst.pattern(self.window_seconds)
+
+    def bursts(self, since=None):
+        """Pattern dicts of the bursts whose last transfer is at or after ``since``."""
+        return [burst.pattern(self.window_seconds) for burst in self._bursts
+                if since is None or burst.last >= since]
+
+    def prune(self, before):
+        """Forget transfers and bursts older than ``before`` (epoch seconds)."""
+        for sender in list(self._windows):
+            window = self._windows[sender]
+            while window and window[0][0] < before - self.window_seconds:
+                window.popleft()
+            if not window:
+                del self._windows[sender]
+        self._bursts = [burst for burst in self._bursts if burst.last >= before]
+        self._open = {sender: burst for sender, burst in self._open.items() if burst.last >= before}
+
+
+class BurstMonitor(TransactionFeed):
+    COLUMNS = ('sender_account_id, '
+               '(SELECT a.client_id FROM Account a WHERE a.account_id = Transaction.sender_account_id), '
+               'amount')
+    CURSOR_NAME = 'burst_warm'
+
+    def __init__(self, window_seconds=900, threshold_count=5, history_seconds=None,
+                 sync_interval=5.0, overlap_seconds=60.0):
+        """
+        Initialize an empty monitor.
+
+        Args:
+            window_seconds: Span in which ``threshold_count`` transfers make a burst
+            threshold_count: Transfers from one account that make a burst
+            history_seconds: Span of transaction_date loaded by warm() and
+                kept afterwards (defaults to ``window_seconds``)
+            sync_interval: Minimum seconds between catch-up queries for
+                transactions inserted by other processes
+            overlap_seconds: Span of recent transactions re-read by every
+                catch-up for transfers that committed out of id order
+        """
+        super().__init__(history_seconds or window_seconds, sync_interval, overlap_seconds)
+        self.burst_window_seconds = window_seconds
+        self.threshold_count = threshold_count
+        self.detector = BurstDetector(window_seconds, threshold_count)
+        self._started = []
+
+    # ------------------------------------------------------------------
+    # TransactionFeed hooks
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        self.detector = BurstDetector(self.burst_window_seconds, self.threshold_count)
+        self._started.clear()
+
+    def _apply(self, transaction_id, ts, sender, client_id, amount):
+        burst = self.detector.add(transaction_id, ts, sender, client_id, amount)
+        if burst is not None:
+            self._started.append(burst)
+
+    def _settle(self):
+        self.detector.prune(self.now() - self.window_seconds)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def record(self, transaction_id, sender_account_id, client_id, transaction_date, amount):
+        """Record a committed transfer; returns the burst it starts, or None."""
+        ts = to_epoch(transaction_date)
+        with self._lock:
+            self._claimed.discard(transaction_id)
+            if not self._admit(transaction_id, ts):
+                return None
+            burst = self.detector.add(transaction_id, ts, sender_account_id, client_id, amount)
+            if burst is not None:
+                self._started.append(burst)
+            return burst
+
+    def started(self):
+        """Bursts started since the last call, as they looked when they started."""
+        with self._lock:
+            started, self._started = self._started, []
+            return started
+
+    def bursts(self):
+        """Every burst with a transfer inside the history span, with its current totals."""
+        with self._lock:
+            return self.detector.bursts(since=self.now() - self.window_seconds)
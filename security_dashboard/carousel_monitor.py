@@ -0,0 +1,213 @@
+"""
+Incremental carousel detection for newly committed transfers.
+
+Keeps the transfers of a sliding time window as an in-memory temporal graph
+(time-sorted out- and in-edge lists per account). When a transfer A->B is
+recorded, only the short time-respecting paths B->...->A that it closes are
+searched for, instead of re-running the batch cycle search over the whole
+window. Edges older than the window are aged out as new transfers arrive.
+"""
+
+import bisect
+from collections import deque
+
+from security_dashboard.transaction_feed import TransactionFeed, to_epoch
+
+
+class CarouselMonitor(TransactionFeed):
+    COLUMNS = 'sender_account_id, receiver_account_id, amount'
+    CURSOR_NAME = 'carousel_warm'
+
+    def __init__(self, window_seconds=86400, min_length=3, max_length=6,
+                 max_expansions=20000, max_cycles=10, sync_interval=5.0,
+                 overlap_seconds=60.0):
+        """
+        Initialize an empty monitor.
+
+        Args:
+            window_seconds: Span of the temporal graph; older edges are dropped
+            min_length: Minimum number of transfers in a reported cycle
+            max_length: Maximum number of transfers in a reported cycle
+            max_expansions: Search steps allowed per transfer, which bounds
+                the latency of a single check on dense graphs
+            max_cycles: Cycles reported per transfer at most
+            sync_interval: Minimum seconds between catch-up queries for
+                transactions inserted by other processes
+            overlap_seconds: Span of recent transactions re-read by every
+                catch-up for transfers that committed out of id order
+        """
+        super().__init__(window_seconds, sync_interval, overlap_seconds)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_expansions = max_expansions
+        self.max_cycles = max_cycles
+        self._out = {}     # account -> ([ts], [(receiver, transaction_id, amount)])
+        self._in = {}      # account -> ([ts], [sender])
+        self._edges = deque()  # (ts, sender, receiver) in arrival order, for aging
+        self._newest = 0.0
+
+    @property
+    def edge_count(self):
+        return len(self._edges)
+
+    # ------------------------------------------------------------------
+    # Graph maintenance
+    # ------------------------------------------------------------------
+
+    def _insert(self, transaction_id, sender, receiver, ts, amount):
+        times, edges = self._out.setdefault(sender, ([], []))
+        i = bisect.bisect_right(times, ts)
+        times.insert(i, ts)
+        edges.insert(i, (receiver, transaction_id, amount))
+
+        times, senders = self._in.setdefault(receiver, ([], []))
+        i = bisect.bisect_right(times, ts)
+        times.insert(i, ts)
+        senders.insert(i, sender)
+
+        self._edges.append((ts, sender, receiver))
+        self._newest = max(self._newest, ts)
+
+    def _expire(self):
+        cutoff = self._newest - self.window_seconds
+        # Edges arrive roughly in time order; a late straggler only delays
+        # aging of the edges queued behind it until it expires itself
+        while self._edges and self._edges[0][0] < cutoff:
+            _, sender, receiver = self._edges.popleft()
+            for index, account in ((self._out, sender), (self._in, receiver)):
+                entry = index.get(account)
+                if entry is None:
+                    continue
+                times, values = entry
+                drop = bisect.bisect_left(times, cutoff)
+                del times[:drop]
+                del values[:drop]
+                if not times:
+                    del index[account]
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _latest_departures(self, target, hops, not_before, before):
+        """
+        lat[k][x]: latest time x can send and still reach ``target`` within
+        k time-ordered transfers that all happen in [not_before, before).
+        """
+        lat = [{target: before}]
+        frontier = lat[0]
+        for _ in range(hops):
+            current = dict(lat[-1])
+            for y, deadline in frontier.items():
+                entry = self._in.get(y)
+                if entry is None:
+                    continue
+                times, senders = entry
+                lo = bisect.bisect_left(times, not_before)
+                hi = bisect.bisect_left(times, deadline, lo)
+                for j in range(lo, hi):
+                    if times[j] > current.get(senders[j], -1.0):
+                        current[senders[j]] = times[j]
+            frontier = {x: t for x, t in current.items() if t != lat[-1].get(x)}
+            if not frontier:
+                lat.extend([current] * (hops - len(lat) + 1))
+                break
+            lat.append(current)
+        return lat
+
+    def _find_cycles(self, sender, receiver, ts):
+        """Time-ordered paths receiver->...->sender that end before ``ts``."""
+        hops = self.max_length - 1
+        # Edges before the aging cutoff may already be gone, so never use them
+        not_before = max(ts, self._newest) - self.window_seconds
+        lat = self._latest_departures(sender, hops, not_before, ts)
+        if lat[hops].get(receiver, -1.0) < not_before:
+            return []
+
+        found = []
+        budget = [self.max_expansions]
+        path_nodes = [receiver]
+        on_path = {sender, receiver}
+        path_edges = []
+
+        def extend(node, now):
+            remaining = hops - len(path_edges)
+            entry = self._out.get(node)
+            if entry is None:
+                return
+            times, edges = entry
+            # The first hop may start exactly at the window edge
+            lo = bisect.bisect_right(times, now) if path_edges else bisect.bisect_left(times, now)
+            hi = bisect.bisect_right(times, lat[remaining].get(node, -1.0), lo)
+            for j in range(lo, hi):
+                budget[0] -= 1
+                if budget[0] < 0 or len(found) >= self.max_cycles:
+                    return
+                nxt, transaction_id, amount = edges[j]
+                t = times[j]
+                if nxt == sender:
+                    if len(path_edges) + 2 >= self.min_length:
+                        found.append((list(path_nodes) + [sender],
+                                      path_edges + [(transaction_id, amount, t)]))
+                elif nxt not in on_path and remaining > 1 and lat[remaining - 1].get(nxt, -1.0) > t:
+                    path_nodes.append(nxt)
+                    on_path.add(nxt)
+                    path_edges.append((transaction_id, amount, t))
+                    extend(nxt, t)
+                    path_edges.pop()
+                    on_path.discard(nxt)
+                    path_nodes.pop()
+
+        extend(receiver, not_before)
+        return found
+
+    def record(self, transaction_id, sender_account_id, receiver_account_id, transaction_date, amount):
+        """
+        Record a committed transfer and return the carousels it closes.
+
+        Claim the transfer before its commit so that a concurrent catch-up
+        cannot add it to the graph first, which would leave it unsearched.
+
+        Each carousel is a dict with the account path (starting and ending at
+        the sender), the transaction ids in time order and the total amount.
+        """
+        ts = to_epoch(transaction_date)
+        amount = float(amount)
+        with self._lock:
+            self._claimed.discard(transaction_id)
+            if not self._admit(transaction_id, ts):
+                return []
+            cycles = self._find_cycles(sender_account_id, receiver_account_id, ts)
+            self._insert(transaction_id, sender_account_id, receiver_account_id, ts, amount)
+            self._expire()
+
+        results = []
+        for path, edges in cycles:
+            transaction_ids = [e[0] for e in edges] + [transaction_id]
+            results.append({
+                'pattern_type': 'carousel',
+                'account_path': [sender_account_id] + path,
+                'transaction_ids': transaction_ids,
+                'total_amount': round(sum(e[1] for e in edges) + amount, 2),
+                'transaction_count': len(transaction_ids),
+                'duration_seconds': round(ts - edges[0][2], 3)
+            })
+        return results
+
+    # ------------------------------------------------------------------
+    # TransactionFeed hooks
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        self._out.clear()
+        self._in.clear()
+        self._edges.clear()
+        self._newest = 0.0
+
+    def _apply(self, transaction_id, ts, sender, receiver, amount):
+        # Transfers of other writers are only added to the graph; the
+        # cycles they close are left to the process that committed them
+        self._insert(transaction_id, sender, receiver, ts, float(amount))
+
+    def _settle(self):
+        self._expire()
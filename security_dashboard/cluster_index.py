@@ -0,0 +1,282 @@
+"""
+Connected clusters of the transfer graph, kept up to date as transfers arrive.
+
+analyze_network_clusters() recomputes every component of the window from
+scratch. ClusterIndex keeps them instead: each account pair seen in the
+window is an undirected edge, and a union-find keyed by account_id merges
+the clusters of its two accounts when a new pair appears. Every account
+points straight at its cluster id (the id of the cluster's root account),
+so looking up an account's cluster is one dict access; a merge relabels the
+members of the smaller cluster, which is O(log n) amortised per account.
+
+Union-find cannot split a cluster when a pair leaves the window, so the
+index is rebuilt from the pairs still in the window every
+``rebuild_seconds``. Until then a cluster can only be too large, never too
+small.
+
+save() writes the clusters and memberships that changed since the last save
+to NetworkCluster and AccountCluster, where the dashboard and the detectors
+can read them with one primary key lookup (see load_account_cluster).
+"""
+
+import psycopg2.extras
+
+from security_dashboard.transaction_feed import TransactionFeed, to_epoch
+
+
+CLUSTER_UPSERT_QUERY = """
+    INSERT INTO NetworkCluster (cluster_id, cluster_size, edge_count, density, risk_score)
+    VALUES %s
+    ON CONFLICT (cluster_id) DO UPDATE SET
+        cluster_size = EXCLUDED.cluster_size,
+        edge_count = EXCLUDED.edge_count,
+        density = EXCLUDED.density,
+        risk_score = EXCLUDED.risk_score,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+MEMBER_UPSERT_QUERY = """
+    INSERT INTO AccountCluster (account_id, cluster_id)
+    VALUES %s
+    ON CONFLICT (account_id) DO UPDATE SET
+        cluster_id = EXCLUDED.cluster_id,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+ACCOUNT_CLUSTER_QUERY = """
+    SELECT c.cluster_id, c.cluster_size, c.edge_count, c.density, c.risk_score
+    FROM AccountCluster a
+    JOIN NetworkCluster c ON c.cluster_id = a.cluster_id
+    WHERE a.account_id = %s
+"""
+
+
+def cluster_risk(cluster_size, density):
+    """Risk score of a cluster, as used by analyze_network_clusters()."""
+    risk = 0.4
+    risk += min(cluster_size * 0.02, 0.3)
+    risk += min(density * 0.5, 0.3)
+    return min(risk, 1.0)
+
+
+def load_account_cluster(conn, account_id):
+    """Stored cluster of an account as a dict, or None if it is in none."""
+    with conn.cursor() as cursor:
+        cursor.execute(ACCOUNT_CLUSTER_QUERY, (account_id,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        'cluster_id': row[0],
+        'cluster_size': row[1],
+        'edge_count': row[2],
+        'density': float(row[3]),
+        'risk_score': float(row[4])
+    }
+
+
+class ClusterIndex(TransactionFeed):
+    COLUMNS = 'sender_account_id, receiver_account_id'
+    CURSOR_NAME = 'cluster_warm'
+
+    def __init__(self, window_seconds=7 * 86400, rebuild_seconds=3600.0,
+                 sync_interval=5.0, overlap_seconds=60.0):
+        """
+        Initialize an empty index.
+
+        Args:
+            window_seconds: Span of transaction_date whose account pairs
+                make up the graph
+            rebuild_seconds: Seconds between rebuilds that drop the pairs
+                that have left the window
+            sync_interval: Minimum seconds between catch-up queries for
+                transactions inserted by other processes
+            overlap_seconds: Span of recent transactions re-read by every
+                catch-up for transfers that committed out of id order
+        """
+        super().__init__(window_seconds, sync_interval, overlap_seconds)
+        self.rebuild_seconds = rebuild_seconds
+        self._pairs = {}       # (lower account, higher account) -> latest ts
+        self._cluster = {}     # account -> cluster id
+        self._members = {}     # cluster id -> [accounts]
+        self._edges = {}       # cluster id -> pairs inside the cluster
+        self._last_rebuild = None
+        # Changes not yet written by save()
+        self._moved = set()    # accounts whose cluster id changed
+        self._changed = set()  # clusters whose size or edge count changed
+        self._gone = set()     # accounts and clusters that may have to be deleted
+        self._replace = False  # a warm-up replaced everything
+
+    @property
+    def cluster_count(self):
+        return len(self._members)
+
+    # ------------------------------------------------------------------
+    # Union-find
+    # ------------------------------------------------------------------
+
+    def _add_pair(self, sender, receiver, ts):
+        pair = (sender, receiver) if sender <= receiver else (receiver, sender)
+        if pair in self._pairs:
+            self._pairs[pair] = max(self._pairs[pair], ts)
+            return
+        self._pairs[pair] = ts
+        for account in pair:
+            if account not in self._cluster:
+                self._cluster[account] = account
+                self._members[account] = [account]
+                self._edges[account] = 0
+                self._moved.add(account)
+
+        root, other = self._cluster[pair[0]], self._cluster[pair[1]]
+        if root != other:
+            if len(self._members[root]) < len(self._members[other]):
+                root, other = other, root
+            # The smaller cluster joins the larger one
+            members = self._members.pop(other)
+            for account in members:
+                self._cluster[account] = root
+            self._members[root].extend(members)
+            self._edges[root] += self._edges.pop(other)
+            self._moved.update(members)
+            self._gone.add(other)
+        self._edges[root] += 1
+        self._changed.add(root)
+
+    def _rebuild(self, now):
+        cutoff = now - self.window_seconds
+        old_cluster = self._cluster
+        old_stats = {root: (len(members), self._edges[root]) for root, members in self._members.items()}
+        # Pairs are replayed in the order they first appeared, so clusters
+        # that lost nothing get the same roots as before
+        pairs = [(pair, ts) for pair, ts in self._pairs.items() if ts >= cutoff]
+        moved, changed, gone = self._moved, self._changed, self._gone
+
+        self._pairs, self._cluster, self._members, self._edges = {}, {}, {}, {}
+        self._moved, self._changed, self._gone = set(), set(), set()
+        for (a, b), ts in pairs:
+            self._add_pair(a, b, ts)
+
+        self._moved = moved | {a for a, root in self._cluster.items() if old_cluster.get(a) != root}
+        self._changed = changed | {root for root, members in self._members.items()
+                                   if old_stats.get(root) != (len(members), self._edges[root])}
+        self._gone = gone | (set(old_cluster) - set(self._cluster)) | (set(old_stats) - set(self._members))
+        self._last_rebuild = now
+
+    # ------------------------------------------------------------------
+    # TransactionFeed hooks
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        # The next save() replaces the stored rows, which may also hold
+        # accounts this process has never seen
+        self._replace = True
+        self._moved.clear()
+        self._changed.clear()
+        self._gone.clear()
+        self._pairs.clear()
+        self._cluster.clear()
+        self._members.clear()
+        self._edges.clear()
+        self._last_rebuild = None
+
+    def _apply(self, transaction_id, ts, sender, receiver):
+        self._add_pair(sender, receiver, ts)
+
+    def _settle(self):
+        now = self.now()
+        if self._last_rebuild is None:
+            # A warm-up only loads pairs inside the window
+            self._last_rebuild = now
+        elif now - self._last_rebuild >= self.rebuild_seconds:
+            self._rebuild(now)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _describe(self, root):
+        size = len(self._members[root])
+        edges = self._edges[root]
+        density = 2.0 * edges / (size * (size - 1)) if size > 1 else 0.0
+        return {
+            'cluster_id': root,
+            'cluster_size': size,
+            'edge_count': edges,
+            'density': density,
+            'risk_score': cluster_risk(size, density)
+        }
+
+    def record(self, transaction_id, sender_account_id, receiver_account_id, transaction_date):
+        """Record a committed transfer; returns the sender's cluster afterwards."""
+        ts = to_epoch(transaction_date)
+        with self._lock:
+            if self._admit(transaction_id, ts):
+                self._add_pair(sender_account_id, receiver_account_id, ts)
+            root = self._cluster.get(sender_account_id)
+            return None if root is None else self._describe(root)
+
+    def lookup(self, account_id):
+        """Cluster of the account as a dict, or None if it sent or received nothing in the window."""
+        with self._lock:
+            root = self._cluster.get(account_id)
+            return None if root is None else self._describe(root)
+
+    def members(self, cluster_id):
+        """Accounts of a cluster, sorted."""
+        with self._lock:
+            return sorted(self._members.get(cluster_id, ()))
+
+    def rebuild(self):
+        """Drop the pairs that have left the window now instead of at the next due rebuild."""
+        with self._lock:
+            self._rebuild(self.now())
+
+    def save(self, conn, page_size=1000):
+        """
+        Write the clusters and memberships changed since the last save.
+
+        The first save after a warm-up rewrites both tables. Runs in the
+        caller's transaction; if writing fails the changes are kept for the
+        next save.
+
+        Returns:
+            {'clusters': ..., 'accounts': ..., 'deleted': ...} rows written
+        """
+        with self._lock:
+            replace, moved, changed, gone = self._replace, self._moved, self._changed, self._gone
+            self._replace = False
+            self._moved, self._changed, self._gone = set(), set(), set()
+            if replace:
+                moved, changed = set(self._cluster), set(self._members)
+            clusters = [self._describe(root) for root in changed if root in self._members]
+            accounts = [(a, self._cluster[a]) for a in moved if a in self._cluster]
+            dropped_clusters = [c for c in gone if c not in self._members]
+            dropped_accounts = [a for a in gone if a not in self._cluster]
+
+        try:
+            with conn.cursor() as cursor:
+                if replace:
+                    cursor.execute("DELETE FROM AccountCluster")
+                    cursor.execute("DELETE FROM NetworkCluster")
+                if dropped_accounts:
+                    cursor.execute("DELETE FROM AccountCluster WHERE account_id = ANY(%s)", (dropped_accounts,))
+                if dropped_clusters:
+                    cursor.execute("DELETE FROM NetworkCluster WHERE cluster_id = ANY(%s)", (dropped_clusters,))
+                if clusters:
+                    psycopg2.extras.execute_values(cursor, CLUSTER_UPSERT_QUERY, [
+                        (c['cluster_id'], c['cluster_size'], c['edge_count'],
+                         round(c['density'], 5), round(c['risk_score'], 2))
+                        for c in clusters
+                    ], page_size=page_size)
+                if accounts:
+                    psycopg2.extras.execute_values(cursor, MEMBER_UPSERT_QUERY, accounts, page_size=page_size)
+        except Exception:
+            with self._lock:
+                self._replace |= replace
+                self._moved |= moved
+                self._changed |= changed
+                self._gone |= gone
+            raise
+        return {'clusters': len(clusters), 'accounts': len(accounts),
+                'deleted': len(dropped_accounts) + len(dropped_clusters)}
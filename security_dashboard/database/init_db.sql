@@ -65,14 +65,17 @@ CREATE TABLE IF NOT EXISTS IPAddress (
     last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Таблица транзакций
+-- Таблица транзакций, секционированная по дням (transaction_date).
+-- Запросы за последние часы/дни читают только нужные секции, а удаление
+-- старых данных сводится к DROP TABLE. Первичный ключ обязан включать ключ
+-- секционирования, поэтому ссылки на транзакцию хранятся без внешнего ключа.
 CREATE TABLE IF NOT EXISTS Transaction (
-    transaction_id SERIAL PRIMARY KEY,
+    transaction_id SERIAL,
     sender_account_id INTEGER NOT NULL REFERENCES Account(account_id),
     receiver_account_id INTEGER NOT NULL REFERENCES Account(account_id),
     amount DECIMAL(15,2) NOT NULL CHECK (amount > 0),
     currency VARCHAR(3) DEFAULT 'RUB',
-    transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    transaction_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     transaction_type VARCHAR(30) DEFAULT 'transfer' CHECK (transaction_type IN ('transfer', 'payment', 'withdrawal', 'deposit')),
     status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'completed', 'failed', 'blocked', 'review')),
     location_coordinates VARCHAR(100),
@@ -81,8 +84,102 @@ CREATE TABLE IF NOT EXISTS Transaction (
     ip_address_id INTEGER REFERENCES IPAddress(ip_address_id),
     fraud_score DECIMAL(3,2) DEFAULT 0.0 CHECK (fraud_score >= 0 AND fraud_score <= 1),
     is_flagged BOOLEAN DEFAULT FALSE,
-    flagged_reason TEXT
-);
+    flagged_reason TEXT,
+    -- Баллы правил при последней пакетной переоценке (fraud_detection.py)
+    batch_score DECIMAL(7,2),
+    rescored_at TIMESTAMP,
+    PRIMARY KEY (transaction_id, transaction_date)
+) PARTITION BY RANGE (transaction_date);
+
+-- Секция по умолчанию для дней без своей секции (до очередного обслуживания)
+CREATE TABLE IF NOT EXISTS transaction_default PARTITION OF Transaction DEFAULT;
+
+-- Создание дневной секции transaction_pYYYYMMDD для p_day, если её ещё нет
+CREATE OR REPLACE FUNCTION create_transaction_partition(p_day DATE)
+RETURNS TEXT AS $$
+DECLARE
+    partition_name TEXT := 'transaction_p' || to_char(p_day, 'YYYYMMDD');
+    lower_bound TIMESTAMP := p_day;
+    upper_bound TIMESTAMP := p_day + 1;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM transaction_default
+               WHERE transaction_date >= lower_bound AND transaction_date < upper_bound) THEN
+        -- Строки за этот день уже лежат в секции по умолчанию: переносим их
+        -- в отдельную таблицу и затем подключаем её как секцию
+        EXECUTE format('CREATE TABLE %I (LIKE transaction INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM transaction_default WHERE transaction_date >= %L AND transaction_date < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            lower_bound, upper_bound, partition_name);
+        EXECUTE format('ALTER TABLE transaction ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    ELSE
+        EXECUTE format('CREATE TABLE %I PARTITION OF transaction FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Создание дневных секций для всех дней из [p_from, p_to]
+CREATE OR REPLACE FUNCTION create_transaction_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    current_day DATE := p_from;
+    created INTEGER := 0;
+BEGIN
+    WHILE current_day <= p_to LOOP
+        IF to_regclass('transaction_p' || to_char(current_day, 'YYYYMMDD')) IS NULL THEN
+            PERFORM create_transaction_partition(current_day);
+            created := created + 1;
+        END IF;
+        current_day := current_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Удаление секций старше срока хранения и заблаговременное создание новых.
+-- Запускается ежедневно (cron, pg_cron или при старте приложения); выполняется
+-- с правами владельца, поэтому доступна и пользователю приложения.
+CREATE OR REPLACE FUNCTION maintain_transaction_partitions(
+    p_retention_days INTEGER DEFAULT 90,
+    p_premake_days INTEGER DEFAULT 7
+) RETURNS INTEGER AS $$
+DECLARE
+    cutoff DATE := CURRENT_DATE - p_retention_days;
+    first_day DATE;
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'transaction'::regclass
+        AND c.relname ~ '^transaction_p[0-9]{8}$'
+        AND to_date(substring(c.relname FROM 14), 'YYYYMMDD') < cutoff
+    LOOP
+        EXECUTE format('DROP TABLE %I', part.relname);
+    END LOOP;
+
+    DELETE FROM transaction_default WHERE transaction_date < cutoff;
+
+    IF to_regprocedure('compact_stats_counters(date)') IS NOT NULL THEN
+        PERFORM compact_stats_counters(cutoff);
+    END IF;
+
+    -- Строки, попавшие в секцию по умолчанию, тоже переносятся в свои секции
+    SELECT LEAST(MIN(transaction_date)::DATE, CURRENT_DATE) INTO first_day FROM transaction_default;
+    RETURN create_transaction_partitions(COALESCE(first_day, CURRENT_DATE), CURRENT_DATE + p_premake_days);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Секции за последний месяц (тестовые данные) и на неделю вперёд
+SELECT create_transaction_partitions(CURRENT_DATE - 30, CURRENT_DATE + 7);
 
 -- Таблица правил антифрода
 CREATE TABLE IF NOT EXISTS FraudRule (
@@ -93,13 +190,22 @@ CREATE TABLE IF NOT EXISTS FraudRule (
     threshold_value DECIMAL(15,2),
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Параметры правила для движка скоринга (rule_engine.py): код проверки,
+    -- набор правил (transfer - проверка нового перевода, batch - пересчёт),
+    -- вес, окно, порядок вычисления и немедленная блокировка при срабатывании
+    rule_code VARCHAR(50),
+    rule_set VARCHAR(20) DEFAULT 'transfer' CHECK (rule_set IN ('transfer', 'batch')),
+    weight DECIMAL(5,2) DEFAULT 1.0,
+    time_window VARCHAR(20),
+    priority INTEGER DEFAULT 1,
+    auto_block BOOLEAN DEFAULT FALSE
 );
 
 -- Таблица алертов
 CREATE TABLE IF NOT EXISTS Alert (
     alert_id SERIAL PRIMARY KEY,
-    transaction_id INTEGER REFERENCES Transaction(transaction_id),
+    transaction_id INTEGER,
     client_id INTEGER REFERENCES Client(client_id),
     rule_id INTEGER REFERENCES FraudRule(rule_id),
     alert_type VARCHAR(50),
@@ -128,9 +234,9 @@ CREATE TABLE IF NOT EXISTS AuditLog (
 -- СОЗДАНИЕ ИНДЕКСОВ
 -- =====================================================
 
-CREATE INDEX IF NOT EXISTS idx_transaction_date ON Transaction(transaction_date);
-CREATE INDEX IF NOT EXISTS idx_transaction_sender ON Transaction(sender_account_id);
-CREATE INDEX IF NOT EXISTS idx_transaction_receiver ON Transaction(receiver_account_id);
+CREATE INDEX IF NOT EXISTS idx_transaction_date ON Transaction(transaction_date DESC, transaction_id DESC);
+CREATE INDEX IF NOT EXISTS idx_transaction_sender ON Transaction(sender_account_id, transaction_date DESC, transaction_id DESC);
+CREATE INDEX IF NOT EXISTS idx_transaction_receiver ON Transaction(receiver_account_id, transaction_date DESC, transaction_id DESC);
 CREATE INDEX IF NOT EXISTS idx_transaction_flagged ON Transaction(is_flagged);
 CREATE INDEX IF NOT EXISTS idx_transaction_fraud_score ON Transaction(fraud_score);
 CREATE INDEX IF NOT EXISTS idx_client_risk ON Client(risk_level);
@@ -138,6 +244,13 @@ CREATE INDEX IF NOT EXISTS idx_client_blocked ON Client(is_blocked);
 CREATE INDEX IF NOT EXISTS idx_account_client ON Account(client_id);
 CREATE INDEX IF NOT EXISTS idx_alert_status ON Alert(status);
 CREATE INDEX IF NOT EXISTS idx_alert_severity ON Alert(severity);
+CREATE INDEX IF NOT EXISTS idx_alert_transaction ON Alert(transaction_id);
+
+-- Постраничный вывод списков транзакций по ключу (keyset): каждая сортировка
+-- и каждый фильтр читаются диапазоном индекса сразу после курсора
+CREATE INDEX IF NOT EXISTS idx_transaction_status_keyset ON Transaction(status, transaction_date DESC, transaction_id DESC);
+CREATE INDEX IF NOT EXISTS idx_transaction_flagged_keyset ON Transaction(COALESCE(fraud_score, 0) DESC, transaction_date DESC, transaction_id DESC)
+    WHERE is_flagged;
 
 -- =====================================================
 -- ЗАПОЛНЕНИЕ ТЕСТОВЫМИ ДАННЫМИ
@@ -218,17 +331,20 @@ INSERT INTO IPAddress (ip_address, country, city, is_proxy, is_vpn, is_tor, risk
 ('80.78.90.123', 'Россия', 'Воронеж', FALSE, FALSE, FALSE, 0.1);
 
 -- Правила антифрода
-INSERT INTO FraudRule (rule_name, rule_description, rule_type, threshold_value, is_active) VALUES
-('Большая сумма перевода', 'Транзакция превышает 100,000 рублей', 'amount', 100000.00, TRUE),
-('Подозрительный IP', 'Транзакция с IP через VPN/Tor/Proxy', 'ip_check', NULL, TRUE),
-('Множественные переводы', 'Более 10 переводов за час', 'velocity', 10.00, TRUE),
-('Новое устройство', 'Транзакция с неизвестного устройства', 'device', NULL, TRUE),
-('Ночные транзакции', 'Транзакции между 00:00 и 06:00', 'time', NULL, TRUE),
-('Круглая сумма', 'Подозрительно круглые суммы перевода', 'pattern', NULL, TRUE),
-('Географическая аномалия', 'Транзакция из другой страны', 'geo', NULL, TRUE),
-('Высокий риск получателя', 'Получатель с высоким уровнем риска', 'recipient', 0.5, TRUE),
-('Новый клиент большой перевод', 'Большой перевод от нового клиента', 'new_client', 50000.00, TRUE),
-('Частая смена устройств', 'Клиент использует много разных устройств', 'device_velocity', 5.00, TRUE);
+INSERT INTO FraudRule (rule_name, rule_description, rule_type, threshold_value, is_active, rule_code, weight, time_window, priority, auto_block) VALUES
+('Большая сумма перевода', 'Транзакция превышает 100,000 рублей', 'amount', 100000.00, TRUE, 'HIGH_AMOUNT', 0.30, NULL, 1, FALSE),
+('Подозрительный IP', 'Транзакция с IP через VPN/Tor/Proxy', 'ip_check', NULL, TRUE, NULL, 1.0, NULL, 1, FALSE),
+('Множественные переводы', '5 и более переводов за час', 'velocity', 5.00, TRUE, 'HIGH_VELOCITY', 0.25, '1hour', 6, FALSE),
+('Новое устройство', 'Транзакция с неизвестного устройства', 'device', NULL, TRUE, NULL, 1.0, NULL, 1, FALSE),
+('Ночные транзакции', 'Транзакции между 00:00 и 06:00', 'time', NULL, TRUE, 'NIGHT_TRANSACTION', 0.15, '00:00-06:00', 7, FALSE),
+('Круглая сумма', 'Суммы от 10,000 рублей, кратные 10,000', 'pattern', 10000.00, TRUE, 'ROUND_AMOUNT', 0.10, NULL, 5, FALSE),
+('Географическая аномалия', 'Транзакция из другой страны', 'geo', NULL, TRUE, NULL, 1.0, NULL, 1, FALSE),
+('Высокий риск получателя', 'Получатель с высоким уровнем риска', 'recipient', 0.50, TRUE, 'HIGH_RISK_RECEIVER', 0.30, NULL, 3, FALSE),
+('Новый клиент большой перевод', 'Большой перевод от нового клиента', 'new_client', 50000.00, TRUE, NULL, 1.0, NULL, 1, FALSE),
+('Частая смена устройств', 'Клиент использует много разных устройств', 'device_velocity', 5.00, TRUE, NULL, 1.0, NULL, 1, FALSE),
+('Повышенная сумма перевода', 'Транзакция от 50,000 до 100,000 рублей', 'amount', 50000.00, TRUE, 'MEDIUM_AMOUNT', 0.15, NULL, 1, FALSE),
+('Высокий риск отправителя', 'Отправитель с высоким уровнем риска', 'sender', 0.50, TRUE, 'HIGH_RISK_SENDER', 0.40, NULL, 2, FALSE),
+('Заблокированный получатель', 'Перевод заблокированному клиенту', 'recipient', NULL, TRUE, 'BLOCKED_RECEIVER', 0.50, NULL, 4, FALSE);
 
 -- Транзакции (генерация за последние 7 дней)
 INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, currency, transaction_date, transaction_type, status, device_id, ip_address_id, fraud_score, is_flagged, flagged_reason) VALUES
@@ -358,7 +474,9 @@ GROUP BY c.client_id, c.first_name, c.last_name, c.risk_level, c.is_blocked;
 -- ФУНКЦИИ
 -- =====================================================
 
--- Функция для расчёта fraud score
+-- Функция для расчёта fraud score. Пороги и веса суммы берутся из тех же
+-- строк FraudRule (HIGH_AMOUNT, MEDIUM_AMOUNT), что использует rule_engine.py;
+-- риск отправителя, ночное время и VPN/Tor считаются по своей формуле
 CREATE OR REPLACE FUNCTION calculate_fraud_score(
     p_amount DECIMAL,
     p_is_vpn BOOLEAN,
@@ -368,13 +486,18 @@ CREATE OR REPLACE FUNCTION calculate_fraud_score(
 ) RETURNS DECIMAL AS $$
 DECLARE
     score DECIMAL := 0.0;
+    blocked BOOLEAN := FALSE;
 BEGIN
-    -- Базовый скор от суммы
-    IF p_amount > 100000 THEN
-        score := score + 0.3;
-    ELSIF p_amount > 50000 THEN
-        score := score + 0.15;
-    END IF;
+    -- Скор от суммы: срабатывает самый высокий превышенный порог FraudRule
+    SELECT COALESCE(MAX(weight), 0), COALESCE(BOOL_OR(auto_block), FALSE)
+    INTO score, blocked
+    FROM (
+        SELECT weight, auto_block FROM FraudRule
+        WHERE is_active AND rule_set = 'transfer'
+        AND rule_code IN ('HIGH_AMOUNT', 'MEDIUM_AMOUNT') AND p_amount > threshold_value
+        ORDER BY threshold_value DESC
+        LIMIT 1
+    ) tier;
     
     -- VPN/Tor
     IF p_is_tor THEN
@@ -391,15 +514,195 @@ BEGIN
         score := score + 0.1;
     END IF;
     
-    -- Ограничение максимума
-    IF score > 1.0 THEN
+    -- Ограничение максимума; правило с auto_block сразу даёт максимум
+    IF blocked OR score > 1.0 THEN
         score := 1.0;
     END IF;
     
     RETURN ROUND(score, 2);
 END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- =====================================================
+-- СЧЁТЧИКИ ДАШБОРДА
+-- =====================================================
+
+-- Счётчики дашборда поддерживаются триггерами, поэтому /api/stats не
+-- сканирует Transaction и Client. Каждый backend пишет в свой слот, чтобы не
+-- было «горячей» строки при параллельных вставках. Дневные метрики хранятся
+-- по дате транзакции (при удалении секции удаляются и её дни), метрики
+-- клиентов - в корзине DATE 'epoch'.
+CREATE TABLE IF NOT EXISTS StatsCounter (
+    metric VARCHAR(50) NOT NULL,
+    bucket_date DATE NOT NULL,
+    slot SMALLINT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, bucket_date, slot)
+);
+
+CREATE OR REPLACE FUNCTION bump_stats_counter(p_metric VARCHAR, p_bucket DATE, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO StatsCounter (metric, bucket_date, slot, value, updated_at)
+    VALUES (p_metric, p_bucket, pg_backend_pid() % 16, p_delta, LOCALTIMESTAMP)
+    ON CONFLICT (metric, bucket_date, slot)
+    DO UPDATE SET value = StatsCounter.value + EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+END;
 $$ LANGUAGE plpgsql;
 
+CREATE OR REPLACE FUNCTION track_transaction_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_stats_counter('transactions', NEW.transaction_date::DATE, 1);
+        IF NEW.is_flagged THEN
+            PERFORM bump_stats_counter('flagged_transactions', NEW.transaction_date::DATE, 1);
+        END IF;
+    ELSIF COALESCE(OLD.is_flagged, FALSE) <> COALESCE(NEW.is_flagged, FALSE) THEN
+        PERFORM bump_stats_counter('flagged_transactions', NEW.transaction_date::DATE,
+                                   CASE WHEN NEW.is_flagged THEN 1 ELSE -1 END);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_track_transaction_stats ON Transaction;
+CREATE TRIGGER trigger_track_transaction_stats
+    AFTER INSERT OR UPDATE OF is_flagged ON Transaction
+    FOR EACH ROW
+    EXECUTE FUNCTION track_transaction_stats();
+
+CREATE OR REPLACE FUNCTION track_client_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_high_risk INTEGER := 0;
+    new_high_risk INTEGER := 0;
+    old_blocked INTEGER := 0;
+    new_blocked INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_high_risk := (COALESCE(OLD.risk_level, 0) > 0.5)::INTEGER;
+        old_blocked := COALESCE(OLD.is_blocked, FALSE)::INTEGER;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_high_risk := (COALESCE(NEW.risk_level, 0) > 0.5)::INTEGER;
+        new_blocked := COALESCE(NEW.is_blocked, FALSE)::INTEGER;
+    END IF;
+    PERFORM bump_stats_counter('high_risk_clients', DATE 'epoch', new_high_risk - old_high_risk);
+    PERFORM bump_stats_counter('blocked_clients', DATE 'epoch', new_blocked - old_blocked);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_track_client_stats ON Client;
+CREATE TRIGGER trigger_track_client_stats
+    AFTER INSERT OR UPDATE OF risk_level, is_blocked OR DELETE ON Client
+    FOR EACH ROW
+    EXECUTE FUNCTION track_client_stats();
+
+-- Удаление дней до p_cutoff и свёртка слотов прошедших дней в слот 0;
+-- вызывается из maintain_transaction_partitions()
+CREATE OR REPLACE FUNCTION compact_stats_counters(p_cutoff DATE)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM StatsCounter WHERE bucket_date > DATE 'epoch' AND bucket_date < p_cutoff;
+
+    WITH folded AS (
+        DELETE FROM StatsCounter
+        WHERE bucket_date > DATE 'epoch' AND bucket_date < CURRENT_DATE AND slot <> 0
+        RETURNING metric, bucket_date, value
+    )
+    INSERT INTO StatsCounter (metric, bucket_date, slot, value)
+    SELECT metric, bucket_date, 0, SUM(value) FROM folded GROUP BY metric, bucket_date
+    ON CONFLICT (metric, bucket_date, slot)
+    DO UPDATE SET value = StatsCounter.value + EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Полный пересчёт по исходным таблицам (после массовой загрузки с
+-- отключёнными триггерами или для сверки)
+CREATE OR REPLACE FUNCTION refresh_stats_counters()
+RETURNS VOID AS $$
+BEGIN
+    -- Пишущие транзакции ждут окончания пересчёта на обновлении счётчика,
+    -- поэтому ничего не теряется и не считается дважды
+    LOCK TABLE StatsCounter IN EXCLUSIVE MODE;
+    DELETE FROM StatsCounter;
+    INSERT INTO StatsCounter (metric, bucket_date, slot, value)
+    SELECT 'transactions', transaction_date::DATE, 0, COUNT(*) FROM Transaction GROUP BY 2
+    UNION ALL
+    SELECT 'flagged_transactions', transaction_date::DATE, 0, COUNT(*) FROM Transaction WHERE is_flagged GROUP BY 2
+    UNION ALL
+    SELECT 'high_risk_clients', DATE 'epoch', 0, COUNT(*) FROM Client WHERE risk_level > 0.5
+    UNION ALL
+    SELECT 'blocked_clients', DATE 'epoch', 0, COUNT(*) FROM Client WHERE is_blocked;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Сводка для дашборда одной строкой; as_of - момент чтения счётчиков
+CREATE OR REPLACE VIEW v_dashboard_stats AS
+SELECT
+    COALESCE(SUM(value) FILTER (WHERE metric = 'transactions'), 0)::BIGINT AS total_transactions,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'transactions' AND bucket_date = CURRENT_DATE), 0)::BIGINT AS today_transactions,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'flagged_transactions'), 0)::BIGINT AS flagged_transactions,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'high_risk_clients'), 0)::BIGINT AS high_risk_clients,
+    COALESCE(SUM(value) FILTER (WHERE metric = 'blocked_clients'), 0)::BIGINT AS blocked_clients,
+    MAX(updated_at) AS last_change,
+    LOCALTIMESTAMP AS as_of
+FROM StatsCounter;
+
+-- Начальные значения для уже загруженных тестовых данных
+SELECT refresh_stats_counters();
+
+-- =====================================================
+-- УВЕДОМЛЕНИЯ ДАШБОРДА (LISTEN/NOTIFY)
+-- =====================================================
+
+-- Новые транзакции, смена статуса или пометки и оповещения отправляют
+-- короткое уведомление в канал dashboard_events; приложение само читает
+-- строки и рассылает их открытым панелям (/api/events). Уведомления
+-- доставляются при фиксации транзакции и отбрасываются при откате.
+CREATE OR REPLACE FUNCTION notify_transaction_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_events', json_build_object(
+        'table', 'transaction',
+        'op', lower(TG_OP),
+        'id', NEW.transaction_id,
+        'date', to_char(NEW.transaction_date, 'YYYY-MM-DD"T"HH24:MI:SS.US')
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_transaction ON Transaction;
+CREATE TRIGGER trigger_notify_transaction
+    AFTER INSERT OR UPDATE OF status, is_flagged, fraud_score ON Transaction
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_transaction_event();
+
+CREATE OR REPLACE FUNCTION notify_alert_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_events', json_build_object(
+        'table', 'alert',
+        'op', lower(TG_OP),
+        'id', NEW.alert_id
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_alert ON Alert;
+CREATE TRIGGER trigger_notify_alert
+    AFTER INSERT OR UPDATE OF status ON Alert
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_alert_event();
+
 -- =====================================================
 -- ВЫДАЧА ПРАВ (после создания пользователя)
 -- =====================================================
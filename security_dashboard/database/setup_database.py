@@ -34,6 +34,9 @@ DB_NAME = 'antifraud_p2p'
 DB_USER = 'antifraud_user'
 DB_PASSWORD = 'antifraud_pass'
 
+# Срок хранения транзакций в днях (секции старше удаляются)
+PARTITION_RETENTION_DAYS = int(os.environ.get('PARTITION_RETENTION_DAYS', '90'))
+
 
 def create_database_and_user():
     """Создание базы данных и пользователя."""
@@ -136,12 +139,26 @@ def init_schema():
         cursor.execute(f"GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO {DB_USER}")
         conn.commit()
         
-        # Проверка созданных таблиц
+        # Обслуживание секций транзакций: удаление устаревших, создание новых
+        cursor.execute("SELECT maintain_transaction_partitions(%s)", (PARTITION_RETENTION_DAYS,))
+        conn.commit()
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM pg_inherits
+            WHERE inhparent = 'transaction'::regclass
+        """)
+        partitions = cursor.fetchone()[0]
+        print(f"      ✓ Секций таблицы transaction: {partitions} (хранение {PARTITION_RETENTION_DAYS} дн.)")
+
+        # Проверка созданных таблиц (секции считаются вместе с родительской таблицей)
         cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            ORDER BY table_name
+            SELECT c.relname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+            AND c.relkind IN ('r', 'p')
+            AND NOT c.relispartition
+            ORDER BY c.relname
         """)
         tables = cursor.fetchall()
         
@@ -208,7 +225,7 @@ def main():
     print(f"  Database: {DB_NAME}")
     print(f"  User: {DB_USER}")
     print(f"  Password: {DB_PASSWORD}")
-    print("\nТеперь можно запустить приложение: python app.py")
+    print("\nТеперь можно запустить приложение: python -m security_dashboard.app")
     print("=" * 60 + "\n")
     
     return True
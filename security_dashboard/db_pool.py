@@ -0,0 +1,250 @@
+"""
+Thread-safe PostgreSQL connection pool for the security dashboard.
+
+Wraps psycopg2 connections with a bounded pool: connections are opened on
+demand up to ``maxconn``, at least ``minconn`` are kept warm, checkouts wait
+up to ``timeout`` seconds for a free slot, idle connections are health-checked
+before being handed out and connections past ``max_lifetime`` are recycled.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolError(Exception):
+    """Raised when a connection cannot be obtained from the pool."""
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, db_config, minconn=1, maxconn=10, timeout=5.0,
+                 max_lifetime=1800.0, health_check_after=30.0):
+        """
+        Initialize the pool.
+
+        Args:
+            db_config: Keyword arguments for psycopg2.connect
+            minconn: Number of connections kept open while idle
+            maxconn: Upper bound on open connections
+            timeout: Seconds a checkout waits for a free connection
+            max_lifetime: Seconds after which a connection is recycled
+            health_check_after: Idle seconds after which a connection is
+                pinged with ``SELECT 1`` before being handed out
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError('Invalid pool size: minconn=%s maxconn=%s' % (minconn, maxconn))
+
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()      # (conn, created_at, returned_at)
+        self._in_use = {}         # id(conn) -> created_at
+        self._closed = False
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+        self._checkouts = 0
+        self._timeouts = 0
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        try:
+            conn = psycopg2.connect(**self.db_config)
+        except psycopg2.Error as e:
+            raise PoolError(f'Database connection failed: {e}') from e
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _expired(self, created_at):
+        return self.max_lifetime is not None and time.monotonic() - created_at > self.max_lifetime
+
+    def getconn(self, timeout=None):
+        """
+        Check a connection out of the pool.
+
+        Args:
+            timeout: Overrides the pool-wide checkout timeout
+
+        Returns:
+            An open psycopg2 connection
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolError('Connection pool is closed')
+
+                candidate = None
+                reserve_slot = False
+                self._waiting += 1
+                try:
+                    while not self._idle and len(self._in_use) >= self.maxconn:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f'No database connection available within {timeout:.1f}s'
+                            )
+                        self._lock.wait(remaining)
+                        if self._closed:
+                            raise PoolError('Connection pool is closed')
+                finally:
+                    self._waiting -= 1
+
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    reserve_slot = True
+                # Reserve the slot before releasing the lock so concurrent
+                # checkouts cannot overshoot maxconn while we connect.
+                token = object()
+                self._in_use[id(token)] = None
+
+            if reserve_slot:
+                try:
+                    conn = self._open()
+                except Exception:
+                    self._release_slot(token)
+                    raise
+                self._claim(token, conn, time.monotonic())
+                return conn
+
+            conn, created_at, returned_at = candidate
+            if self._expired(created_at) or not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                with self._lock:
+                    self._recycled += 1
+                try:
+                    conn = self._open()
+                except Exception:
+                    self._release_slot(token)
+                    raise
+                created_at = time.monotonic()
+            self._claim(token, conn, created_at)
+            return conn
+
+    def _claim(self, token, conn, created_at):
+        with self._lock:
+            del self._in_use[id(token)]
+            self._in_use[id(conn)] = created_at
+            self._checkouts += 1
+
+    def _release_slot(self, token):
+        with self._lock:
+            self._in_use.pop(id(token), None)
+            self._lock.notify()
+
+    def putconn(self, conn, close=False):
+        """
+        Return a connection to the pool.
+
+        Any open transaction is rolled back so the next borrower starts from a
+        clean state; broken or expired connections are closed instead.
+        """
+        with self._lock:
+            created_at = self._in_use.pop(id(conn), None)
+        if created_at is None:
+            self._discard(conn)
+            return
+
+        if not close and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._lock:
+            expired = self._expired(created_at) and len(self._idle) + len(self._in_use) >= self.minconn
+            if self._closed or close or conn.closed or expired:
+                if not conn.closed:
+                    self._recycled += 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a ``with`` block."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def warm(self):
+        """Open connections until ``minconn`` are available."""
+        opened = []
+        with self._lock:
+            missing = self.minconn - len(self._idle) - len(self._in_use)
+        for _ in range(max(missing, 0)):
+            opened.append(self._open())
+        with self._lock:
+            now = time.monotonic()
+            for conn in opened:
+                self._idle.append((conn, now, now))
+            self._lock.notify_all()
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
+
+    def stats(self):
+        """Return pool counters for capacity planning."""
+        with self._lock:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': len(self._idle) + len(self._in_use),
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'created': self._created,
+                'recycled': self._recycled,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+            }
@@ -0,0 +1,366 @@
+"""
+Push channel for the dashboard: PostgreSQL LISTEN/NOTIFY fanned out as
+server-sent events.
+
+Triggers on Transaction and Alert send a small NOTIFY (table, operation and
+key) on the ``dashboard_events`` channel. A single background thread holds
+one dedicated LISTEN connection, coalesces notifications that arrive close
+together and hands each batch to a loader, which turns it into dashboard
+events with one query per table. Events go into a bounded history shared by
+all subscribers, so the database work does not grow with the number of open
+dashboards, and a client that reconnects with ``Last-Event-ID`` resumes
+where it left off. AsyncEventHub does the same on asyncpg for the ASGI app.
+"""
+
+import asyncio
+import json
+import select
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+
+import psycopg2
+from psycopg2 import extensions
+
+CHANNEL = 'dashboard_events'
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def format_event(event_id, event_type, data):
+    """Encode one event in the text/event-stream wire format."""
+    payload = json.dumps(data, default=_json_default, ensure_ascii=False)
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+def decode_payloads(raw_payloads):
+    """Decode NOTIFY payloads, dropping duplicates and malformed ones."""
+    payloads = []
+    seen = set()
+    for raw in raw_payloads:
+        if raw in seen:
+            continue
+        seen.add(raw)
+        try:
+            payloads.append(json.loads(raw))
+        except ValueError:
+            continue
+    return payloads
+
+
+def resume_position(events, last_id, last_event_id):
+    """
+    Event id a new subscriber starts after, or None if it must reset.
+
+    A client resuming from an event that has already left the history (or
+    from before a server restart) cannot be caught up.
+    """
+    if last_event_id is None:
+        return last_id
+    oldest = events[0][0] if events else last_id + 1
+    if last_event_id < oldest - 1 or last_event_id > last_id:
+        return None
+    return last_event_id
+
+
+class EventHub:
+    def __init__(self, db_config, loader, history=1000, coalesce=0.2,
+                 heartbeat=15.0, reconnect_delay=2.0):
+        """
+        Initialize the hub; the listener thread starts with the first subscriber.
+
+        Args:
+            db_config: Keyword arguments for psycopg2.connect (LISTEN connection)
+            loader: Callable taking a list of decoded NOTIFY payloads and
+                returning a list of (event_type, data) pairs
+            history: Events kept for clients that reconnect
+            coalesce: Seconds to keep collecting notifications after the
+                first one of a batch
+            heartbeat: Seconds between keep-alive comments on idle streams
+            reconnect_delay: Seconds to wait before re-opening a lost
+                LISTEN connection
+        """
+        self.db_config = db_config
+        self.loader = loader
+        self.coalesce = coalesce
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self._events = deque(maxlen=history)  # (event_id, event_type, data)
+        self._last_id = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._subscribers = 0
+        self._notifications = 0
+        self._errors = 0
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def publish(self, event_type, data):
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, event_type, data))
+            self._cond.notify_all()
+
+    def _listen(self, conn):
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+
+        while not self._stopped:
+            if select.select([conn], [], [], self.heartbeat) == ([], [], []):
+                continue
+            conn.poll()
+            if not conn.notifies:
+                continue
+            # Let a burst (e.g. a multi-row insert) settle into one batch
+            deadline = time.monotonic() + self.coalesce
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or select.select([conn], [], [], remaining) == ([], [], []):
+                    break
+                conn.poll()
+
+            payloads = decode_payloads(notify.payload for notify in conn.notifies)
+            conn.notifies.clear()
+            self._notifications += len(payloads)
+
+            for event_type, data in self.loader(payloads):
+                self.publish(event_type, data)
+
+    def _run(self):
+        first = True
+        while not self._stopped:
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.db_config)
+                if not first:
+                    # Notifications sent while disconnected are lost
+                    self.publish('reset', {})
+                first = False
+                self._listen(conn)
+            except Exception as e:
+                self._errors += 1
+                print(f'Dashboard event listener error, reconnecting: {e}')
+                time.sleep(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name='dashboard-events', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+
+    # ------------------------------------------------------------------
+    # Subscribing
+    # ------------------------------------------------------------------
+
+    def subscribe(self, last_event_id=None):
+        """
+        Yield the event stream for one client as text/event-stream chunks.
+
+        A client resuming from an event that has already left the history
+        gets a ``reset`` event and should reload its views.
+        """
+        self.start()
+        with self._cond:
+            self._subscribers += 1
+            position = resume_position(self._events, self._last_id, last_event_id)
+
+        try:
+            yield f'retry: {int(self.reconnect_delay * 1000)}\n\n'
+            if position is None:
+                with self._cond:
+                    position = self._last_id
+                yield format_event(position, 'reset', {})
+
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._last_id > position, timeout=self.heartbeat)
+                    pending = [event for event in self._events if event[0] > position]
+                if not pending:
+                    yield ': keep-alive\n\n'
+                    continue
+                if pending[0][0] > position + 1:
+                    # Fell behind by more than the history holds
+                    yield format_event(pending[0][0] - 1, 'reset', {})
+                for event_id, event_type, data in pending:
+                    yield format_event(event_id, event_type, data)
+                position = pending[-1][0]
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'listening': self._thread is not None and self._thread.is_alive(),
+                'subscribers': self._subscribers,
+                'last_event_id': self._last_id,
+                'notifications': self._notifications,
+                'errors': self._errors
+            }
+
+
+class AsyncEventHub:
+    def __init__(self, connect, loader, history=1000, coalesce=0.2,
+                 heartbeat=15.0, reconnect_delay=2.0):
+        """
+        asyncio counterpart of EventHub for the ASGI app.
+
+        Args:
+            connect: Coroutine function returning a dedicated asyncpg
+                connection for LISTEN
+            loader: Coroutine function taking a list of decoded NOTIFY
+                payloads and returning a list of (event_type, data) pairs
+            history: Events kept for clients that reconnect
+            coalesce: Seconds to keep collecting notifications after the
+                first one of a batch
+            heartbeat: Seconds between keep-alive comments on idle streams
+            reconnect_delay: Seconds to wait before re-opening a lost
+                LISTEN connection
+        """
+        self.connect = connect
+        self.loader = loader
+        self.coalesce = coalesce
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self._cond = None
+        self._task = None
+        self._subscribers = 0
+        self._notifications = 0
+        self._errors = 0
+
+    def _condition(self):
+        # Created lazily so that it binds to the serving event loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def publish(self, event_type, data):
+        cond = self._condition()
+        async with cond:
+            self._last_id += 1
+            self._events.append((self._last_id, event_type, data))
+            cond.notify_all()
+
+    async def _listen(self, conn):
+        queue = asyncio.Queue()
+        await conn.add_listener(CHANNEL, lambda _conn, _pid, _channel, payload: queue.put_nowait(payload))
+
+        while True:
+            try:
+                first = await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+            except asyncio.TimeoutError:
+                # Notifications give no sign of a dead connection; probe it
+                await conn.execute('SELECT 1')
+                continue
+            # Let a burst (e.g. a multi-row insert) settle into one batch
+            await asyncio.sleep(self.coalesce)
+            raw = [first]
+            while not queue.empty():
+                raw.append(queue.get_nowait())
+
+            payloads = decode_payloads(raw)
+            self._notifications += len(payloads)
+            for event_type, data in await self.loader(payloads):
+                await self.publish(event_type, data)
+
+    async def _run(self):
+        first = True
+        while True:
+            conn = None
+            try:
+                conn = await self.connect()
+                if not first:
+                    # Notifications sent while disconnected are lost
+                    await self.publish('reset', {})
+                first = False
+                await self._listen(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._errors += 1
+                print(f'Dashboard event listener error, reconnecting: {e}')
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def subscribe(self, last_event_id=None):
+        """Async generator counterpart of EventHub.subscribe."""
+        self.start()
+        cond = self._condition()
+        async with cond:
+            self._subscribers += 1
+            position = resume_position(self._events, self._last_id, last_event_id)
+
+        try:
+            yield f'retry: {int(self.reconnect_delay * 1000)}\n\n'
+            if position is None:
+                position = self._last_id
+                yield format_event(position, 'reset', {})
+
+            while True:
+                async with cond:
+                    try:
+                        await asyncio.wait_for(
+                            cond.wait_for(lambda: self._last_id > position), timeout=self.heartbeat
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    pending = [event for event in self._events if event[0] > position]
+                if not pending:
+                    yield ': keep-alive\n\n'
+                    continue
+                if pending[0][0] > position + 1:
+                    # Fell behind by more than the history holds
+                    yield format_event(pending[0][0] - 1, 'reset', {})
+                for event_id, event_type, data in pending:
+                    yield format_event(event_id, event_type, data)
+                position = pending[-1][0]
+        finally:
+            self._subscribers -= 1
+
+    def stats(self):
+        return {
+            'listening': self._task is not None and not self._task.done(),
+            'subscribers': self._subscribers,
+            'last_event_id': self._last_id,
+            'notifications': self._notifications,
+            'errors': self._errors
+        }
@@ -25,8 +25,137 @@ function initializeDashboard() {
     // Initialize charts
     initializeCharts();
     
-    // Set up periodic data refresh
-    setInterval(refreshCurrentView, 30000); // Refresh every 30 seconds
+    // Live updates; polling every 30 seconds only while the stream is down
+    startEventStream();
+}
+
+// Server-sent events stream and its polling fallback
+let eventSource = null;
+let refreshTimer = null;
+
+function startPolling() {
+    if (!refreshTimer) {
+        refreshTimer = setInterval(refreshCurrentView, 30000);
+    }
+}
+
+function stopPolling() {
+    if (refreshTimer) {
+        clearInterval(refreshTimer);
+        refreshTimer = null;
+    }
+}
+
+function startEventStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    eventSource = new EventSource('/api/events');
+    eventSource.addEventListener('open', stopPolling);
+    // The browser reconnects by itself and resumes from the last event id
+    eventSource.addEventListener('error', startPolling);
+    eventSource.addEventListener('transaction', e => applyTransactionEvent(JSON.parse(e.data)));
+    eventSource.addEventListener('alert', e => applyAlertEvent(JSON.parse(e.data)));
+    eventSource.addEventListener('stats', e => renderStats(JSON.parse(e.data)));
+    // Events were missed (server restart or a long disconnect)
+    eventSource.addEventListener('reset', refreshCurrentView);
+}
+
+// Apply a new or changed transaction to the tables that show it
+function applyTransactionEvent(tx) {
+    const isNew = tx.op === 'insert';
+    
+    // All transactions, newest first
+    const tbody = document.querySelector('#transactions-table tbody');
+    const status = document.getElementById('transaction-status-filter').value;
+    const matches = !status || status === tx.status;
+    const existing = tbody.querySelector(`tr[data-id="${tx.transaction_id}"]`);
+    if (existing) {
+        if (matches) {
+            existing.replaceWith(createTransactionRow(tx));
+        } else {
+            existing.remove();
+        }
+    } else if (isNew && matches && tbody.querySelector('tr[data-id]') !== null) {
+        tbody.prepend(createTransactionRow(tx));
+    } else if (isNew && matches && tbody.querySelector('td.text-muted')) {
+        // Replace the "no transactions" placeholder
+        tbody.innerHTML = '';
+        tbody.appendChild(createTransactionRow(tx));
+    }
+    
+    // Flagged transactions, highest score first
+    const flaggedBody = document.querySelector('#flagged-table tbody');
+    const flaggedRow = flaggedBody.querySelector(`tr[data-id="${tx.transaction_id}"]`);
+    if (flaggedRow) flaggedRow.remove();
+    if (tx.is_flagged) {
+        if (flaggedBody.querySelector('td.text-muted')) flaggedBody.innerHTML = '';
+        if (flaggedRow || flaggedBody.querySelector('tr[data-id]') !== null || !flaggedBody.children.length) {
+            insertByScore(flaggedBody, createFlaggedRow(tx), tx.fraud_score);
+        }
+    }
+    
+    // Top flagged on the overview
+    const recent = document.getElementById('recent-flagged');
+    const recentItem = recent.querySelector(`[data-id="${tx.transaction_id}"]`);
+    if (recentItem) recentItem.remove();
+    if (tx.is_flagged) {
+        if (!recent.querySelector('[data-id]')) recent.innerHTML = '';
+        insertByScore(recent, createRecentFlaggedItem(tx), tx.fraud_score);
+        while (recent.children.length > 5) recent.lastElementChild.remove();
+    }
+    
+    // Recent transactions next to the transfer form
+    const recentBody = document.getElementById('recent-transactions-body');
+    if (recentBody && isNew) {
+        const recentRow = recentBody.querySelector(`tr[data-id="${tx.transaction_id}"]`);
+        if (recentRow) recentRow.remove();
+        if (!recentBody.querySelector('tr[data-id]')) recentBody.innerHTML = '';
+        recentBody.insertAdjacentHTML('afterbegin', recentTransactionRowHtml(tx));
+        while (recentBody.children.length > 10) recentBody.lastElementChild.remove();
+    }
+}
+
+// Insert an element with data-score before the first lower-scored sibling
+function insertByScore(container, element, score) {
+    element.dataset.score = score;
+    const next = Array.from(container.querySelectorAll(':scope > [data-score]'))
+        .find(el => parseFloat(el.dataset.score) < score);
+    container.insertBefore(element, next || null);
+}
+
+// Show a new alert as a toast and on the alerts view
+function applyAlertEvent(alert) {
+    if (alert.status !== 'open') return;
+    
+    const urgent = alert.severity === 'high' || alert.severity === 'critical';
+    const who = alert.first_name ? ` (${alert.first_name} ${alert.last_name})` : '';
+    showNotification(
+        `Оповещение: ${alert.alert_type}${alert.transaction_id ? `, транзакция #${alert.transaction_id}` : ''}${who}`,
+        urgent ? 'danger' : 'warning'
+    );
+    
+    const container = document.getElementById('live-alerts');
+    const item = document.createElement('div');
+    item.className = `alert alert-${urgent ? 'danger' : 'warning'} alert-dismissible fade show`;
+    item.setAttribute('role', 'alert');
+    item.innerHTML = `
+        <div class="d-flex">
+            <div class="flex-shrink-0">
+                <i class="bi bi-exclamation-triangle-fill" style="font-size: 1.5rem;"></i>
+            </div>
+            <div class="flex-grow-1 ms-3">
+                <h5>${alert.transaction_id ? `Подозрительная транзакция #${alert.transaction_id}` : `Оповещение #${alert.alert_id}`}</h5>
+                <p class="mb-0">${alert.notes || alert.alert_type}${who}</p>
+                <hr>
+                <small>${formatDate(alert.created_at)}</small>
+            </div>
+        </div>
+        <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Закрыть"></button>
+    `;
+    container.prepend(item);
 }
 
 // Set up navigation event listeners
@@ -63,6 +192,14 @@ function setupEventListeners() {
         blockClient(clientId);
     });
     
+    // Transaction list: next keyset page and status filter
+    document.getElementById('transactions-load-more').addEventListener('click', function() {
+        loadTransactions(transactionsNextCursor);
+    });
+    document.getElementById('transaction-status-filter').addEventListener('change', function() {
+        loadTransactions();
+    });
+    
     // Confirm flag button in flag modal
     document.getElementById('confirm-flag-btn').addEventListener('click', function() {
         flagTransaction();
@@ -251,15 +388,7 @@ function loadDashboardData() {
     // Load real statistics from API
     fetch('/api/stats')
         .then(response => response.json())
-        .then(data => {
-            document.getElementById('total-transactions').textContent = data.total_transactions.toLocaleString('ru-RU');
-            document.getElementById('today-transactions').textContent = data.today_transactions.toLocaleString('ru-RU');
-            document.getElementById('flagged-transactions').textContent = data.flagged_transactions.toLocaleString('ru-RU');
-            document.getElementById('flagged-increase').textContent = '0';
-            document.getElementById('high-risk-clients').textContent = data.high_risk_clients.toLocaleString('ru-RU');
-            document.getElementById('risk-increase').textContent = '0';
-            document.getElementById('blocked-accounts').textContent = data.blocked_clients.toLocaleString('ru-RU');
-        })
+        .then(renderStats)
         .catch(error => {
             console.error('Error loading stats:', error);
             // Fallback to zeros on error
@@ -277,6 +406,17 @@ function loadDashboardData() {
     loadMockChartData();
 }
 
+// Show dashboard counters from /api/stats or a stats event
+function renderStats(data) {
+    document.getElementById('total-transactions').textContent = data.total_transactions.toLocaleString('ru-RU');
+    document.getElementById('today-transactions').textContent = data.today_transactions.toLocaleString('ru-RU');
+    document.getElementById('flagged-transactions').textContent = data.flagged_transactions.toLocaleString('ru-RU');
+    document.getElementById('flagged-increase').textContent = '0';
+    document.getElementById('high-risk-clients').textContent = data.high_risk_clients.toLocaleString('ru-RU');
+    document.getElementById('risk-increase').textContent = '0';
+    document.getElementById('blocked-accounts').textContent = data.blocked_clients.toLocaleString('ru-RU');
+}
+
 // Load mock chart data
 function loadMockChartData() {
     // Mock data for transaction chart
@@ -310,12 +450,42 @@ function loadMockChartData() {
     }
 }
 
+// Overview list item for a flagged transaction
+function createRecentFlaggedItem(tx) {
+    const item = document.createElement('a');
+    item.href = '#';
+    item.className = 'list-group-item list-group-item-action';
+    item.dataset.id = tx.transaction_id;
+    item.innerHTML = `
+        <div class="d-flex w-100 justify-content-between">
+            <h6 class="mb-1">#${tx.transaction_id}</h6>
+            <small>${formatDate(tx.transaction_date)}</small>
+        </div>
+        <p class="mb-1">
+            <strong>${tx.sender_first_name} ${tx.sender_last_name}</strong> → 
+            <strong>${tx.receiver_first_name} ${tx.receiver_last_name}</strong>
+        </p>
+        <div class="d-flex justify-content-between">
+            <small>Сумма: ${formatMoney(tx.amount)}</small>
+            <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
+                ${(tx.fraud_score * 100).toFixed(0)}%
+            </span>
+        </div>
+        ${tx.flagged_reason ? `<small class="text-muted">${tx.flagged_reason}</small>` : ''}
+    `;
+    item.addEventListener('click', function(e) {
+        e.preventDefault();
+        showTransactionDetails(tx.transaction_id);
+    });
+    return item;
+}
+
 // Load recent flagged transactions
 function loadRecentFlaggedTransactions() {
     const container = document.getElementById('recent-flagged');
     container.innerHTML = '<div class="text-center py-3"><div class="spinner-border text-primary" role="status"></div></div>';
     
-    fetch('/api/flagged-transactions')
+    fetch('/api/flagged-transactions?limit=5')
         .then(response => response.json())
         .then(data => {
             container.innerHTML = '';
@@ -325,32 +495,8 @@ function loadRecentFlaggedTransactions() {
                 return;
             }
             
-            data.transactions.slice(0, 5).forEach(tx => {
-                const item = document.createElement('a');
-                item.href = '#';
-                item.className = 'list-group-item list-group-item-action';
-                item.innerHTML = `
-                    <div class="d-flex w-100 justify-content-between">
-                        <h6 class="mb-1">#${tx.transaction_id}</h6>
-                        <small>${formatDate(tx.transaction_date)}</small>
-                    </div>
-                    <p class="mb-1">
-                        <strong>${tx.sender_first_name} ${tx.sender_last_name}</strong> → 
-                        <strong>${tx.receiver_first_name} ${tx.receiver_last_name}</strong>
-                    </p>
-                    <div class="d-flex justify-content-between">
-                        <small>Сумма: ${formatMoney(tx.amount)}</small>
-                        <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
-                            ${(tx.fraud_score * 100).toFixed(0)}%
-                        </span>
-                    </div>
-                    ${tx.flagged_reason ? `<small class="text-muted">${tx.flagged_reason}</small>` : ''}
-                `;
-                item.addEventListener('click', function(e) {
-                    e.preventDefault();
-                    showTransactionDetails(tx.transaction_id);
-                });
-                container.appendChild(item);
+            data.transactions.forEach(tx => {
+                insertByScore(container, createRecentFlaggedItem(tx), tx.fraud_score);
             });
         })
         .catch(error => {
@@ -359,26 +505,70 @@ function loadRecentFlaggedTransactions() {
         });
 }
 
-// Load all transactions
-function loadTransactions() {
-    const tbody = document.querySelector('#transactions-table tbody');
-    tbody.innerHTML = `
-        <tr>
-            <td colspan="8" class="text-center">
-                <div class="py-5">
-                    <div class="spinner-border text-primary" role="status"></div>
-                    <p class="text-muted mt-2">Загрузка транзакций...</p>
-                </div>
-            </td>
-        </tr>
+// Row of the all-transactions table
+function createTransactionRow(tx) {
+    const row = document.createElement('tr');
+    row.dataset.id = tx.transaction_id;
+    row.innerHTML = `
+        <td>#${tx.transaction_id}</td>
+        <td>${formatDate(tx.transaction_date)}</td>
+        <td>${tx.sender_first_name} ${tx.sender_last_name}</td>
+        <td>${tx.receiver_first_name} ${tx.receiver_last_name}</td>
+        <td>${formatMoney(tx.amount)}</td>
+        <td>
+            <span class="badge bg-${getStatusClass(tx.status)}">${getStatusTextRu(tx.status)}</span>
+            ${tx.is_flagged ? '<span class="status-flagged ms-1">⚠️</span>' : ''}
+        </td>
+        <td>
+            <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
+                ${(tx.fraud_score * 100).toFixed(0)}%
+            </span>
+        </td>
+        <td>
+            <button class="btn btn-sm btn-primary view-transaction" data-id="${tx.transaction_id}">
+                <i class="bi bi-eye"></i>
+            </button>
+        </td>
     `;
+    row.querySelector('.view-transaction').addEventListener('click', () => showTransactionDetails(tx.transaction_id));
+    return row;
+}
+
+// Cursor of the next transactions page, null when the last page is shown
+let transactionsNextCursor = null;
+
+// Load all transactions; with a cursor the next page is appended
+function loadTransactions(cursor) {
+    const tbody = document.querySelector('#transactions-table tbody');
+    const loadMore = document.getElementById('transactions-load-more');
+    const params = new URLSearchParams();
+    const status = document.getElementById('transaction-status-filter').value;
+    if (status) params.set('status', status);
+    if (cursor) params.set('cursor', cursor);
+    
+    if (!cursor) {
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="8" class="text-center">
+                    <div class="py-5">
+                        <div class="spinner-border text-primary" role="status"></div>
+                        <p class="text-muted mt-2">Загрузка транзакций...</p>
+                    </div>
+                </td>
+            </tr>
+        `;
+    }
+    loadMore.disabled = true;
     
-    fetch('/api/transactions')
+    fetch(`/api/transactions?${params}`)
         .then(response => response.json())
         .then(data => {
-            tbody.innerHTML = '';
+            if (!cursor) tbody.innerHTML = '';
+            transactionsNextCursor = data.next_cursor || null;
+            loadMore.disabled = false;
+            loadMore.classList.toggle('d-none', !transactionsNextCursor);
             
-            if (!data.transactions || data.transactions.length === 0) {
+            if (!cursor && (!data.transactions || data.transactions.length === 0)) {
                 tbody.innerHTML = `
                     <tr>
                         <td colspan="8" class="text-center text-muted py-4">Нет транзакций</td>
@@ -387,42 +577,15 @@ function loadTransactions() {
                 return;
             }
             
-            data.transactions.forEach(tx => {
-                const row = document.createElement('tr');
-                row.innerHTML = `
-                    <td>#${tx.transaction_id}</td>
-                    <td>${formatDate(tx.transaction_date)}</td>
-                    <td>${tx.sender_first_name} ${tx.sender_last_name}</td>
-                    <td>${tx.receiver_first_name} ${tx.receiver_last_name}</td>
-                    <td>${formatMoney(tx.amount)}</td>
-                    <td>
-                        <span class="badge bg-${getStatusClass(tx.status)}">${getStatusTextRu(tx.status)}</span>
-                        ${tx.is_flagged ? '<span class="status-flagged ms-1">⚠️</span>' : ''}
-                    </td>
-                    <td>
-                        <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
-                            ${(tx.fraud_score * 100).toFixed(0)}%
-                        </span>
-                    </td>
-                    <td>
-                        <button class="btn btn-sm btn-primary view-transaction" data-id="${tx.transaction_id}">
-                            <i class="bi bi-eye"></i>
-                        </button>
-                    </td>
-                `;
-                tbody.appendChild(row);
-            });
-            
-            // Add event listeners to view buttons
-            document.querySelectorAll('.view-transaction').forEach(btn => {
-                btn.addEventListener('click', function() {
-                    const transactionId = this.getAttribute('data-id');
-                    showTransactionDetails(transactionId);
-                });
-            });
+            data.transactions.forEach(tx => tbody.appendChild(createTransactionRow(tx)));
         })
         .catch(error => {
             console.error('Error loading transactions:', error);
+            loadMore.disabled = false;
+            if (cursor) {
+                showNotification('Ошибка загрузки транзакций', 'danger');
+                return;
+            }
             tbody.innerHTML = `
                 <tr>
                     <td colspan="8" class="text-center text-danger py-4">Ошибка загрузки транзакций</td>
@@ -431,6 +594,33 @@ function loadTransactions() {
         });
 }
 
+// Row of the flagged transactions table
+function createFlaggedRow(tx) {
+    const row = document.createElement('tr');
+    row.dataset.id = tx.transaction_id;
+    row.innerHTML = `
+        <td>#${tx.transaction_id}</td>
+        <td>${formatDate(tx.transaction_date)}</td>
+        <td>${tx.sender_first_name} ${tx.sender_last_name}</td>
+        <td>${tx.receiver_first_name} ${tx.receiver_last_name}</td>
+        <td>${formatMoney(tx.amount)}</td>
+        <td><span class="badge bg-${getStatusClass(tx.status)}">${getStatusTextRu(tx.status)}</span></td>
+        <td>
+            <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
+                ${(tx.fraud_score * 100).toFixed(0)}%
+            </span>
+        </td>
+        <td><small>${tx.flagged_reason || 'Не указана'}</small></td>
+        <td>
+            <button class="btn btn-sm btn-primary view-transaction" data-id="${tx.transaction_id}">
+                <i class="bi bi-eye"></i>
+            </button>
+        </td>
+    `;
+    row.querySelector('.view-transaction').addEventListener('click', () => showTransactionDetails(tx.transaction_id));
+    return row;
+}
+
 // Load flagged transactions
 function loadFlaggedTransactions() {
     const tbody = document.querySelector('#flagged-table tbody');
@@ -460,36 +650,10 @@ function loadFlaggedTransactions() {
             }
             
             data.transactions.forEach(tx => {
-                const row = document.createElement('tr');
-                row.innerHTML = `
-                    <td>#${tx.transaction_id}</td>
-                    <td>${formatDate(tx.transaction_date)}</td>
-                    <td>${tx.sender_first_name} ${tx.sender_last_name}</td>
-                    <td>${tx.receiver_first_name} ${tx.receiver_last_name}</td>
-                    <td>${formatMoney(tx.amount)}</td>
-                    <td><span class="badge bg-${getStatusClass(tx.status)}">${getStatusTextRu(tx.status)}</span></td>
-                    <td>
-                        <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
-                            ${(tx.fraud_score * 100).toFixed(0)}%
-                        </span>
-                    </td>
-                    <td><small>${tx.flagged_reason || 'Не указана'}</small></td>
-                    <td>
-                        <button class="btn btn-sm btn-primary view-transaction" data-id="${tx.transaction_id}">
-                            <i class="bi bi-eye"></i>
-                        </button>
-                    </td>
-                `;
+                const row = createFlaggedRow(tx);
+                row.dataset.score = tx.fraud_score;
                 tbody.appendChild(row);
             });
-            
-            // Add event listeners to view buttons
-            document.querySelectorAll('.view-transaction').forEach(btn => {
-                btn.addEventListener('click', function() {
-                    const transactionId = this.getAttribute('data-id');
-                    showTransactionDetails(transactionId);
-                });
-            });
         })
         .catch(error => {
             console.error('Error loading flagged transactions:', error);
@@ -1236,7 +1400,7 @@ function displayTransactionResult(data) {
 
 // Load recent transactions
 function loadRecentTransactions() {
-    fetch('/api/transactions')
+    fetch('/api/transactions?limit=10')
         .then(response => response.json())
         .then(data => {
             if (data.transactions) {
@@ -1248,6 +1412,28 @@ function loadRecentTransactions() {
         });
 }
 
+// Row of the recent transactions table next to the transfer form
+function recentTransactionRowHtml(tx) {
+    return `
+        <tr data-id="${tx.transaction_id}">
+            <td>#${tx.transaction_id}</td>
+            <td>${formatDate(tx.transaction_date)}</td>
+            <td>${tx.sender_first_name} ${tx.sender_last_name}</td>
+            <td>${tx.receiver_first_name} ${tx.receiver_last_name}</td>
+            <td>${formatMoney(tx.amount)}</td>
+            <td>
+                <span class="badge bg-${getStatusClass(tx.status)}">${getStatusTextRu(tx.status)}</span>
+                ${tx.is_flagged ? '<span class="badge bg-warning ms-1">⚠️</span>' : ''}
+            </td>
+            <td>
+                <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
+                    ${(tx.fraud_score * 100).toFixed(0)}%
+                </span>
+            </td>
+        </tr>
+    `;
+}
+
 // Display recent transactions in table
 function displayRecentTransactions(transactions) {
     const tbody = document.getElementById('recent-transactions-body');
@@ -1265,24 +1451,7 @@ function displayRecentTransactions(transactions) {
         return;
     }
     
-    tbody.innerHTML = transactions.map(tx => `
-        <tr>
-            <td>#${tx.transaction_id}</td>
-            <td>${formatDate(tx.transaction_date)}</td>
-            <td>${tx.sender_first_name} ${tx.sender_last_name}</td>
-            <td>${tx.receiver_first_name} ${tx.receiver_last_name}</td>
-            <td>${formatMoney(tx.amount)}</td>
-            <td>
-                <span class="badge bg-${getStatusClass(tx.status)}">${getStatusTextRu(tx.status)}</span>
-                ${tx.is_flagged ? '<span class="badge bg-warning ms-1">⚠️</span>' : ''}
-            </td>
-            <td>
-                <span class="fraud-score-${tx.fraud_score >= 0.8 ? 'high' : tx.fraud_score >= 0.5 ? 'medium' : 'low'}">
-                    ${(tx.fraud_score * 100).toFixed(0)}%
-                </span>
-            </td>
-        </tr>
-    `).join('');
+    tbody.innerHTML = transactions.map(recentTransactionRowHtml).join('');
 }
 
 // Helper functions
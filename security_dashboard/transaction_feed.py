@@ -0,0 +1,275 @@
+"""
+Shared warm-up and catch-up for in-memory views of the Transaction table.
+
+A view is loaded from the database at startup, the application records its
+own transfers right after commit, and a periodic catch-up query picks up
+transfers committed by other writers.
+
+Transaction ids come from a sequence and are assigned at INSERT, not at
+commit, so id 101 can become visible before id 100. A catch-up on
+``transaction_id > last seen`` alone would skip id 100 for good. The
+catch-up therefore also re-reads the last ``overlap_seconds`` of
+``transaction_date`` and deduplicates by id; only a transfer that commits
+more than ``overlap_seconds`` after its timestamp can be missed.
+
+A writer that must be the one to apply its own transfer (the carousel
+search runs on record) claims the id before commit; the catch-up then
+skips it until record() or release() is called.
+"""
+
+import calendar
+import datetime
+import threading
+import time
+
+
+def to_epoch(value):
+    """
+    Convert a naive TIMESTAMP from the database into epoch seconds.
+
+    Matches ``EXTRACT(EPOCH FROM <timestamp>)`` so values coming from
+    RETURNING clauses and from the warm-up query share one time axis.
+    """
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1e6
+
+
+def from_epoch(ts):
+    """Naive TIMESTAMP for epoch seconds; the inverse of to_epoch."""
+    return datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc).replace(tzinfo=None)
+
+
+class TransactionFeed:
+    """
+    Base class of the views; subclasses name the extra columns they need and
+    apply rows to their own structures.
+
+    Rows are ``(transaction_id, epoch seconds, *COLUMNS)``.
+    """
+
+    # Select list after transaction_id and the transaction_date epoch
+    COLUMNS = ''
+    # Name of the server-side cursor used by warm()
+    CURSOR_NAME = 'transaction_feed_warm'
+
+    def __init__(self, window_seconds, sync_interval=5.0, overlap_seconds=60.0):
+        """
+        Args:
+            window_seconds: Span of transaction_date loaded by warm()
+            sync_interval: Minimum seconds between catch-up queries for
+                transactions inserted by other processes
+            overlap_seconds: Span of recent transaction_date re-read by every
+                catch-up for transfers that committed out of id order
+        """
+        self.window_seconds = window_seconds
+        self.sync_interval = sync_interval
+        self.overlap_seconds = overlap_seconds
+        self._lock = threading.Lock()
+        self._clock_skew = 0.0
+        self._last_transaction_id = 0
+        self._seen = {}               # transaction_id -> ts, recent or above the mark
+        self._forgotten_before = 0.0  # ids up to the mark older than this were applied
+        self._claimed = set()         # ids left to record() by their writer
+        self._last_sync = 0.0
+        self.warmed = False
+
+    def now(self):
+        """Current time on the database clock, in epoch seconds."""
+        return time.time() + self._clock_skew
+
+    # ------------------------------------------------------------------
+    # Subclass hooks, called with the lock held
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        """Forget everything before a warm-up."""
+        raise NotImplementedError
+
+    def _apply(self, transaction_id, ts, *values):
+        """Add one transaction to the view."""
+        raise NotImplementedError
+
+    def _settle(self):
+        """Housekeeping after a warm-up or catch-up."""
+
+    # ------------------------------------------------------------------
+    # Deduplication
+    # ------------------------------------------------------------------
+
+    def _admit(self, transaction_id, ts):
+        """True, and remembered, if the transaction has not been applied yet."""
+        if transaction_id in self._seen:
+            return False
+        if transaction_id <= self._last_transaction_id and ts < self._forgotten_before:
+            return False
+        self._seen[transaction_id] = ts
+        return True
+
+    def _take(self, row):
+        transaction_id, ts = row[0], float(row[1])
+        if transaction_id not in self._claimed and self._admit(transaction_id, ts):
+            self._apply(transaction_id, ts, *row[2:])
+
+    def claim(self, transaction_id):
+        """Keep catch-ups from applying a transfer its writer is about to record."""
+        with self._lock:
+            self._claimed.add(transaction_id)
+
+    def release(self, transaction_id):
+        """Drop a claim whose transfer was rolled back."""
+        with self._lock:
+            self._claimed.discard(transaction_id)
+
+    def _forget(self):
+        # Keep twice the overlap so a catch-up that was slow to return still
+        # finds every id it re-reads
+        horizon = self.now() - 2 * self.overlap_seconds
+        last_id = self._last_transaction_id
+        self._seen = {i: ts for i, ts in self._seen.items() if ts >= horizon or i > last_id}
+        self._forgotten_before = max(self._forgotten_before, horizon)
+
+    # ------------------------------------------------------------------
+    # Database synchronisation
+    # ------------------------------------------------------------------
+
+    def _warm_query(self, param):
+        return """
+            SELECT transaction_id, EXTRACT(EPOCH FROM transaction_date), {columns}
+            FROM Transaction
+            WHERE transaction_date >= LOCALTIMESTAMP - {p} * INTERVAL '1 second'
+            AND transaction_id <= {q}
+            ORDER BY transaction_date, transaction_id
+        """.format(columns=self.COLUMNS, p=param(1), q=param(2))
+
+    def _sync_query(self, param):
+        return """
+            SELECT transaction_id, EXTRACT(EPOCH FROM transaction_date), {columns}
+            FROM Transaction
+            WHERE transaction_id > {p}
+            OR transaction_date >= LOCALTIMESTAMP - {q} * INTERVAL '1 second'
+            ORDER BY transaction_id
+        """.format(columns=self.COLUMNS, p=param(1), q=param(2))
+
+    def _begin_load(self, db_now, max_id):
+        self._reset()
+        self._seen.clear()
+        self._clock_skew = float(db_now) - time.time()
+        self._last_transaction_id = max_id
+        self._forgotten_before = float(db_now) - self.window_seconds
+
+    def _finish_load(self):
+        self._forget()
+        self._settle()
+        self._last_sync = time.monotonic()
+        self.warmed = True
+
+    def _load(self, db_now, max_id, rows):
+        with self._lock:
+            self._begin_load(db_now, max_id)
+            for row in rows:
+                self._take(row)
+            self._finish_load()
+
+    def _sync_from(self, force):
+        """Last seen transaction id if a catch-up query is due, else None."""
+        if not force and time.monotonic() - self._last_sync < self.sync_interval:
+            return None
+        with self._lock:
+            self._last_sync = time.monotonic()
+            return self._last_transaction_id
+
+    def _catch_up(self, rows):
+        with self._lock:
+            for row in rows:
+                self._take(row)
+            if rows:
+                self._last_transaction_id = max(self._last_transaction_id, rows[-1][0])
+            self._forget()
+            self._settle()
+
+    def warm(self, conn, batch_size=10000):
+        """
+        Load the window's transactions from the database.
+
+        Args:
+            conn: psycopg2 connection
+            batch_size: Rows fetched per round-trip
+        """
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT EXTRACT(EPOCH FROM LOCALTIMESTAMP), COALESCE(MAX(transaction_id), 0) FROM Transaction")
+            db_now, max_id = cursor.fetchone()
+        # Server-side cursor so a busy window of traffic is streamed, not buffered
+        with conn.cursor(name=self.CURSOR_NAME) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(self._warm_query(lambda n: '%s'), (self.window_seconds, max_id))
+            self._load(db_now, max_id, cursor)
+
+    def sync(self, conn, force=False):
+        """
+        Pick up transactions committed by other writers since the last sync.
+
+        Runs at most once per ``sync_interval`` unless ``force`` is set and
+        only reads rows above the last seen primary key or inside the
+        overlap window.
+        """
+        last_id = self._sync_from(force)
+        if last_id is None:
+            return
+        with conn.cursor() as cursor:
+            cursor.execute(self._sync_query(lambda n: '%s'), (last_id, self.overlap_seconds))
+            rows = cursor.fetchall()
+        self._catch_up(rows)
+
+    def ensure_ready(self, conn):
+        """Warm on first use, then keep in step with other writers."""
+        if not self.warmed:
+            self.warm(conn)
+        else:
+            self.sync(conn)
+
+    async def warm_async(self, conn, batch_size=10000):
+        """
+        ``warm`` for an asyncpg connection.
+
+        The window is streamed through a cursor, ``batch_size`` rows per
+        round-trip, and each batch is applied as it arrives: the lock is not
+        held across awaits, so lookups made meanwhile see the window partly
+        loaded.
+        """
+        db_now, max_id = await conn.fetchrow(
+            "SELECT EXTRACT(EPOCH FROM LOCALTIMESTAMP), COALESCE(MAX(transaction_id), 0) FROM Transaction"
+        )
+        with self._lock:
+            self._begin_load(db_now, max_id)
+        try:
+            # asyncpg cursors only exist inside a transaction
+            async with conn.transaction():
+                cursor = await conn.cursor(self._warm_query(lambda n: '$%d' % n),
+                                           float(self.window_seconds), max_id)
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    with self._lock:
+                        for row in rows:
+                            self._take(row)
+        except BaseException:
+            with self._lock:
+                self.warmed = False
+            raise
+        with self._lock:
+            self._finish_load()
+
+    async def sync_async(self, conn, force=False):
+        """``sync`` for an asyncpg connection."""
+        last_id = self._sync_from(force)
+        if last_id is None:
+            return
+        rows = await conn.fetch(self._sync_query(lambda n: '$%d' % n), last_id, float(self.overlap_seconds))
+        self._catch_up(rows)
+
+    async def ensure_ready_async(self, conn):
+        """``ensure_ready`` for an asyncpg connection."""
+        if not self.warmed:
+            await self.warm_async(conn)
+        else:
+            await self.sync_async(conn)
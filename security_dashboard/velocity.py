@@ -0,0 +1,158 @@
+"""
+In-process sliding-window velocity counters.
+
+Keeps per-account transaction counts and amounts for the time windows used by
+the VelocityCounter table (1min, 5min, 15min, 1hour, 1day). Each account
+keeps the timestamps and amounts of the transfers it sent within the longest
+window, oldest first, and drops older ones as they are read. A window's count
+is a binary search for its start, so it is exactly what
+``transaction_date >= NOW() - INTERVAL '1 hour'`` would count, at O(log n)
+per lookup. The store is warmed from the database at startup and then kept
+current by the application after every committed insert; inserts made by
+other processes are picked up by the catch-up query of TransactionFeed.
+"""
+
+import bisect
+import time
+from collections import deque
+from itertools import islice
+
+from security_dashboard.transaction_feed import TransactionFeed, to_epoch
+
+# Window name -> length in seconds (matches VelocityCounter.time_window)
+WINDOWS = {
+    '1min': 60,
+    '5min': 300,
+    '15min': 900,
+    '1hour': 3600,
+    '1day': 86400,
+}
+
+
+class _Transfers:
+    """Timestamps and amounts of one account's transfers, oldest first."""
+    __slots__ = ('times', 'amounts')
+
+    def __init__(self):
+        self.times = deque()
+        self.amounts = deque()
+
+    def add(self, ts, amount):
+        if not self.times or ts >= self.times[-1]:
+            self.times.append(ts)
+            self.amounts.append(amount)
+        else:
+            # Committed out of time order (caught up late)
+            index = bisect.bisect_right(self.times, ts)
+            self.times.insert(index, ts)
+            self.amounts.insert(index, amount)
+
+    def trim(self, cutoff):
+        """Forget transfers before ``cutoff``."""
+        while self.times and self.times[0] < cutoff:
+            self.times.popleft()
+            self.amounts.popleft()
+
+    def count(self, since):
+        """Number of transfers at or after ``since``."""
+        return len(self.times) - bisect.bisect_left(self.times, since)
+
+    def totals(self, since):
+        """Count and amount of the transfers at or after ``since``."""
+        count = self.count(since)
+        return count, sum(islice(reversed(self.amounts), count)) if count else 0.0
+
+
+class VelocityStore(TransactionFeed):
+    COLUMNS = 'sender_account_id, amount'
+    CURSOR_NAME = 'velocity_warm'
+
+    def __init__(self, windows=None, sync_interval=5.0, prune_interval=600.0, overlap_seconds=60.0):
+        """
+        Initialize an empty store.
+
+        Args:
+            windows: Window names to track (defaults to all of WINDOWS)
+            sync_interval: Minimum seconds between catch-up queries for
+                transactions inserted by other processes
+            prune_interval: Seconds between sweeps that forget idle accounts
+            overlap_seconds: Span of recent transactions re-read by every
+                catch-up for transfers that committed out of id order
+        """
+        self.windows = {name: WINDOWS[name] for name in (windows or WINDOWS)}
+        super().__init__(max(self.windows.values()), sync_interval, overlap_seconds)
+        self.prune_interval = prune_interval
+        self._last_prune = time.monotonic()
+        self._accounts = {}
+
+    def _transfers(self, account_id, now):
+        """The account's transfers within the longest window, or None."""
+        transfers = self._accounts.get(account_id)
+        if transfers is not None:
+            transfers.trim(now - self.window_seconds)
+        return transfers
+
+    def _reset(self):
+        self._accounts.clear()
+
+    def _apply(self, transaction_id, ts, account_id, amount):
+        transfers = self._accounts.get(account_id)
+        if transfers is None:
+            transfers = self._accounts[account_id] = _Transfers()
+        transfers.add(ts, float(amount))
+
+    def _settle(self):
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self._prune()
+
+    def record(self, transaction_id, account_id, transaction_date, amount):
+        """Record a committed transaction sent from ``account_id``."""
+        ts = to_epoch(transaction_date)
+        with self._lock:
+            if self._admit(transaction_id, ts):
+                self._apply(transaction_id, ts, account_id, amount)
+
+    def count(self, account_id, window='1hour'):
+        """Number of transactions sent by ``account_id`` within ``window``."""
+        with self._lock:
+            now = self.now()
+            transfers = self._transfers(account_id, now)
+            if transfers is None:
+                return 0
+            return transfers.count(now - self.windows[window])
+
+    def amount(self, account_id, window='1hour'):
+        """Total amount sent by ``account_id`` within ``window``."""
+        with self._lock:
+            now = self.now()
+            transfers = self._transfers(account_id, now)
+            if transfers is None:
+                return 0.0
+            return transfers.totals(now - self.windows[window])[1]
+
+    def snapshot(self, account_id):
+        """Counts and amounts for every tracked window."""
+        with self._lock:
+            now = self.now()
+            transfers = self._transfers(account_id, now)
+            result = {}
+            for name, length in self.windows.items():
+                count, amount = transfers.totals(now - length) if transfers else (0, 0.0)
+                result[name] = {'transaction_count': count, 'amount': round(amount, 2)}
+            return result
+
+    def _prune(self):
+        now = self.now()
+        idle = [
+            account_id for account_id in self._accounts
+            if not self._transfers(account_id, now).times
+        ]
+        for account_id in idle:
+            del self._accounts[account_id]
+        self._last_prune = time.monotonic()
+        return len(idle)
+
+    def prune(self):
+        """Drop accounts with no activity left in any window."""
+        with self._lock:
+            return self._prune()
@@ -0,0 +1,79 @@
+"""
+Shared fixtures.
+
+Tests that need PostgreSQL run when ``ANTIFRAUD_TEST_DSN`` points at a
+server on which the user may create databases, e.g.
+``ANTIFRAUD_TEST_DSN="host=localhost user=postgres dbname=postgres"``;
+otherwise they are skipped. Each such test gets a fresh database loaded from
+one of the schema files, dropped again afterwards.
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCHEMAS = {
+    'init_db': [os.path.join(ROOT, 'security_dashboard', 'database', 'init_db.sql')],
+    'enhanced': [os.path.join(ROOT, 'enhanced_schema.sql')],
+    # Unpartitioned Transaction, as before migrate_transaction_partitions.sql
+    'legacy': [os.path.join(ROOT, 'schema.sql'), os.path.join(ROOT, 'schema_additions.sql')],
+}
+
+
+@pytest.fixture
+def schema_db():
+    """Factory: schema name -> psycopg2 connect kwargs of a fresh database."""
+    dsn = os.environ.get('ANTIFRAUD_TEST_DSN')
+    if not dsn:
+        pytest.skip('ANTIFRAUD_TEST_DSN is not set')
+    psycopg2 = pytest.importorskip('psycopg2')
+    from psycopg2.extensions import parse_dsn
+
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    created = []
+
+    def create(schema):
+        name = 'antifraud_test_' + uuid.uuid4().hex[:12]
+        with admin.cursor() as cursor:
+            cursor.execute('CREATE DATABASE ' + name)
+        created.append(name)
+        config = dict(parse_dsn(dsn), dbname=name)
+        conn = psycopg2.connect(**config)
+        try:
+            for path in SCHEMAS[schema]:
+                with conn.cursor() as cursor, open(path, encoding='utf-8') as f:
+                    cursor.execute(f.read())
+            conn.commit()
+        finally:
+            conn.close()
+        return config
+
+    yield create
+
+    with admin.cursor() as cursor:
+        for name in created:
+            cursor.execute('DROP DATABASE IF EXISTS ' + name + ' WITH (FORCE)')
+    admin.close()
+
+
+@pytest.fixture
+def seeded_db(schema_db):
+    """Enhanced-schema database with a small benchmark graph (2000 transfers, 3 of each pattern)."""
+    import random
+
+    import numpy as np
+
+    import benchmark_detectors
+
+    config = schema_db('enhanced')
+    args = benchmark_detectors.parse_args(['--sizes', '2000', '--carousels', '3', '--bursts', '3', '--layers', '3'])
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    benchmark_detectors.seed_database(config, 2000, args)
+    return config
@@ -0,0 +1,141 @@
+"""AdvancedFraudDetection run over a seeded benchmark graph."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+
+from advanced_fraud_detection import AdvancedFraudDetection, parse_args, pattern_key
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def test_parallel_analysis_matches_sequential(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        sequential = detector.run_comprehensive_analysis()
+        parallel = detector.run_comprehensive_analysis(parallel=True, detector_timeout=60)
+    finally:
+        detector.close()
+    assert sequential['total_patterns'] > 0
+    assert parallel['patterns'] == sequential['patterns']
+    assert parallel['high_risk_patterns'] == sequential['high_risk_patterns']
+
+
+def test_parallel_detector_timeout_drops_only_that_detector(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        results = detector.run_comprehensive_analysis(
+            parallel=True, detector_timeout={'detect_layered_transactions': 0.001})
+    finally:
+        detector.close()
+    types = {p['pattern_type'] for p in results['patterns']}
+    assert 'layered_transaction' not in types
+    assert {'carousel', 'velocity_burst', 'network_cluster'} <= types
+
+
+def test_script_runs_sequentially_unless_asked():
+    args = parse_args([])
+    assert (args.parallel, args.detector_timeout) == (False, None)
+    args = parse_args(['--parallel', '--detector-timeout', '600'])
+    assert (args.parallel, args.detector_timeout) == (True, 600.0)
+    with pytest.raises(SystemExit):
+        parse_args(['--detector-timeout', '600'])
+
+
+def test_pattern_key_ignores_transaction_order():
+    a = {'pattern_type': 'carousel', 'transaction_ids': [5, 3, 9], 'risk_score': 0.9}
+    b = {'pattern_type': 'carousel', 'transaction_ids': [9, 5, 3], 'risk_score': 0.8}
+    c = {'pattern_type': 'layered_transaction', 'transaction_ids': [5, 3, 9], 'risk_score': 0.9}
+    assert pattern_key(a) == pattern_key(b)
+    assert pattern_key(a) != pattern_key(c)
+
+
+def open_alerts(config):
+    conn = psycopg2.connect(**config)
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*), COUNT(DISTINCT pattern_key) FROM Alert WHERE status = 'open' AND pattern_key IS NOT NULL")
+        counts = cursor.fetchone()
+    conn.close()
+    return counts
+
+
+def test_repeated_runs_do_not_duplicate_open_alerts(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        first = detector.run_comprehensive_analysis()
+        assert first['alerts_created'] > 0
+        total, distinct = open_alerts(seeded_db)
+        assert total == distinct == first['alerts_created']
+
+        second = detector.run_comprehensive_analysis()
+        assert second['alerts_created'] == 0
+        assert open_alerts(seeded_db)[0] == total
+
+        # Once the alerts are resolved the same patterns alert again
+        with detector.conn.cursor() as cursor:
+            cursor.execute("UPDATE Alert SET status = 'resolved' WHERE pattern_key IS NOT NULL")
+        detector.conn.commit()
+        third = detector.create_alerts_for_patterns([p for p in second['patterns'] if p['risk_score'] >= 0.6])
+        assert third == total
+    finally:
+        detector.close()
+
+
+def test_streamed_detectors_match_lists(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        streamed = [
+            (detector.iter_network_clusters(itersize=50), detector.analyze_network_clusters()),
+            (detector.iter_new_device_patterns(itersize=2), detector.detect_new_device_patterns()),
+            (detector.iter_suspicious_ip_patterns(itersize=2), detector.detect_suspicious_ip_patterns()),
+        ]
+        for patterns, listed in streamed:
+            assert listed
+            assert list(patterns) == listed
+        # Yielded in an order of their own and sorted by detect_*
+        for patterns, listed in [
+            (detector.iter_velocity_bursts(itersize=2), detector.detect_velocity_bursts()),
+            (detector.iter_layered_transactions(itersize=100), detector.detect_layered_transactions()),
+            (detector.iter_carousel_patterns(itersize=100), detector.detect_carousel_patterns()),
+        ]:
+            assert listed
+            assert sorted(map(pattern_key, patterns)) == sorted(map(pattern_key, listed))
+    finally:
+        detector.close()
+
+
+def test_streaming_reads_through_server_side_cursor(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        ips = detector.iter_suspicious_ip_patterns(itersize=1)
+        first = next(ips)
+        with detector.conn.cursor() as cursor:
+            cursor.execute("SELECT name FROM pg_cursors")
+            assert ('suspicious_ips',) in cursor.fetchall()
+        assert [first] + list(ips) == detector.detect_suspicious_ip_patterns()
+    finally:
+        detector.close()
+
+
+def test_layered_chains_follow_money_forward(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        layers = detector.detect_layered_transactions()
+        with detector.conn.cursor() as cursor:
+            for layer in layers:
+                cursor.execute("""
+                    SELECT sender_account_id, receiver_account_id, amount, transaction_date
+                    FROM Transaction WHERE transaction_id = ANY(%s)
+                """, (layer['transaction_ids'],))
+                hops = {row[0]: row for row in cursor.fetchall()}
+                path = layer['account_chain'] + [layer['final_beneficiary']]
+                chain = [hops[account] for account in layer['account_chain']]
+                assert [hop[1] for hop in chain] == path[1:]
+                for before, after in zip(chain, chain[1:]):
+                    assert before[3] < after[3] <= before[3] + timedelta(minutes=240)
+                    assert before[2] * Decimal('0.9') <= after[2] <= before[2]
+    finally:
+        detector.close()
+    # The three injected chains of the seeded graph
+    assert sum(1 for layer in layers if layer['chain_length'] >= 3) >= 3
@@ -0,0 +1,63 @@
+"""Synthetic graph and measurements of benchmark_detectors.py."""
+
+import random
+
+import numpy as np
+
+import benchmark_detectors
+from benchmark_detectors import injected_edges, parse_args, parse_size
+
+
+def test_parse_size():
+    assert parse_size('10k') == 10000
+    assert parse_size('2.5M') == 2500000
+    assert parse_size('500') == 500
+
+
+def test_injected_patterns_are_time_ordered():
+    random.seed(3)
+    np.random.seed(3)
+    edges, injected = injected_edges(np.arange(1, 201), carousels=1, bursts=1, layers=1)
+    assert injected == {'carousels': 1, 'bursts': 1, 'layers': 1}
+
+    # Carousel first: a cycle whose hops get younger
+    cycle = []
+    for edge in edges:
+        cycle.append(edge)
+        if edge[1] == edges[0][0]:
+            break
+    assert 3 <= len(cycle) <= 6
+    assert all(a[1] == b[0] for a, b in zip(cycle, cycle[1:]))
+    assert all(a[3] > b[3] for a, b in zip(cycle, cycle[1:]))
+
+    burst = edges[len(cycle):]
+    burst = [e for e in burst if e[0] == burst[0][0]]
+    assert len(burst) >= 8
+    assert all(age <= 600 for _, _, _, age in burst)
+
+    chain = edges[len(cycle) + len(burst):]
+    assert 3 <= len(chain) <= 6
+    assert all(a[1] == b[0] and a[3] > b[3] and a[2] > b[2] for a, b in zip(chain, chain[1:]))
+
+
+def test_benchmark_small_graph(schema_db):
+    config = schema_db('enhanced')
+    args = parse_args(['--sizes', '2000', '--carousels', '3', '--bursts', '3', '--layers', '3', '--repeat', '1'])
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    seeded = benchmark_detectors.seed_database(config, 2000, args)
+    assert seeded['injected'] == {'carousels': 3, 'bursts': 3, 'layers': 3}
+    assert seeded['accounts'] >= 100
+
+    results = benchmark_detectors.benchmark_database(config, args)
+    assert set(results) == set(benchmark_detectors.DETECTOR_QUERIES) | {
+        'run_comprehensive_analysis', 'run_comprehensive_analysis_parallel'}
+    for name, measured in results.items():
+        assert measured['status'] == 'ok', name
+        assert measured['peak_memory_bytes'] > 0
+    for name in benchmark_detectors.DETECTOR_QUERIES:
+        assert results[name]['explain']['status'] == 'ok', name
+        assert 'Node Type' in results[name]['explain']['plan']
+    assert results['detect_carousel_patterns']['patterns'] >= 3
+    assert results['detect_velocity_bursts']['patterns'] >= 3
@@ -0,0 +1,127 @@
+"""Streaming velocity bursts: BurstDetector, BurstMonitor and the batch detector."""
+
+import pytest
+
+from advanced_fraud_detection import AdvancedFraudDetection
+from security_dashboard.burst_monitor import BurstDetector, BurstMonitor
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def test_burst_starts_when_window_reaches_threshold():
+    detector = BurstDetector(window_seconds=60, threshold_count=3)
+    assert detector.add(1, 0.0, 7, 70, 10) is None
+    assert detector.add(2, 10.0, 7, 70, 10) is None
+    started = detector.add(3, 20.0, 7, 70, 10)
+    assert started['transaction_ids'] == [1, 2, 3]
+    assert started['account_id'] == 7 and started['client_id'] == 70
+
+    # Still at the threshold: the same burst grows
+    assert detector.add(4, 70.0, 7, 70, 10) is None
+    # One transfer in its window: no burst
+    assert detector.add(5, 200.0, 7, 70, 10) is None
+    # A new run starts a second burst
+    detector.add(6, 210.0, 7, 70, 10)
+    assert detector.add(7, 220.0, 7, 70, 10)['transaction_ids'] == [5, 6, 7]
+
+    bursts = detector.bursts()
+    assert [b['transaction_ids'] for b in bursts] == [[1, 2, 3, 4], [5, 6, 7]]
+    assert bursts[0]['total_amount'] == 40
+    assert detector.bursts(since=100.0) == bursts[1:]
+
+    detector.prune(100.0)
+    assert detector.bursts() == bursts[1:]
+
+
+def test_late_transfer_is_slotted_into_its_window():
+    detector = BurstDetector(window_seconds=60, threshold_count=3)
+    detector.add(1, 0.0, 7, 70, 10)
+    detector.add(3, 30.0, 7, 70, 10)
+    # Counted over the window ending at its own time, which holds two transfers
+    assert detector.add(2, 20.0, 7, 70, 10) is None
+    assert detector.add(4, 40.0, 7, 70, 10)['transaction_ids'] == [1, 2, 3, 4]
+
+
+# The GROUP BY scan detect_velocity_bursts used before BurstDetector
+GROUP_BY_BURSTS = """
+    SELECT t.sender_account_id, COUNT(*), SUM(t.amount), MIN(t.transaction_date), MAX(t.transaction_date)
+    FROM transaction t
+    JOIN account a ON t.sender_account_id = a.account_id
+    WHERE t.transaction_date >= NOW() - INTERVAL '15 minutes'
+    GROUP BY a.client_id, t.sender_account_id
+    HAVING COUNT(*) >= 5
+"""
+
+
+def test_batch_detector_matches_group_by_scan(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        bursts = detector.detect_velocity_bursts()
+        with detector.conn.cursor() as cursor:
+            cursor.execute(GROUP_BY_BURSTS)
+            expected = sorted((row[0], row[1], float(row[2]), row[3], row[4]) for row in cursor.fetchall())
+    finally:
+        detector.close()
+    assert len(expected) >= 3
+    assert sorted((b['account_id'], b['transaction_count'], b['total_amount'],
+                   b['first_transaction'], b['last_transaction']) for b in bursts) == expected
+
+
+def insert_burst(conn, sender, receiver, count, start_seconds_ago):
+    with conn.cursor() as cursor:
+        for i in range(count):
+            cursor.execute("""
+                INSERT INTO Transaction (sender_account_id, receiver_account_id, amount,
+                                         transaction_date, transaction_type, status)
+                VALUES (%s, %s, 250, LOCALTIMESTAMP - %s * INTERVAL '1 second', 'P2P', 'completed')
+            """, (sender, receiver, start_seconds_ago - 20 * i))
+
+
+def without_risk(bursts):
+    return sorted(({k: v for k, v in b.items() if k != 'risk_score'} for b in bursts),
+                  key=lambda b: b['transaction_ids'])
+
+
+def test_live_monitor_matches_batch_replay(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    writers = [psycopg2.connect(**seeded_db) for _ in range(2)]
+    try:
+        # The back-dated test transfers commit minutes after their timestamps
+        monitor = BurstMonitor(window_seconds=900, threshold_count=5, history_seconds=86400,
+                               sync_interval=0, overlap_seconds=3600)
+        monitor.warm(detector.conn)
+        detector.conn.commit()
+        assert without_risk(monitor.bursts()) == without_risk(
+            detector.detect_velocity_bursts(history_minutes=1440))
+
+        with detector.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT account_id FROM account a
+                WHERE NOT EXISTS (SELECT 1 FROM transaction t
+                                  WHERE t.sender_account_id = a.account_id
+                                  AND t.transaction_date >= NOW() - INTERVAL '1 hour')
+                ORDER BY account_id LIMIT 3
+            """)
+            first, second, receiver = [r[0] for r in cursor.fetchall()]
+        detector.conn.commit()
+
+        # Two writers, the lower ids committing last
+        insert_burst(writers[0], first, receiver, 3, 300)
+        insert_burst(writers[1], second, receiver, 6, 200)
+        writers[1].commit()
+        monitor.sync(detector.conn, force=True)
+        detector.conn.commit()
+        insert_burst(writers[0], first, receiver, 3, 120)
+        writers[0].commit()
+        monitor.sync(detector.conn, force=True)
+        detector.conn.commit()
+
+        started = monitor.started()
+        assert {b['account_id'] for b in started} >= {first, second}
+        live = without_risk(monitor.bursts())
+        assert live == without_risk(detector.detect_velocity_bursts(history_minutes=1440))
+        assert {first, second} <= {b['account_id'] for b in live}
+    finally:
+        for conn in writers:
+            conn.close()
+        detector.close()
@@ -0,0 +1,76 @@
+"""ClusterGraph against NetworkX."""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from advanced_fraud_detection import AdvancedFraudDetection
+from cluster_graph import ClusterGraph, union_find
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def networkx_components(senders, receivers, weights, min_size):
+    G = nx.Graph()
+    for s, r, w in zip(senders, receivers, weights):
+        G.add_edge(int(s), int(r), weight=float(w))
+    result = {}
+    for component in nx.connected_components(G):
+        if len(component) >= min_size:
+            sub = G.subgraph(component)
+            result[min(component)] = (sorted(component), nx.density(sub), nx.average_clustering(sub),
+                                      nx.degree_centrality(sub), sub.size(weight='weight'))
+    return result
+
+
+def test_union_find_labels_components():
+    labels = union_find(7, np.array([0, 5, 3, 2]), np.array([1, 6, 2, 1]))
+    assert labels.tolist() == [0, 0, 0, 0, 4, 5, 5]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_components_match_networkx(seed):
+    rng = np.random.default_rng(seed)
+    m = 600
+    senders = rng.integers(1000, 1300, m)
+    receivers = rng.integers(1000, 1300, m)
+    # Pairs in both directions and self-transfers
+    senders[:20], receivers[:20] = receivers[20:40], senders[20:40]
+    receivers[40:45] = senders[40:45]
+    weights = rng.integers(1, 9, m)
+
+    expected = networkx_components(senders, receivers, weights, 2)
+    found = list(ClusterGraph(senders, receivers, weights).components(min_size=2))
+    assert len(found) == len(expected)
+    for component in found:
+        accounts, density, clustering, centrality, weight = expected[component['accounts'][0]]
+        assert component['accounts'] == accounts
+        assert component['size'] == len(accounts)
+        assert type(component['density']) is float
+        assert component['density'] == pytest.approx(density)
+        assert component['avg_clustering'] == pytest.approx(clustering)
+        assert component['weight'] == pytest.approx(weight)
+        top = sorted(centrality.items(), key=lambda x: (-x[1], x[0]))[:3]
+        assert component['central'] == [(a, pytest.approx(c)) for a, c in top]
+
+
+def test_sparse_and_networkx_clusters_agree(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        sparse_clusters = detector.analyze_network_clusters()
+        with detector.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT sender_account_id, receiver_account_id, COUNT(*) FROM transaction
+                WHERE transaction_date >= NOW() - INTERVAL '7 days'
+                GROUP BY sender_account_id, receiver_account_id
+                ORDER BY COUNT(*) DESC
+            """)
+            graph = ClusterGraph.from_rows(cursor.fetchall(), chunk_size=100)
+    finally:
+        detector.close()
+    assert sparse_clusters
+    networkx_clusters = list(detector._networkx_clusters(graph, 5))
+    assert len(sparse_clusters) == len(networkx_clusters)
+    for ours, theirs in zip(sorted(sparse_clusters, key=lambda c: c['accounts']),
+                            sorted(networkx_clusters, key=lambda c: c['accounts'])):
+        assert ours == pytest.approx(theirs)
@@ -0,0 +1,135 @@
+"""Incremental cluster index: ClusterIndex and the AccountCluster / NetworkCluster tables."""
+
+import datetime
+
+import numpy as np
+import pytest
+
+from advanced_fraud_detection import AdvancedFraudDetection
+from cluster_graph import ClusterGraph
+from security_dashboard.cluster_index import ClusterIndex, cluster_risk, load_account_cluster
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def ago(seconds):
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)
+
+
+def partition(index, accounts):
+    return {tuple(index.members(index.lookup(a)['cluster_id'])) for a in accounts}
+
+
+def test_clusters_match_connected_components():
+    rng = np.random.default_rng(3)
+    senders = rng.integers(0, 400, 300)
+    receivers = rng.integers(0, 400, 300)
+    index = ClusterIndex()
+    for i, (s, r) in enumerate(zip(senders.tolist(), receivers.tolist()), 1):
+        index.record(i, s, r, ago(60))
+
+    graph = ClusterGraph(senders, receivers, np.ones(len(senders)))
+    expected = {tuple(c['accounts']) for c in graph.components()}
+    assert partition(index, graph.accounts.tolist()) == expected
+    assert index.cluster_count == len(expected)
+    for component in graph.components():
+        cluster = index.lookup(component['accounts'][0])
+        assert cluster['cluster_size'] == component['size']
+        assert cluster['density'] == pytest.approx(component['density'])
+        assert cluster['risk_score'] == pytest.approx(cluster_risk(component['size'], component['density']))
+
+
+def test_record_merges_clusters_and_returns_the_senders():
+    index = ClusterIndex()
+    index.record(1, 1, 2, ago(30))
+    index.record(2, 3, 4, ago(20))
+    index.record(3, 4, 5, ago(20))
+    assert index.lookup(1)['cluster_size'] == 2
+    assert index.lookup(9) is None
+
+    cluster = index.record(4, 2, 3, ago(10))
+    assert cluster['cluster_size'] == 5 and cluster['edge_count'] == 4
+    assert index.members(cluster['cluster_id']) == [1, 2, 3, 4, 5]
+    # Seen again: nothing changes
+    assert index.record(4, 2, 3, ago(10)) == cluster
+    assert index.record(5, 3, 2, ago(5)) == cluster
+
+
+def test_rebuild_splits_clusters_whose_link_left_the_window():
+    index = ClusterIndex(window_seconds=3600)
+    index.record(1, 1, 2, ago(7200))
+    index.record(2, 2, 3, ago(60))
+    index.record(3, 4, 5, ago(60))
+    index.record(4, 5, 1, ago(60))
+    assert index.lookup(1)['cluster_size'] == 5
+
+    index.rebuild()
+    assert partition(index, [1, 2, 3, 4, 5]) == {(2, 3), (1, 4, 5)}
+
+
+def stored_clusters(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT array_agg(a.account_id ORDER BY a.account_id), c.cluster_size, c.edge_count
+            FROM AccountCluster a JOIN NetworkCluster c ON c.cluster_id = a.cluster_id
+            GROUP BY c.cluster_id, c.cluster_size, c.edge_count
+        """)
+        return {tuple(accounts): (size, edges) for accounts, size, edges in cursor.fetchall()}
+
+
+def test_incremental_runs_keep_cluster_tables_current(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        results = detector.run_incremental_analysis()
+        assert results['clusters']['accounts'] > 0
+        stored = stored_clusters(detector.conn)
+        assert all(len(accounts) == size for accounts, (size, _) in stored.items())
+        # The same components as the batch analysis
+        batch = detector.analyze_network_clusters(min_cluster_size=1)
+        assert {tuple(c['accounts']) for c in batch} == set(stored)
+
+        # Nothing new: nothing written
+        assert detector.run_incremental_analysis()['clusters'] == {'clusters': 0, 'accounts': 0, 'deleted': 0}
+
+        # A transfer that links the two largest clusters merges them
+        first, second = sorted(stored, key=len, reverse=True)[:2]
+        with detector.conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO Transaction (sender_account_id, receiver_account_id, amount,
+                                         transaction_date, transaction_type, status)
+                VALUES (%s, %s, 100, LOCALTIMESTAMP, 'P2P', 'completed')
+            """, (first[0], second[0]))
+        detector.conn.commit()
+        results = detector.run_incremental_analysis()
+        assert results['clusters']['accounts'] == min(len(first), len(second))
+        assert results['clusters']['deleted'] == 1
+
+        merged = detector.account_cluster(second[-1])
+        assert merged['cluster_size'] == len(first) + len(second)
+        assert merged['edge_count'] == stored[first][1] + stored[second][1] + 1
+        assert merged == pytest.approx(detector.cluster_index.lookup(first[0]), abs=0.01)
+        assert tuple(sorted(first + second)) in stored_clusters(detector.conn)
+    finally:
+        detector.close()
+
+
+def test_warm_replaces_stale_rows(seeded_db):
+    conn = psycopg2.connect(**seeded_db)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT account_id FROM Account ORDER BY account_id DESC LIMIT 1")
+            account_id = cursor.fetchone()[0]
+            cursor.execute("INSERT INTO NetworkCluster VALUES (-1, 1, 0, 0, 0.4)")
+            cursor.execute("INSERT INTO AccountCluster (account_id, cluster_id) VALUES (%s, -1)", (account_id,))
+        conn.commit()
+
+        index = ClusterIndex(sync_interval=0)
+        index.warm(conn)
+        index.save(conn)
+        conn.commit()
+        assert load_account_cluster(conn, account_id) == pytest.approx(index.lookup(account_id), abs=0.01)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM NetworkCluster WHERE cluster_id = -1")
+            assert cursor.fetchone()[0] == 0
+    finally:
+        conn.close()
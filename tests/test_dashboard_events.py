@@ -0,0 +1,30 @@
+"""Decoding of dashboard_events NOTIFY payloads."""
+
+from datetime import datetime
+
+import pytest
+
+app = pytest.importorskip('security_dashboard.app')
+
+
+@pytest.mark.parametrize('value, expected', [
+    # Fixed-width payload of the current trigger
+    ('2026-01-02T12:34:56.123450', datetime(2026, 1, 2, 12, 34, 56, 123450)),
+    ('2026-01-02T12:34:56.000000', datetime(2026, 1, 2, 12, 34, 56)),
+    # json_build_object of older triggers trims the fraction
+    ('2026-01-02T12:34:56.12345', datetime(2026, 1, 2, 12, 34, 56, 123450)),
+    ('2026-01-02T12:34:56.1', datetime(2026, 1, 2, 12, 34, 56, 100000)),
+    ('2026-01-02T12:34:56', datetime(2026, 1, 2, 12, 34, 56)),
+])
+def test_parse_event_date(value, expected):
+    assert app.parse_event_date(value) == expected
+
+
+def test_transaction_event_params():
+    transactions = {
+        7: {'table': 'transaction', 'op': 'insert', 'id': 7, 'date': '2026-01-02T12:00:00.5'},
+        8: {'table': 'transaction', 'op': 'update', 'id': 8, 'date': '2026-01-01T23:59:59.25'},
+    }
+    assert app.transaction_event_params(transactions) == (
+        [7, 8], datetime(2026, 1, 1, 23, 59, 59, 250000), datetime(2026, 1, 2, 12, 0, 0, 500000)
+    )
@@ -0,0 +1,100 @@
+"""The dashboard's create-transaction endpoint against a live database."""
+
+import threading
+from decimal import Decimal
+
+import pytest
+
+app = pytest.importorskip('security_dashboard.app')
+psycopg2 = pytest.importorskip('psycopg2')
+
+from security_dashboard.carousel_monitor import CarouselMonitor
+from security_dashboard.cluster_index import ClusterIndex
+from security_dashboard.db_pool import ConnectionPool
+from security_dashboard.rule_engine import RuleEngine
+from security_dashboard.velocity import VelocityStore
+
+
+@pytest.fixture
+def dashboard(schema_db, monkeypatch):
+    """Flask test client on a fresh init_db database, with empty in-memory state."""
+    config = schema_db('init_db')
+    pool = ConnectionPool(config, minconn=1, maxconn=16, timeout=30)
+    monkeypatch.setattr(app, 'db_pool', pool)
+    monkeypatch.setattr(app, 'velocity_store', VelocityStore())
+    monkeypatch.setattr(app, 'carousel_monitor', CarouselMonitor())
+    monkeypatch.setattr(app, 'cluster_index', ClusterIndex())
+    monkeypatch.setattr(app, 'fraud_rules', RuleEngine('transfer', cap=1.0))
+    yield app.app.test_client(), config
+    pool.closeall()
+
+
+def balances(config, accounts):
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT account_id, balance FROM Account WHERE account_id = ANY(%s)", (list(accounts),))
+            return dict(cursor.fetchall())
+    finally:
+        conn.close()
+
+
+def test_concurrent_transfers_keep_the_total_balance(dashboard):
+    client, config = dashboard
+    first, second = 1, 3
+    before = balances(config, (first, second))
+    results = []
+
+    def transfer(sender, receiver, count):
+        for i in range(count):
+            response = client.post('/api/create-transaction', json={
+                'sender_account_id': sender,
+                'receiver_account_id': receiver,
+                'amount': 100 + i
+            })
+            results.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=transfer, args=((first, second) if n % 2 else (second, first)) + (10,))
+               for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 80
+    assert all(code == 200 and body['success'] for code, body in results), results
+    assert any(body['status'] == 'completed' for _, body in results)
+    after = balances(config, (first, second))
+    assert sum(after.values()) == sum(before.values())
+
+    # Each balance moved by exactly the completed transfers
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT COALESCE(SUM(CASE WHEN receiver_account_id = %s THEN amount ELSE -amount END), 0)
+                FROM Transaction
+                WHERE status = 'completed' AND %s IN (sender_account_id, receiver_account_id)
+                AND transaction_id = ANY(%s)
+            """, (first, first, [body['transaction_id'] for _, body in results]))
+            assert after[first] - before[first] == cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_post_commit_failure_still_reports_the_transfer(dashboard, monkeypatch):
+    client, config = dashboard
+
+    def broken(*args):
+        raise RuntimeError('cluster index unavailable')
+
+    monkeypatch.setattr(app.cluster_index, 'record', broken)
+    before = balances(config, (1, 3))
+    response = client.post('/api/create-transaction', json={
+        'sender_account_id': 1, 'receiver_account_id': 3, 'amount': 250
+    })
+    body = response.get_json()
+    assert response.status_code == 200 and body['success']
+    assert body['cluster'] is None
+    if body['status'] == 'completed':
+        assert balances(config, (1, 3)) == {1: before[1] - Decimal(250), 3: before[3] + Decimal(250)}
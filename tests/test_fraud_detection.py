@@ -0,0 +1,136 @@
+"""Batch re-scoring of stored transactions (FraudDetectionSystem)."""
+
+import pytest
+
+from fraud_detection import FraudDetectionSystem
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def insert_risky_transfer(config):
+    """A 20000 transfer from a high-risk IP; the batch rules score it 9.0."""
+    conn = psycopg2.connect(**config)
+    with conn, conn.cursor() as cursor:
+        cursor.execute("INSERT INTO IPAddress (ip_address, risk_score) VALUES ('203.0.113.7', 0.9) RETURNING ip_address_id")
+        ip_address_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, ip_address_id)
+            VALUES (1, 2, 20000, %s)
+            RETURNING transaction_id
+        """, (ip_address_id,))
+        transaction_id = cursor.fetchone()[0]
+    conn.close()
+    return transaction_id
+
+
+def transaction_row(config, transaction_id):
+    conn = psycopg2.connect(**config)
+    with conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT fraud_score, is_flagged, flagged_reason FROM Transaction WHERE transaction_id = %s
+        """, (transaction_id,))
+        row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+@pytest.mark.parametrize('schema', ['init_db', 'enhanced'])
+def test_batch_flags_without_touching_fraud_score(schema_db, schema):
+    config = schema_db(schema)
+    transaction_id = insert_risky_transfer(config)
+    fraud_score_before = transaction_row(config, transaction_id)[0]
+
+    fds = FraudDetectionSystem(config)
+    fds.connect()
+    try:
+        summary = fds.calculate_fraud_scores_batch(transaction_ids=[transaction_id])
+        assert summary['scored'] == 1
+        assert summary['flagged'] == 1
+        assert summary['updated'] == 1
+
+        fraud_score, is_flagged, flagged_reason = transaction_row(config, transaction_id)
+        assert fraud_score == fraud_score_before
+        assert is_flagged
+        assert flagged_reason.startswith('High fraud score: ')
+
+        # A repeated run finds the transaction already flagged
+        again = fds.calculate_fraud_scores_batch(transaction_ids=[transaction_id])
+        assert again['flagged'] == 1
+        assert again['updated'] == 0
+    finally:
+        fds.disconnect()
+
+
+@pytest.mark.parametrize('schema', ['init_db', 'enhanced'])
+def test_batch_keeps_its_flags_current_and_analyst_flags(schema_db, schema):
+    config = schema_db(schema)
+    risky = insert_risky_transfer(config)
+    conn = psycopg2.connect(**config)
+    with conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, ip_address_id,
+                                     is_flagged, flagged_reason)
+            SELECT sender_account_id, receiver_account_id, amount, ip_address_id, TRUE, 'Confirmed by analyst'
+            FROM Transaction WHERE transaction_id = %s
+            RETURNING transaction_id
+        """, (risky,))
+        analyst = cursor.fetchone()[0]
+
+    fds = FraudDetectionSystem(config)
+    fds.connect()
+    try:
+        fds.calculate_fraud_scores_batch(transaction_ids=[risky, analyst])
+        with conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT transaction_id, batch_score, rescored_at IS NOT NULL, is_flagged, flagged_reason
+                FROM Transaction WHERE transaction_id = ANY(%s)
+            """, ([risky, analyst],))
+            rows = {row[0]: row[1:] for row in cursor.fetchall()}
+        assert rows[risky] == (9, True, True, 'High fraud score: 9.0')
+        assert rows[analyst] == (9, True, True, 'Confirmed by analyst')
+
+        # The IPs turn out harmless: the batch's own flag goes, the analyst's stays
+        with conn, conn.cursor() as cursor:
+            cursor.execute("UPDATE IPAddress SET risk_score = 0.1 WHERE ip_address = '203.0.113.7'")
+        summary = fds.calculate_fraud_scores_batch(transaction_ids=[risky, analyst])
+        assert (summary['flagged'], summary['updated'], summary['cleared']) == (0, 0, 1)
+        assert transaction_row(config, risky)[1:] == (False, None)
+        assert transaction_row(config, analyst)[1:] == (True, 'Confirmed by analyst')
+    finally:
+        fds.disconnect()
+        conn.close()
+
+
+@pytest.mark.parametrize('schema', ['init_db', 'enhanced'])
+def test_batch_scores_whole_table(schema_db, schema):
+    config = schema_db(schema)
+    fds = FraudDetectionSystem(config)
+    fds.connect()
+    try:
+        conn = psycopg2.connect(**config)
+        with conn, conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM Transaction")
+            total = cursor.fetchone()[0]
+        conn.close()
+
+        summary = fds.calculate_fraud_scores_batch(chunk_size=7)
+        assert summary['scored'] == total
+    finally:
+        fds.disconnect()
+
+
+@pytest.mark.parametrize('schema', ['init_db', 'enhanced'])
+def test_streamed_detectors_match_lists(schema_db, schema):
+    config = schema_db(schema)
+    insert_risky_transfer(config)
+    fds = FraudDetectionSystem(config)
+    fds.connect()
+    try:
+        high = fds.detect_high_amount_transactions(threshold=100)
+        assert high
+        assert list(fds.iter_high_amount_transactions(threshold=100, itersize=2)) == high
+        if schema == 'enhanced':
+            # init_db.sql's Device has no first_seen_date
+            assert list(fds.iter_new_devices(hours=24 * 365, itersize=2)) == fds.detect_new_devices(hours=24 * 365)
+    finally:
+        fds.disconnect()
@@ -0,0 +1,112 @@
+"""Parallel centrality and community features of the transfer graph."""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from advanced_fraud_detection import AdvancedFraudDetection
+from graph_analytics import _shards, account_centrality
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def mule_graph():
+    # Ten accounts feed account 100, which forwards to three cash-out accounts
+    senders = list(range(1, 11)) + [100, 100, 100]
+    receivers = [100] * 10 + [201, 202, 203]
+    return senders, receivers, [1] * len(senders)
+
+
+def test_hub_has_highest_pagerank_and_betweenness():
+    features = account_centrality(*mule_graph(), max_workers=1)
+    assert len(features) == 14
+    assert max(features.values(), key=lambda f: f['pagerank'])['account_id'] == 100
+    assert max(features.values(), key=lambda f: f['betweenness'])['account_id'] == 100
+    hub = features[100]
+    assert (hub['in_degree'], hub['out_degree']) == (10, 3)
+    assert hub['cluster_id'] == 1 and hub['cluster_size'] == 14
+
+
+@pytest.mark.parametrize('method', ['louvain', 'label_propagation'])
+def test_communities_split_linked_cliques(method):
+    senders, receivers = [], []
+    for group in (range(1, 6), range(11, 16)):
+        for a in group:
+            for b in group:
+                if a < b:
+                    senders.append(a)
+                    receivers.append(b)
+    senders.append(5)
+    receivers.append(11)
+    features = account_centrality(senders, receivers, [3] * len(senders), max_workers=1, communities=method)
+    assert {f['community_id'] for f in features.values()} == {1, 11}
+    assert all(f['community_size'] == 5 for f in features.values())
+    assert features[5]['community_id'] == 1 and features[11]['community_id'] == 11
+
+
+def test_workers_match_a_single_process():
+    rng = np.random.default_rng(11)
+    # Several clusters of different sizes, plus self-transfers
+    senders, receivers = [], []
+    for base, size, edges in ((0, 60, 150), (1000, 25, 50), (2000, 8, 12), (3000, 3, 3), (4000, 2, 1)):
+        senders.extend((base + rng.integers(0, size, edges)).tolist())
+        receivers.extend((base + rng.integers(0, size, edges)).tolist())
+    pairs = sorted(set(zip(senders, receivers)))
+    senders, receivers = [p[0] for p in pairs], [p[1] for p in pairs]
+    weights = rng.integers(1, 5, len(pairs))
+
+    single = account_centrality(senders, receivers, weights, max_workers=1, betweenness_samples=20)
+    parallel = account_centrality(senders, receivers, weights, max_workers=3, betweenness_samples=20)
+    # The largest cluster's betweenness is split across the workers
+    assert parallel.keys() == single.keys()
+    for account, features in single.items():
+        assert parallel[account] == pytest.approx(features)
+    assert all(f['account_id'] < 4000 for f in single.values())
+
+    # PageRank is the cluster's own
+    G = nx.DiGraph()
+    G.add_weighted_edges_from((s, r, float(w)) for s, r, w in zip(senders, receivers, weights) if 1000 <= s < 2000)
+    for account, value in nx.pagerank(G, weight='weight').items():
+        assert single[account]['pagerank'] == pytest.approx(value)
+
+
+def test_betweenness_matches_networkx():
+    senders, receivers, weights = mule_graph()
+    senders += [201, 5, 7]
+    receivers += [5, 7, 100]
+    features = account_centrality(senders, receivers, [1] * len(senders), max_workers=1)
+    G = nx.DiGraph(list(zip(senders, receivers)))
+    for account, value in nx.betweenness_centrality(G).items():
+        assert features[account]['betweenness'] == pytest.approx(value)
+
+    # Sampled: an estimate on the same scale
+    sampled = account_centrality(senders, receivers, [1] * len(senders), max_workers=1, betweenness_samples=8)
+    assert max(sampled.values(), key=lambda f: f['betweenness'])['account_id'] == 100
+
+
+def test_shards_balance_costs():
+    costs = np.array([10.0, 1.0, 6.0, 5.0, 1.0])
+    shards = _shards(costs, 2)
+    assert sorted(i for shard in shards for i in shard) == [0, 1, 2, 3, 4]
+    assert sorted(costs[shard].sum() for shard in shards) == [11.0, 12.0]
+    assert _shards(np.array([4.0]), 3) == [[0]]
+
+
+def test_rejects_unknown_community_method():
+    with pytest.raises(ValueError):
+        account_centrality(*mule_graph(), communities='girvan_newman')
+
+
+def test_detector_scores_accounts_of_clusters(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        features = detector.analyze_account_centrality(max_workers=2)
+        clusters = detector.analyze_network_clusters()
+    finally:
+        detector.close()
+    assert features
+    ranks = [f['relative_pagerank'] for f in features]
+    assert ranks == sorted(ranks, reverse=True)
+    assert {f['account_id'] for f in features} == {a for c in clusters for a in c['accounts']}
+    sizes = {c['accounts'][0]: c['cluster_size'] for c in clusters}
+    assert all(sizes[f['cluster_id']] == f['cluster_size'] for f in features)
@@ -0,0 +1,78 @@
+"""migrate_transaction_partitions.sql on a database created from schema.sql and schema_additions.sql."""
+
+import os
+
+import pytest
+
+from conftest import ROOT
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+MIGRATION = os.path.join(ROOT, 'migrate_transaction_partitions.sql')
+
+
+def migrate(conn):
+    with conn.cursor() as cursor, open(MIGRATION, encoding='utf-8') as f:
+        cursor.execute(f.read())
+    conn.commit()
+
+
+def scalar(conn, query, args=()):
+    with conn.cursor() as cursor:
+        cursor.execute(query, args)
+        return cursor.fetchone()[0]
+
+
+def test_migration_partitions_the_legacy_table(schema_db):
+    conn = psycopg2.connect(**schema_db('legacy'))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, transaction_date,
+                                         transaction_type, status)
+                VALUES (1, 2, 700, LOCALTIMESTAMP - INTERVAL '3 days', 'P2P', 'completed'),
+                       (2, 1, 800, LOCALTIMESTAMP - INTERVAL '2 days', 'P2P', 'completed')
+            """)
+            # Written by an earlier schema_additions.sql
+            cursor.execute("ALTER TABLE Alert ADD FOREIGN KEY (transaction_id) REFERENCES Transaction(transaction_id)")
+            cursor.execute("INSERT INTO Alert (alert_type, severity, transaction_id) VALUES ('fraud', 'high', 1)")
+            cursor.execute("CREATE VIEW v_amounts AS SELECT transaction_id, amount FROM Transaction")
+            cursor.execute("CREATE VIEW v_total AS SELECT SUM(amount) AS total FROM v_amounts")
+            cursor.execute("SELECT transaction_id, amount FROM Transaction ORDER BY 1")
+            before = cursor.fetchall()
+        conn.commit()
+
+        migrate(conn)
+        assert scalar(conn, "SELECT COUNT(*) FROM pg_partitioned_table WHERE partrelid = 'transaction'::regclass") == 1
+        assert scalar(conn, "SELECT COUNT(*) FROM transaction_default") == 0
+        assert scalar(conn, "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = 'transaction'::regclass") >= 4
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT transaction_id, amount FROM Transaction ORDER BY 1")
+            assert cursor.fetchall() == before
+        assert scalar(conn, "SELECT total FROM v_total") == sum(amount for _, amount in before)
+        assert scalar(conn, "SELECT COUNT(*) FROM pg_constraint WHERE confrelid = 'transaction'::regclass") == 0
+        assert scalar(conn, "SELECT to_regclass('idx_alert_transaction') IS NOT NULL")
+        assert scalar(conn, "SELECT to_regclass('idx_transaction_sender') IS NOT NULL")
+        assert scalar(conn, """
+            SELECT COUNT(*) FROM pg_trigger
+            WHERE tgrelid = 'transaction'::regclass AND tgname = 'trigger_update_client_stats'
+        """) == 1
+
+        # The sequence carries on and foreign keys still hold
+        new_id = scalar(conn, """
+            INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, transaction_type, status)
+            VALUES (3, 1, 50, 'P2P', 'completed') RETURNING transaction_id
+        """)
+        assert new_id == before[-1][0] + 1
+        with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+            scalar(conn, """
+                INSERT INTO Transaction (sender_account_id, receiver_account_id, amount, transaction_type, status)
+                VALUES (999, 1, 50, 'P2P', 'completed') RETURNING transaction_id
+            """)
+        conn.rollback()
+
+        # A second run leaves the table alone
+        migrate(conn)
+        assert scalar(conn, "SELECT COUNT(*) FROM Transaction") == len(before)
+    finally:
+        conn.close()
@@ -0,0 +1,104 @@
+"""Incremental detection and TransactionPattern persistence."""
+
+import numpy as np
+import pytest
+
+from advanced_fraud_detection import AdvancedFraudDetection
+from pattern_store import PatternStore, merge_key
+from transaction_graph import TemporalGraph, find_temporal_cycles
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+
+def cycles(graph, max_length=6):
+    return {tuple(ids) for _, ids, _, _ in find_temporal_cycles(graph.cycle_candidates(), 3, max_length)}
+
+
+def test_around_keeps_every_cycle_through_masked_edges():
+    rng = np.random.default_rng(7)
+    n = 600
+    senders = rng.integers(0, 150, n)
+    receivers = rng.integers(0, 150, n)
+    graph = TemporalGraph(np.arange(1, n + 1), senders, receivers,
+                          np.full(n, 100.0), np.sort(rng.uniform(0, 3600, n)))
+    new = graph.out_txid > 590
+
+    expected = {c for c in cycles(graph, 4) if max(c) > 590}
+    around = graph.around(new, 3)
+    assert around.num_edges < graph.num_edges
+    assert {c for c in cycles(around, 4) if max(c) > 590} == expected
+
+
+def test_merge_key_identifies_carousel_ring():
+    a = {'pattern_type': 'carousel', 'account_path': [1, 2, 3, 1]}
+    b = {'pattern_type': 'carousel', 'account_path': [2, 3, 1, 2]}
+    c = {'pattern_type': 'carousel', 'account_path': [1, 2, 4, 1]}
+    assert merge_key(a) == merge_key(b) != merge_key(c)
+
+
+def stored_patterns(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT pattern_type, account_ids, transaction_ids, transaction_count, total_amount
+            FROM TransactionPattern WHERE is_active ORDER BY pattern_id
+        """)
+        return cursor.fetchall()
+
+
+def test_incremental_runs_persist_and_merge_patterns(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        first = detector.run_incremental_analysis()
+        assert first['inserted'] > 0
+        stored = stored_patterns(detector.conn)
+        assert {'carousel', 'burst'} <= {row[0] for row in stored}
+        with detector.conn.cursor() as cursor:
+            cursor.execute("SELECT detector FROM DetectorState ORDER BY detector")
+            assert [r[0] for r in cursor.fetchall()] == ['detect_carousel_patterns', 'detect_layered_transactions']
+        detector.conn.commit()
+
+        # Nothing new: everything found again merges into the stored rows
+        second = detector.run_incremental_analysis()
+        assert second['inserted'] == 0
+        assert len(stored_patterns(detector.conn)) == len(stored)
+
+        # Another round of an already stored carousel ring
+        ring = next(row for row in stored if row[0] == 'carousel')
+        accounts = ring[1]
+        with detector.conn.cursor() as cursor:
+            new_ids = []
+            for i, sender in enumerate(accounts):
+                cursor.execute("""
+                    INSERT INTO Transaction (sender_account_id, receiver_account_id, amount,
+                                             transaction_date, transaction_type, status)
+                    VALUES (%s, %s, 5000, LOCALTIMESTAMP - %s * INTERVAL '1 second', 'P2P', 'completed')
+                    RETURNING transaction_id
+                """, (sender, accounts[(i + 1) % len(accounts)], len(accounts) - i))
+                new_ids.append(cursor.fetchone()[0])
+        detector.conn.commit()
+
+        third = detector.run_incremental_analysis()
+        assert third['merged'] > 0
+        rings = [row for row in stored_patterns(detector.conn) if row[0] == 'carousel' and row[1] == accounts]
+        assert len(rings) == 1
+        merged = rings[0]
+        assert set(new_ids) <= set(merged[2])
+        assert set(ring[2]) <= set(merged[2])
+        assert merged[3] == len(merged[2]) == len(ring[2]) + len(new_ids)
+        with detector.conn.cursor() as cursor:
+            cursor.execute("SELECT SUM(amount) FROM Transaction WHERE transaction_id = ANY(%s)", (merged[2],))
+            assert merged[4] == cursor.fetchone()[0]
+    finally:
+        detector.close()
+
+
+def test_expire_deactivates_idle_patterns(seeded_db):
+    detector = AdvancedFraudDetection(seeded_db)
+    try:
+        detector.run_incremental_analysis()
+        store = PatternStore(detector.conn)
+        assert store.expire('carousel', 0) > 0
+        detector.conn.commit()
+        assert 'carousel' not in {row[0] for row in stored_patterns(detector.conn)}
+    finally:
+        detector.close()
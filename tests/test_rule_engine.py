@@ -0,0 +1,144 @@
+"""Compiled fraud rule plans (rule_engine)."""
+
+import random
+from decimal import Decimal
+
+import pytest
+
+from security_dashboard.rule_engine import (
+    BATCH_RULES, TRANSFER_RULES, RulePlan, RuleRow, score_transfer, score_transfers,
+    transfer_features, transfer_flags
+)
+
+np = pytest.importorskip('numpy')
+
+TRANSFER_VARIANTS = {
+    'built-in': TRANSFER_RULES,
+    'auto-block, 5min velocity, 22-06 night': [
+        row._replace(auto_block=True) if row.rule_code == 'BLOCKED_RECEIVER'
+        else row._replace(time_window='5min', threshold=3) if row.rule_code == 'HIGH_VELOCITY'
+        else row._replace(time_window='22:00-06:00') if row.rule_code == 'NIGHT_TRANSACTION'
+        else row
+        for row in TRANSFER_RULES
+    ],
+}
+
+# Scores that fall on a half cent, where np.round (which scales by 100
+# first) and round() on the binary value disagree
+NEAR_TIES = [
+    # amount, sender risk, receiver risk, 1hour velocity -> score
+    ((100000.01, Decimal('0'), Decimal('0.95'), 5), 0.83),     # 0.835
+    ((100000.01, Decimal('0'), Decimal('0.65'), 0), 0.49),     # 0.495, not review
+    ((100000.01, Decimal('0.55'), Decimal('0.55'), 0), 0.69),  # 0.685
+    ((100000.01, Decimal('0.55'), Decimal('0.75'), 5), 0.99),  # 0.995, not blocked
+]
+
+# Batch rows as seeded in enhanced_schema.sql: HighRiskIP auto-blocks
+SEEDED_BATCH_RULES = [
+    RuleRow(1, 'HIGH_AMOUNT', 10000, 5.0, None, 1, False),
+    RuleRow(2, 'HIGH_RISK_IP', 0.8, 4.0, None, 1, True),
+    RuleRow(3, 'HIGH_RISK_DEVICE', 0.8, 3.0, None, 1, False),
+]
+
+BATCH_CASES = [
+    # amount, device risk, ip risk -> score, blocked by
+    ((20000.0, 0.9, 0.9), 12.0, 'HIGH_RISK_IP'),
+    ((20000.0, 0.1, 0.9), 9.0, 'HIGH_RISK_IP'),
+    ((20000.0, 0.9, 0.1), 8.0, None),
+    ((500.0, float('nan'), 0.9), 4.0, 'HIGH_RISK_IP'),
+    ((500.0, float('nan'), float('nan')), 0.0, None),
+]
+
+
+@pytest.mark.parametrize('features, score, blocked_by', BATCH_CASES)
+def test_uncapped_plan_scores_every_rule_of_an_auto_blocked_transaction(features, score, blocked_by):
+    amount, device_risk, ip_risk = features
+    plan = RulePlan(SEEDED_BATCH_RULES)
+    got_score, flags, _, got_blocked_by = plan.evaluate(
+        {'amount': amount, 'device_risk': device_risk, 'ip_risk': ip_risk}
+    )
+    assert got_score == score
+    assert got_blocked_by == blocked_by
+
+    # Same points as the built-in rules, which have no auto_block
+    expected, _, _, _ = RulePlan(BATCH_RULES).evaluate(
+        {'amount': amount, 'device_risk': device_risk, 'ip_risk': ip_risk}
+    )
+    assert got_score == expected
+
+
+def test_uncapped_arrays_match_scalar_plan():
+    plan = RulePlan(SEEDED_BATCH_RULES)
+    columns = {
+        name: np.array([case[0][i] for case in BATCH_CASES])
+        for i, name in enumerate(('amount', 'device_risk', 'ip_risk'))
+    }
+    scores, hits, blocked = plan.evaluate_arrays(columns, len(BATCH_CASES))
+    assert scores.tolist() == [score for _, score, _ in BATCH_CASES]
+    assert blocked.tolist() == [blocked_by is not None for _, _, blocked_by in BATCH_CASES]
+    assert hits.sum(axis=1).tolist() == [3, 2, 2, 1, 0]
+
+
+def test_capped_plan_stops_at_an_auto_blocking_rule():
+    plan = RulePlan(SEEDED_BATCH_RULES, cap=1.0)
+    score, flags, _, blocked_by = plan.evaluate({'amount': 20000.0, 'device_risk': 0.9, 'ip_risk': 0.9})
+    assert (score, flags, blocked_by) == (1.0, ['HIGH_RISK_IP'], 'HIGH_RISK_IP')
+
+
+def check_fraud_equivalence(plan, amounts, sender_risks, receiver_risks, blocked, hours, velocity):
+    """Assert score_transfers matches score_transfer (check_fraud) row for row."""
+    result = score_transfers(
+        plan, amounts,
+        [np.nan if r is None else float(r) for r in sender_risks],
+        [np.nan if r is None else float(r) for r in receiver_risks],
+        blocked, hours, velocity
+    )
+    for i in range(len(amounts)):
+        expected = score_transfer(plan, transfer_features(
+            {'risk_level': sender_risks[i]},
+            {'risk_level': receiver_risks[i], 'is_blocked': blocked[i]},
+            amounts[i],
+            {window: counts[i] for window, counts in velocity.items()},
+            hours[i]
+        ))
+        got = (float(result['score'][i]), bool(result['is_flagged'][i]), transfer_flags(result, i))
+        assert got == (expected['score'], expected['is_flagged'], expected['flags']), i
+    return result
+
+
+@pytest.mark.parametrize('variant', sorted(TRANSFER_VARIANTS))
+def test_score_transfers_matches_check_fraud(variant):
+    rnd = random.Random(7)
+    size = 5000
+    plan = RulePlan(TRANSFER_VARIANTS[variant], cap=1.0)
+    amount_choices = [50000.0, 50000.01, 100000.0, 100000.01, 10000.0, 9999.99, 20000.0]
+    amounts = [
+        rnd.choice(amount_choices) if rnd.random() < 0.3
+        else rnd.randint(1, 30) * 10000.0 if rnd.random() < 0.3
+        else rnd.randint(1, 30000000) / 100
+        for _ in range(size)
+    ]
+    # Risk levels are DECIMAL(3,2); None stands for NULL
+    risks = [[None if rnd.random() < 0.05 else Decimal(rnd.randint(0, 100)) / 100 for _ in range(size)]
+             for _ in range(2)]
+    blocked = [rnd.random() < 0.1 for _ in range(size)]
+    hours = [rnd.randrange(24) for _ in range(size)]
+    velocity = {window: [rnd.randrange(7) for _ in range(size)] for window in plan.velocity_windows}
+
+    result = check_fraud_equivalence(plan, amounts, risks[0], risks[1], blocked, hours, velocity)
+    assert 0 < result['is_flagged'].sum() < size
+
+
+def test_score_transfers_rounds_near_ties_like_check_fraud():
+    plan = RulePlan(TRANSFER_RULES, cap=1.0)
+    cases = [case for case, _ in NEAR_TIES]
+    result = check_fraud_equivalence(
+        plan,
+        [amount for amount, _, _, _ in cases],
+        [sender for _, sender, _, _ in cases],
+        [receiver for _, _, receiver, _ in cases],
+        [False] * len(cases),
+        [12] * len(cases),
+        {'1hour': [velocity for _, _, _, velocity in cases]}
+    )
+    assert result['score'].tolist() == [score for _, score in NEAR_TIES]
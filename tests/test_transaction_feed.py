@@ -0,0 +1,139 @@
+"""Catch-up of the in-memory transaction views (VelocityStore, CarouselMonitor)."""
+
+import asyncio
+
+import pytest
+
+from security_dashboard.carousel_monitor import CarouselMonitor
+from security_dashboard.velocity import VelocityStore
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+INSERT = """
+    INSERT INTO Transaction (sender_account_id, receiver_account_id, amount)
+    VALUES (%s, %s, %s)
+    RETURNING transaction_id, transaction_date
+"""
+
+
+def insert(conn, sender, receiver, amount=100):
+    with conn.cursor() as cursor:
+        cursor.execute(INSERT, (sender, receiver, amount))
+        return cursor.fetchone()
+
+
+@pytest.fixture
+def connections(schema_db):
+    config = schema_db('init_db')
+    conns = [psycopg2.connect(**config) for _ in range(3)]
+    yield conns
+    for conn in conns:
+        conn.close()
+
+
+def test_velocity_counts_transfers_committed_out_of_id_order(connections):
+    first, second, reader = connections
+    store = VelocityStore(sync_interval=0)
+    store.warm(reader)
+    reader.commit()
+    before = store.count(1, '1day')
+
+    # The lower id commits last
+    early_id, early_date = insert(first, 1, 2)
+    late_id, late_date = insert(second, 1, 2)
+    assert early_id < late_id
+    second.commit()
+    store.sync(reader, force=True)
+    reader.commit()
+    assert store.count(1, '1day') == before + 1
+
+    first.commit()
+    store.sync(reader, force=True)
+    reader.commit()
+    assert store.count(1, '1day') == before + 2
+
+    # Recording after the catch-up counts nothing twice
+    store.record(early_id, 1, early_date, 100)
+    store.record(late_id, 1, late_date, 100)
+    assert store.count(1, '1day') == before + 2
+
+    # A writer's own record of an id below the mark is still counted
+    low_id, low_date = insert(first, 1, 2)
+    insert(second, 1, 2)
+    second.commit()
+    store.sync(reader, force=True)
+    reader.commit()
+    first.commit()
+    store.record(low_id, 1, low_date, 100)
+    assert store.count(1, '1day') == before + 4
+
+
+def test_carousel_closed_by_a_claimed_transfer_is_found(connections):
+    writer, _, reader = connections
+    monitor = CarouselMonitor(sync_interval=0)
+    monitor.warm(reader)
+    reader.commit()
+
+    for sender, receiver in ((1, 2), (2, 3)):
+        transaction_id, transaction_date = insert(writer, sender, receiver)
+        writer.commit()
+        monitor.record(transaction_id, sender, receiver, transaction_date, 100)
+
+    closing_id, closing_date = insert(writer, 3, 1)
+    monitor.claim(closing_id)
+    writer.commit()
+    # Another request's catch-up runs between commit and record
+    monitor.sync(reader, force=True)
+    reader.commit()
+
+    carousels = monitor.record(closing_id, 3, 1, closing_date, 100)
+    assert [c['account_path'] for c in carousels] == [[3, 1, 2, 3]]
+    assert monitor.record(closing_id, 3, 1, closing_date, 100) == []
+
+
+def test_released_claim_is_caught_up(connections):
+    writer, _, reader = connections
+    monitor = CarouselMonitor(sync_interval=0)
+    monitor.warm(reader)
+    reader.commit()
+    edges = monitor.edge_count
+
+    transaction_id, _ = insert(writer, 1, 2)
+    monitor.claim(transaction_id)
+    writer.commit()
+    monitor.sync(reader, force=True)
+    reader.commit()
+    assert monitor.edge_count == edges
+
+    monitor.release(transaction_id)
+    monitor.sync(reader, force=True)
+    reader.commit()
+    assert monitor.edge_count == edges + 1
+
+
+def test_async_warm_streams_the_same_window(connections):
+    asyncpg = pytest.importorskip('asyncpg')
+    writer, _, reader = connections
+    for sender, receiver in ((1, 2), (2, 3), (3, 1), (1, 3), (1, 2)):
+        insert(writer, sender, receiver)
+    writer.commit()
+    expected = VelocityStore()
+    expected.warm(reader)
+    reader.commit()
+    params = reader.get_dsn_parameters()
+
+    async def warm():
+        conn = await asyncpg.connect(host=params.get('host'), port=params.get('port'),
+                                     user=params.get('user'), database=params['dbname'])
+        try:
+            store = VelocityStore()
+            await store.warm_async(conn, batch_size=2)
+            return store
+        finally:
+            await conn.close()
+
+    store = asyncio.run(warm())
+    assert store.warmed
+    for account_id in (1, 2, 3):
+        assert store.snapshot(account_id) == expected.snapshot(account_id)
+    assert store.count(1, '1day') >= 3
@@ -0,0 +1,70 @@
+"""Path searches over TemporalGraph."""
+
+from transaction_graph import TemporalGraph, find_layered_chains
+
+
+def graph(edges):
+    """edges: (transaction_id, sender, receiver, amount, ts)"""
+    return TemporalGraph(*zip(*edges))
+
+
+def chains(g, **kwargs):
+    return sorted((path, ids) for path, ids, _, _, _ in find_layered_chains(g, **kwargs))
+
+
+def test_chain_follows_money_forward():
+    g = graph([
+        (1, 10, 11, 1000.0, 0.0),
+        (2, 11, 12, 980.0, 60.0),
+        (3, 12, 13, 960.0, 120.0),
+        (4, 13, 14, 950.0, 180.0),
+        # Unrelated transfers out of the chain's accounts
+        (5, 11, 20, 100.0, 90.0),
+        (6, 13, 21, 5000.0, 200.0),
+    ])
+    # Only the maximal chain, not its prefixes or suffixes
+    assert chains(g, min_layers=3) == [([10, 11, 12, 13, 14], [1, 2, 3, 4])]
+    assert chains(g, min_layers=3, max_layers=3) == [([10, 11, 12, 13], [1, 2, 3])]
+    assert chains(g, min_layers=5) == []
+
+    path, ids, total, first_ts, last_ts = next(find_layered_chains(g))
+    assert total == 3890.0
+    assert (first_ts, last_ts) == (0.0, 180.0)
+
+
+def test_hops_must_be_ordered_in_time():
+    g = graph([
+        (1, 10, 11, 1000.0, 100.0),
+        (2, 11, 12, 990.0, 50.0),
+        (3, 12, 13, 980.0, 200.0),
+    ])
+    assert chains(g, min_layers=2) == [([11, 12, 13], [2, 3])]
+
+
+def test_amount_decay_and_dwell_limits():
+    edges = [
+        (1, 10, 11, 1000.0, 0.0),
+        (2, 11, 12, 850.0, 60.0),
+        (3, 12, 13, 840.0, 4000.0),
+    ]
+    g = graph(edges)
+    # 15% lost on the second hop
+    assert chains(g, min_layers=2, amount_tolerance=0.1) == [([11, 12, 13], [2, 3])]
+    assert chains(g, min_layers=3, amount_tolerance=0.2) == [([10, 11, 12, 13], [1, 2, 3])]
+    # The third hop waits more than an hour
+    assert chains(g, min_layers=2, amount_tolerance=0.2, max_dwell=3600) == [([10, 11, 12], [1, 2])]
+
+    # Money does not grow along a chain
+    g = graph(edges[:1] + [(2, 11, 12, 1200.0, 60.0), (3, 12, 13, 1190.0, 120.0)])
+    assert chains(g, min_layers=2) == [([11, 12, 13], [2, 3])]
+
+
+def test_chains_do_not_revisit_accounts():
+    g = graph([
+        (1, 10, 11, 1000.0, 0.0),
+        (2, 11, 12, 990.0, 10.0),
+        (3, 12, 10, 980.0, 20.0),
+        (4, 10, 13, 970.0, 30.0),
+    ])
+    # Going on to 13 would pass through 10 twice
+    assert chains(g, min_layers=2) == [([10, 11, 12], [1, 2])]
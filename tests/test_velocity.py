@@ -0,0 +1,51 @@
+"""Window boundaries of the in-process velocity counters."""
+
+from security_dashboard.transaction_feed import from_epoch
+from security_dashboard.velocity import VelocityStore
+
+NOW = 1767225600.0  # 2026-01-01 00:00:00
+
+
+def store_at(now):
+    store = VelocityStore()
+    store.now = lambda: now
+    return store
+
+
+def record(store, transaction_id, account_id, seconds_ago, amount=100):
+    store.record(transaction_id, account_id, from_epoch(NOW - seconds_ago), amount)
+
+
+def test_hour_window_counts_like_the_interval_query():
+    store = store_at(NOW)
+    # transaction_date >= NOW() - INTERVAL '1 hour': the transfer exactly an
+    # hour old is in, the one a millisecond older is out
+    for transaction_id, seconds_ago in enumerate((3600.001, 3600, 3599.999, 3540.5, 1799, 59.5, 0), 1):
+        record(store, transaction_id, 7, seconds_ago, amount=transaction_id)
+    assert store.count(7, '1hour') == 6
+    assert store.amount(7, '1hour') == sum(range(2, 8))
+    assert store.count(7, '1min') == 2
+    assert store.count(7, '15min') == 2
+    assert store.count(7, '1day') == 7
+    assert store.count(8, '1hour') == 0
+
+
+def test_counts_follow_the_clock_and_late_transfers():
+    now = [NOW]
+    store = VelocityStore()
+    store.now = lambda: now[0]
+    record(store, 1, 7, 30)
+    record(store, 2, 7, 10)
+    # Caught up after a later transfer
+    record(store, 3, 7, 50)
+    assert store.count(7, '1min') == 3
+
+    now[0] = NOW + 11
+    assert store.count(7, '1min') == 2
+    now[0] = NOW + 50
+    assert store.snapshot(7)['1min'] == {'transaction_count': 1, 'amount': 100.0}
+    assert store.count(7, '1hour') == 3
+
+    now[0] = NOW + 86400
+    assert store.prune() == 1
+    assert store.count(7, '1day') == 0
@@ -3,14 +3,76 @@ import psycopg2.extras
 import random
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable, Iterator, Sequence
 import logging
 import json
+import io
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CLIENT_COLUMNS = ('client_id', 'first_name', 'last_name', 'date_of_birth', 'phone_number', 'email',
+                  'registration_date', 'kyc_status', 'risk_level', 'risk_category',
+                  'last_login_date', 'login_count', 'failed_login_attempts')
+DEVICE_COLUMNS = ('device_id', 'device_fingerprint', 'device_type', 'os', 'os_version', 'browser',
+                  'browser_version', 'user_agent', 'screen_resolution', 'timezone', 'language',
+                  'risk_score', 'is_emulator', 'is_rooted', 'vpn_detected', 'reputation_score')
+IP_COLUMNS = ('ip_address_id', 'ip_address', 'country', 'country_code', 'city', 'region', 'latitude',
+              'longitude', 'isp', 'organization', 'asn', 'risk_score', 'is_proxy', 'is_tor', 'is_vpn',
+              'is_datacenter', 'is_mobile', 'threat_level', 'reputation_score')
+ACCOUNT_COLUMNS = ('account_id', 'client_id', 'account_number', 'account_type', 'currency', 'balance',
+                   'card_expiry_date', 'card_type', 'bank_name', 'is_verified', 'daily_limit', 'monthly_limit')
+TRANSACTION_COLUMNS = ('sender_account_id', 'receiver_account_id', 'amount', 'currency',
+                       'transaction_date', 'transaction_type', 'status', 'ip_address_id', 'device_id',
+                       'location_city', 'location_country', 'description', 'fraud_score', 'is_flagged',
+                       'is_suspicious', 'processing_time_ms', 'velocity_score', 'anomaly_score', 'chargeback_risk')
+
+
+def _copy_value(value) -> str:
+    """Format a Python value for PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    text = str(value)
+    if '\\' in text or '\t' in text or '\n' in text or '\r' in text:
+        text = (text.replace('\\', '\\\\').replace('\t', '\\t')
+                    .replace('\n', '\\n').replace('\r', '\\r'))
+    return text
+
+
+class _CopyStream(io.RawIOBase):
+    """Read-only file object that feeds COPY FROM STDIN from a row iterator"""
+
+    def __init__(self, rows: Iterable[Sequence]):
+        self._rows = iter(rows)
+        self._buffer = b''
+        self.rows_written = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                break
+            self._buffer += ('\t'.join(_copy_value(v) for v in row) + '\n').encode('utf-8')
+            self.rows_written += 1
+        if size < 0:
+            chunk, self._buffer = self._buffer, b''
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+
 class TransactionGenerator:
     def __init__(self, db_config):
         self.db_config = db_config
@@ -484,6 +546,8 @@ class TransactionGenerator:
         # Insert transactions
         try:
             with self.conn.cursor() as cursor:
+                if all_transactions:
+                    self._ensure_transaction_partitions(cursor, min(t['transaction_date'] for t in all_transactions))
                 for transaction in all_transactions:
                     cursor.execute("""
                         INSERT INTO transaction (sender_account_id, receiver_account_id, amount, currency,
@@ -511,6 +575,228 @@ class TransactionGenerator:
         
         logger.info("Data generation completed successfully!")
     
+    def bulk_generate_all_data(self, num_clients: int = 10000, num_normal_transactions: int = 1000000,
+                               num_devices: int = 1000, num_ips: int = 800, chunk_size: int = 100000,
+                               defer_triggers: bool = True) -> None:
+        """Generate and load test data through COPY FROM STDIN.
+
+        Ids are reserved from the table sequences up front, one round-trip
+        per chunk, so rows can be streamed without RETURNING. Transactions
+        are generated chunk by chunk and never held in memory all at once;
+        only the account id array is kept, so memory stays flat for 10M+ rows.
+
+        With defer_triggers the per-row statistics triggers on transaction are
+        disabled during the load and their effect is applied afterwards with
+        one set-based UPDATE per table and a dashboard counter recount
+        (requires table ownership).
+        """
+        logger.info("Starting bulk data generation...")
+        account_ids, devices, ips = self.bulk_load_base_data(num_clients, num_devices, num_ips, chunk_size)
+
+        if len(account_ids) < 2:
+            logger.warning("Not enough accounts to generate transactions")
+            return
+
+        cursor = self.conn.cursor()
+        account_ids = np.asarray(account_ids, dtype=np.int64)
+        device_ids = np.asarray([d['device_id'] for d in devices], dtype=np.int64)
+
+        try:
+            # Generated dates reach back at most 31 days
+            self._ensure_transaction_partitions(cursor, datetime.now() - timedelta(days=31))
+            cursor.execute("SELECT COALESCE(MAX(transaction_id), 0) FROM transaction")
+            watermark = cursor.fetchone()[0]
+            if defer_triggers:
+                cursor.execute("ALTER TABLE transaction DISABLE TRIGGER USER")
+
+            loaded = 0
+            for offset in range(0, num_normal_transactions, chunk_size):
+                count = min(chunk_size, num_normal_transactions - offset)
+                loaded += self._copy_rows(cursor, 'transaction', TRANSACTION_COLUMNS,
+                                          self._iter_bulk_transactions(account_ids, device_ids, ips, count))
+                self.conn.commit()
+                logger.info(f"Loaded {loaded}/{num_normal_transactions} transactions")
+
+            # Fraud patterns only need a small sample of accounts
+            sample = [{'account_id': int(a)} for a in np.random.choice(account_ids, min(len(account_ids), 1000), replace=False)]
+            fraudulent = self.generate_fraudulent_transactions(sample, devices, ips)
+            loaded += self._copy_rows(cursor, 'transaction', TRANSACTION_COLUMNS,
+                                      (tuple(t[c] for c in TRANSACTION_COLUMNS) for t in fraudulent))
+
+            if defer_triggers:
+                cursor.execute("ALTER TABLE transaction ENABLE TRIGGER USER")
+                self._apply_client_stats(cursor, watermark)
+                cursor.execute("SELECT refresh_stats_counters()")
+            self.conn.commit()
+
+            for table in ('client', 'account', 'device', 'ipaddress', 'transaction'):
+                cursor.execute(f"ANALYZE {table}")
+            self.conn.commit()
+            logger.info(f"Loaded {loaded} transactions")
+
+        except Exception as e:
+            logger.error(f"Error bulk loading transactions: {e}")
+            self.conn.rollback()
+            if defer_triggers:
+                cursor.execute("ALTER TABLE transaction ENABLE TRIGGER USER")
+                self.conn.commit()
+            raise
+        finally:
+            cursor.close()
+
+        logger.info("Bulk data generation completed successfully!")
+
+    def bulk_load_base_data(self, num_clients: int, num_devices: int = 1000, num_ips: int = 800,
+                            chunk_size: int = 100000) -> Tuple[List[int], List[Dict], List[Dict]]:
+        """Load devices, IP addresses, clients and their accounts through COPY FROM STDIN.
+
+        Returns the new account ids and the device and IP dicts with their
+        database ids, for generating transactions between them.
+        """
+        cursor = self.conn.cursor()
+        account_ids = []
+
+        try:
+            # Devices and IP addresses
+            devices = self.generate_realistic_devices(num_devices)
+            for device, device_id in zip(devices, self._reserve_ids(cursor, 'device', 'device_id', len(devices))):
+                device['device_id'] = device_id
+                device['device_fingerprint'] = f"fp_{device_id:012d}_{random.randint(1000, 9999)}"
+            self._copy_rows(cursor, 'device', DEVICE_COLUMNS,
+                            (tuple(d[c] for c in DEVICE_COLUMNS) for d in devices))
+
+            # Skip addresses already present, e.g. the schema's sample rows
+            cursor.execute("SELECT host(ip_address) FROM ipaddress")
+            known = {row[0] for row in cursor.fetchall()}
+            ips = list({ip['ip_address']: ip for ip in self.generate_realistic_ips(num_ips)
+                        if ip['ip_address'] not in known}.values())
+            for ip, ip_address_id in zip(ips, self._reserve_ids(cursor, 'ipaddress', 'ip_address_id', len(ips))):
+                ip['ip_address_id'] = ip_address_id
+            self._copy_rows(cursor, 'ipaddress', IP_COLUMNS,
+                            (tuple(ip[c] for c in IP_COLUMNS) for ip in ips))
+
+            # Clients and their accounts, chunk by chunk
+            for offset in range(0, num_clients, chunk_size):
+                clients = self.generate_realistic_clients(min(chunk_size, num_clients - offset))
+                for client, client_id in zip(clients, self._reserve_ids(cursor, 'client', 'client_id', len(clients))):
+                    client['client_id'] = client_id
+                self._copy_rows(cursor, 'client', CLIENT_COLUMNS,
+                                (tuple(c[col] for col in CLIENT_COLUMNS) for c in clients))
+
+                accounts = self.generate_accounts_for_clients(clients)
+                for account, account_id in zip(accounts, self._reserve_ids(cursor, 'account', 'account_id', len(accounts))):
+                    account['account_id'] = account_id
+                    account['client_id'] = clients[account['temp_client_id']]['client_id']
+                    # Derive the number from the id so it is unique at any volume
+                    prefix = {'card': '4276', 'bank_account': '408178', 'digital_wallet': 'WALLET'}[account['account_type']]
+                    account['account_number'] = f"{prefix}{account_id:012d}"
+                self._copy_rows(cursor, 'account', ACCOUNT_COLUMNS,
+                                (tuple(a[c] for c in ACCOUNT_COLUMNS) for a in accounts))
+                account_ids.extend(a['account_id'] for a in accounts)
+                self.conn.commit()
+
+            logger.info(f"Loaded {num_clients} clients, {len(devices)} devices, {len(ips)} IPs, {len(account_ids)} accounts")
+        except Exception as e:
+            logger.error(f"Error bulk loading base data: {e}")
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        return account_ids, devices, ips
+
+    def _iter_bulk_transactions(self, account_ids: np.ndarray, device_ids: np.ndarray,
+                                ips: List[Dict], count: int) -> Iterator[Tuple]:
+        """Yield normal transaction rows with the same distributions as generate_normal_transactions"""
+        n = len(account_ids)
+        sender_idx = np.random.randint(0, n, count)
+        # Offset by 1..n-1 so the receiver never equals the sender
+        receiver_idx = (sender_idx + np.random.randint(1, n, count)) % n
+        amounts = self._generate_realistic_amounts(count)
+        offsets = (np.random.randint(0, 31, count) * 86400
+                   + np.random.randint(0, 24, count) * 3600
+                   + np.random.randint(0, 60, count) * 60)
+        statuses = np.random.choice(['completed', 'pending', 'failed'], count, p=[0.95, 0.04, 0.01])
+        descriptions = np.random.choice(['Перевод другу', 'Оплата услуг', 'Возврат долга', 'Подарок'], count)
+        fraud_scores = np.random.uniform(0.0, 0.3, count)
+        devices = device_ids[np.random.randint(0, len(device_ids), count)]
+        ip_idx = np.random.randint(0, len(ips), count)
+        processing = np.random.randint(100, 2001, count)
+        velocity = np.random.uniform(0.0, 0.2, count)
+        anomaly = np.random.uniform(0.0, 0.1, count)
+        chargeback = np.random.uniform(0.0, 0.1, count)
+        now = datetime.now()
+
+        for i in range(count):
+            ip = ips[ip_idx[i]]
+            fraud_score = round(float(fraud_scores[i]), 2)
+            yield (
+                int(account_ids[sender_idx[i]]), int(account_ids[receiver_idx[i]]), float(amounts[i]), 'RUB',
+                now - timedelta(seconds=int(offsets[i])), 'P2P', str(statuses[i]),
+                ip['ip_address_id'], int(devices[i]), ip.get('city', 'Unknown'), ip.get('country', 'Unknown'),
+                str(descriptions[i]), fraud_score, fraud_score > 0.8, fraud_score > 0.6, int(processing[i]),
+                round(float(velocity[i]), 2), round(float(anomaly[i]), 2), round(float(chargeback[i]), 2)
+            )
+
+    def _ensure_transaction_partitions(self, cursor, oldest: datetime) -> None:
+        """Create the daily transaction partitions from ``oldest`` up to today"""
+        cursor.execute("SELECT to_regprocedure('create_transaction_partitions(date, date)')")
+        if cursor.fetchone()[0] is None:
+            # Unpartitioned schema (schema.sql before migrate_transaction_partitions.sql)
+            return
+        oldest = oldest.date()
+        cursor.execute("SELECT create_transaction_partitions(%s, CURRENT_DATE)", (oldest,))
+        created = cursor.fetchone()[0]
+        if created:
+            logger.info(f"Created {created} transaction partitions from {oldest}")
+
+    def _reserve_ids(self, cursor, table: str, id_column: str, count: int) -> List[int]:
+        """Draw ``count`` ids from the table's serial sequence in one round-trip"""
+        if count <= 0:
+            return []
+        cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", (table, id_column))
+        sequence = cursor.fetchone()[0]
+        cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", (sequence, count))
+        return [row[0] for row in cursor.fetchall()]
+
+    def _copy_rows(self, cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        """Stream rows into ``table`` with COPY FROM STDIN and return the row count"""
+        stream = _CopyStream(rows)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream, size=65536)
+        return stream.rows_written
+
+    def _apply_client_stats(self, cursor, watermark: int) -> None:
+        """Apply the effect of update_client_stats() for transactions above ``watermark``"""
+        cursor.execute("""
+            UPDATE client c
+            SET total_transactions = c.total_transactions + s.tx_count,
+                total_amount_transferred = c.total_amount_transferred + s.tx_amount,
+                avg_transaction_amount = (c.total_amount_transferred + s.tx_amount) / (c.total_transactions + s.tx_count),
+                max_transaction_amount = GREATEST(COALESCE(c.max_transaction_amount, 0), s.tx_max)
+            FROM (
+                SELECT a.client_id, COUNT(*) AS tx_count, SUM(t.amount) AS tx_amount, MAX(t.amount) AS tx_max
+                FROM transaction t
+                JOIN account a ON t.sender_account_id = a.account_id
+                WHERE t.transaction_id > %s
+                GROUP BY a.client_id
+            ) s
+            WHERE c.client_id = s.client_id
+        """, (watermark,))
+        cursor.execute("""
+            UPDATE account a
+            SET transaction_count_today = a.transaction_count_today + s.tx_count,
+                amount_transferred_today = a.amount_transferred_today + s.tx_amount,
+                last_transaction_date = s.last_date
+            FROM (
+                SELECT sender_account_id, COUNT(*) AS tx_count, SUM(amount) AS tx_amount,
+                       MAX(transaction_date) AS last_date
+                FROM transaction
+                WHERE transaction_id > %s
+                GROUP BY sender_account_id
+            ) s
+            WHERE a.account_id = s.sender_account_id
+        """, (watermark,))
+
     # Helper methods
     def _calculate_client_risk(self, birth_date, reg_date) -> float:
         """Calculate client risk score"""
@@ -631,6 +917,14 @@ class TransactionGenerator:
         else:
             return round(random.uniform(50000, 200000), 2)
 
+    def _generate_realistic_amounts(self, count: int) -> np.ndarray:
+        """Vectorized _generate_realistic_amount for bulk generation"""
+        # Same mixture: 70% small, 27% medium, 3% large
+        bucket = np.random.choice(3, count, p=[0.7, 0.27, 0.03])
+        low = np.array([500, 10000, 50000])[bucket]
+        high = np.array([10000, 50000, 200000])[bucket]
+        return np.round(np.random.uniform(low, high), 2)
+
 if __name__ == "__main__":
     # Database configuration
     db_config = {
@@ -645,5 +939,8 @@ if __name__ == "__main__":
     generator = TransactionGenerator(db_config)
     generator.generate_all_data(num_clients=30, num_normal_transactions=500)
     
+    # For load-test sized datasets use the COPY-based loader instead, e.g.
+    # generator.bulk_generate_all_data(num_clients=100000, num_normal_transactions=10000000)
+    
     print("Test data generation completed!")
     print("Run advanced_fraud_detection.py to test fraud detection algorithms.")
\ No newline at end of file
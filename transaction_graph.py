@@ -0,0 +1,382 @@
+"""
+Compact in-memory transaction graph for fraud pattern search.
+
+The windowed edge list (one edge per transaction) is loaded once into CSR
+arrays: edges are grouped by sender and sorted by time, with a mirrored
+index grouped by receiver. Path searches then walk integer offsets instead
+of re-joining the transaction table for every hop.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EDGE_QUERY = """
+SELECT
+    t.transaction_id,
+    t.sender_account_id,
+    t.receiver_account_id,
+    t.amount,
+    EXTRACT(EPOCH FROM t.transaction_date)
+FROM transaction t
+WHERE t.transaction_date >= NOW() - INTERVAL '%s hours'
+"""
+
+
+def epoch_to_datetime(ts: float) -> datetime:
+    """Inverse of EXTRACT(EPOCH FROM <timestamp>) for naive timestamps"""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+
+def datetime_to_epoch(value: datetime) -> float:
+    """EXTRACT(EPOCH FROM <timestamp>) for a naive timestamp"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TemporalGraph:
+    """Directed multigraph of transfers stored as time-sorted CSR arrays"""
+
+    def __init__(self, transaction_ids, senders, receivers, amounts, timestamps):
+        transaction_ids = np.asarray(transaction_ids, dtype=np.int64)
+        senders = np.asarray(senders, dtype=np.int64)
+        receivers = np.asarray(receivers, dtype=np.int64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+
+        # Compact account ids to 0..n-1
+        self.accounts, inverse = np.unique(np.concatenate([senders, receivers]), return_inverse=True)
+        src = inverse[:len(senders)]
+        dst = inverse[len(senders):]
+        n = len(self.accounts)
+
+        out_order = np.lexsort((timestamps, src))
+        self.out_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.out_ptr[1:])
+        self.out_dst = dst[out_order]
+        self.out_ts = timestamps[out_order]
+        self.out_amount = amounts[out_order]
+        self.out_txid = transaction_ids[out_order]
+
+        in_order = np.lexsort((timestamps, dst))
+        self.in_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=self.in_ptr[1:])
+        self.in_src = src[in_order]
+        self.in_ts = timestamps[in_order]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.accounts)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.out_dst)
+
+    @classmethod
+    def from_query(cls, conn, query: str = EDGE_QUERY, params=None, itersize: int = 100000) -> 'TemporalGraph':
+        """Build a graph from (transaction_id, sender, receiver, amount, epoch) rows"""
+        columns = [[] for _ in range(5)]
+        with conn.cursor(name='temporal_graph_edges') as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                chunk = np.array(rows, dtype=np.float64).reshape(-1, 5)
+                for i in range(5):
+                    columns[i].append(chunk[:, i])
+        if not columns[0]:
+            return cls([], [], [], [], [])
+        txid, src, dst, amount, ts = (np.concatenate(c) for c in columns)
+        return cls(txid.astype(np.int64), src.astype(np.int64), dst.astype(np.int64), amount, ts)
+
+    @classmethod
+    def load_window(cls, conn, time_window_hours: int = 24, itersize: int = 100000) -> 'TemporalGraph':
+        """Load every transfer in the last ``time_window_hours``"""
+        return cls.from_query(conn, EDGE_QUERY, (time_window_hours,), itersize)
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Edge arrays (txid, sender, receiver, amount, ts) with original account ids"""
+        src = np.repeat(np.arange(self.num_nodes), np.diff(self.out_ptr))
+        return (self.out_txid, self.accounts[src], self.accounts[self.out_dst],
+                self.out_amount, self.out_ts)
+
+    def subgraph(self, mask: np.ndarray) -> 'TemporalGraph':
+        """Graph with only the edges selected by ``mask`` (in out-edge order)"""
+        txid, src, dst, amount, ts = self.edges()
+        return TemporalGraph(txid[mask], src[mask], dst[mask], amount[mask], ts[mask])
+
+    def around(self, mask: np.ndarray, hops: int) -> 'TemporalGraph':
+        """
+        Edges that can share a cycle of up to ``hops + 1`` edges with a masked edge.
+
+        Every account on such a cycle through u->v is reachable from v in at
+        most ``hops`` transfers and reaches u in at most ``hops`` transfers,
+        so only the masked edges and edges between such accounts are kept.
+        Each expansion is one vectorised pass over the edges, and what is
+        left for the cycle search grows with the masked (new) edges rather
+        than with the window.
+        """
+        src = np.repeat(np.arange(self.num_nodes), np.diff(self.out_ptr))
+        dst = self.out_dst
+        forward = np.zeros(self.num_nodes, dtype=bool)
+        backward = np.zeros(self.num_nodes, dtype=bool)
+        forward[dst[mask]] = True
+        backward[src[mask]] = True
+        for _ in range(hops):
+            forward[dst[forward[src]]] = True
+            backward[src[backward[dst]]] = True
+        on_cycle = forward & backward
+        return self.subgraph(mask | (on_cycle[src] & on_cycle[dst]))
+
+    def along(self, mask: np.ndarray, hops: int) -> 'TemporalGraph':
+        """
+        Edges that can share a path of up to ``hops + 1`` edges with a masked edge.
+
+        The path's edges before a masked edge u->v lie between accounts that
+        reach u, those after it between accounts reached from v, each within
+        ``hops`` transfers.
+        """
+        src = np.repeat(np.arange(self.num_nodes), np.diff(self.out_ptr))
+        dst = self.out_dst
+        forward = np.zeros(self.num_nodes, dtype=bool)
+        backward = np.zeros(self.num_nodes, dtype=bool)
+        forward[dst[mask]] = True
+        backward[src[mask]] = True
+        for _ in range(hops):
+            forward[dst[forward[src]]] = True
+            backward[src[backward[dst]]] = True
+        return self.subgraph(mask | (forward[src] & forward[dst]) | (backward[src] & backward[dst]))
+
+    def cycle_candidates(self) -> 'TemporalGraph':
+        """
+        Drop edges that cannot lie on any cycle.
+
+        An edge a->b survives only if a receives and b sends at least one
+        other surviving transfer. Removing edges can strand others, so the
+        filter is repeated until nothing changes. On sparse P2P graphs this
+        strips most one-off payers and payees before the search starts.
+        """
+        txid, src, dst, amount, ts = self.edges()
+        keep = src != dst
+        n = self.num_nodes
+        src_idx = np.searchsorted(self.accounts, src)
+        dst_idx = np.searchsorted(self.accounts, dst)
+        while True:
+            out_degree = np.bincount(src_idx[keep], minlength=n)
+            in_degree = np.bincount(dst_idx[keep], minlength=n)
+            new_keep = keep & (out_degree[dst_idx] > 0) & (in_degree[src_idx] > 0)
+            if np.array_equal(new_keep, keep):
+                break
+            keep = new_keep
+        return TemporalGraph(txid[keep], src[keep], dst[keep], amount[keep], ts[keep])
+
+
+class _PathIndex:
+    """Edge-level lookups shared by the vectorised path search"""
+
+    def __init__(self, graph: TemporalGraph):
+        self.graph = graph
+        m = graph.num_edges
+        self.src = np.repeat(np.arange(graph.num_nodes), np.diff(graph.out_ptr))
+        self.dst = graph.out_dst
+        self.ts = graph.out_ts
+        # Out-edges are sorted by (sender, time), so sender * (m + 1) + time rank
+        # is a sorted key that one searchsorted call can probe for every path
+        self.times, self.rank = np.unique(self.ts, return_inverse=True)
+        self.stride = m + 1
+        self.key = self.src * self.stride + self.rank
+
+    def single_edges(self) -> List[np.ndarray]:
+        edges = np.flatnonzero(self.src != self.dst)
+        return [edges]
+
+    def next_edges(self, last: np.ndarray, deadline: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (parent, edge) pairs: every out-edge of each path's last account that
+        is strictly later than the path's last edge and, if given, no later
+        than the path's ``deadline``
+        """
+        node = self.dst[last]
+        lo = np.searchsorted(self.key, node * self.stride + self.rank[last], side='right')
+        hi = self.graph.out_ptr[node + 1]
+        if deadline is not None:
+            limit = np.searchsorted(self.times, deadline, side='right') - 1
+            hi = np.minimum(hi, np.searchsorted(self.key, node * self.stride + limit, side='right'))
+        counts = np.maximum(hi - lo, 0)
+        parent = np.repeat(np.arange(len(last)), counts)
+        offsets = np.arange(len(parent)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return parent, lo[parent] + offsets
+
+    def simple(self, paths: List[np.ndarray], new_edge: np.ndarray) -> np.ndarray:
+        """Mask of appended edges that lead to an account not yet on the path"""
+        new_node = self.dst[new_edge]
+        keep = new_node != self.src[paths[0]]
+        for column in paths:
+            keep &= new_node != self.dst[column]
+        return keep
+
+    def extend(self, paths: List[np.ndarray], max_duration: float) -> List[np.ndarray]:
+        """Append every strictly later out-edge that keeps the paths simple"""
+        deadline = self.ts[paths[0]] + max_duration if np.isfinite(max_duration) else None
+        parent, new_edge = self.next_edges(paths[-1], deadline)
+        extended = [column[parent] for column in paths]
+        keep = self.simple(extended, new_edge)
+        return [column[keep] for column in extended + [new_edge]]
+
+    def close_cycles(self, forward: List[np.ndarray], backward: List[np.ndarray],
+                     max_duration: float) -> List[np.ndarray]:
+        """
+        Join paths s->x with paths x->s into cycles.
+
+        The forward half must finish before the backward half starts, and
+        the two halves may share no account other than s and x.
+        """
+        if not len(forward[0]) or not len(backward[0]):
+            return []
+        n = self.graph.num_nodes
+        forward_key = self.src[forward[0]] * n + self.dst[forward[-1]]
+        backward_key = self.dst[backward[-1]] * n + self.src[backward[0]]
+        order = np.argsort(backward_key, kind='stable')
+        sorted_key = backward_key[order]
+        lo = np.searchsorted(sorted_key, forward_key, side='left')
+        hi = np.searchsorted(sorted_key, forward_key, side='right')
+        counts = hi - lo
+        f = np.repeat(np.arange(len(forward_key)), counts)
+        offsets = np.arange(len(f)) - np.repeat(np.cumsum(counts) - counts, counts)
+        b = order[lo[f] + offsets]
+
+        cycle = [column[f] for column in forward] + [column[b] for column in backward]
+        keep = self.ts[cycle[len(forward) - 1]] < self.ts[cycle[len(forward)]]
+        keep &= self.ts[cycle[-1]] - self.ts[cycle[0]] <= max_duration
+        for fe in cycle[:len(forward) - 1]:
+            for be in cycle[len(forward):-1]:
+                keep &= self.dst[fe] != self.dst[be]
+        return [column[keep] for column in cycle]
+
+
+def find_temporal_cycles(graph: TemporalGraph, min_length: int = 3, max_length: int = 6,
+                         max_duration: Optional[float] = None) -> Iterator[Tuple[List[int], List[int], float, float]]:
+    """
+    Enumerate simple cycles whose edges are strictly increasing in time.
+
+    Each cycle is reported once, starting at its earliest edge. Rather than
+    walking every path of length ``max_length``, time-ordered simple paths
+    are only grown to half that length (as numpy columns of edge offsets)
+    and a cycle of length L is found by joining an s->x path of ceil(L/2)
+    edges with an x->s path of floor(L/2) edges on the (s, x) pair.
+
+    Args:
+        graph: Graph to search (ideally TemporalGraph.cycle_candidates())
+        min_length: Minimum number of transactions in a cycle
+        max_length: Maximum number of transactions in a cycle
+        max_duration: Optional limit in seconds between first and last edge
+
+    Yields:
+        (account_path, transaction_ids, total_amount, last_timestamp) where
+        account_path starts and ends with the same account
+    """
+    if graph.num_edges == 0 or max_length < 2:
+        return
+    index = _PathIndex(graph)
+    max_duration = float('inf') if max_duration is None else float(max_duration)
+
+    paths = {1: index.single_edges()}
+    for length in range(2, (max_length + 1) // 2 + 1):
+        paths[length] = index.extend(paths[length - 1], max_duration)
+
+    accounts = graph.accounts
+    for length in range(max(min_length, 2), max_length + 1):
+        cycles = index.close_cycles(paths[(length + 1) // 2], paths[length // 2], max_duration)
+        if not cycles:
+            continue
+        logger.debug(f"{len(cycles[0])} temporal cycles of length {length}")
+        edges = np.column_stack(cycles)
+        nodes = accounts[np.column_stack([index.src[cycles[0]]] + [index.dst[c] for c in cycles])]
+        txids = graph.out_txid[edges]
+        totals = graph.out_amount[edges].sum(axis=1)
+        last_ts = index.ts[cycles[-1]]
+        for i in range(len(edges)):
+            yield nodes[i].tolist(), txids[i].tolist(), float(totals[i]), float(last_ts[i])
+
+
+def find_layered_chains(graph: TemporalGraph, min_layers: int = 3, max_layers: int = 6,
+                        max_dwell: Optional[float] = None,
+                        amount_tolerance: float = 0.1) -> Iterator[Tuple[List[int], List[int], float, float, float]]:
+    """
+    Enumerate chains that move money forward through distinct accounts.
+
+    A chain a0 -> a1 -> ... -> ak follows the money: every hop leaves its
+    account strictly after the previous hop arrived and at most
+    ``max_dwell`` seconds later, carrying between ``1 - amount_tolerance``
+    and 1 times the previous hop's amount. Chains are grown hop by hop as
+    numpy columns of edge offsets, like the cycle search, so the cost
+    follows the number of valid chains rather than the join of every
+    transfer with every later one.
+
+    Only maximal chains are reported: they start at a transfer that no
+    valid hop leads into and end where no valid hop continues (or at
+    ``max_layers``), so prefixes and suffixes of a longer chain are not
+    reported on their own.
+
+    Args:
+        graph: Graph to search
+        min_layers: Minimum number of hops in a chain
+        max_layers: Maximum number of hops in a chain
+        max_dwell: Optional limit in seconds between consecutive hops
+        amount_tolerance: Share of the previous hop's amount a hop may lose
+
+    Yields:
+        (account_path, transaction_ids, total_amount, first_timestamp,
+        last_timestamp) with the accounts from originator to final
+        beneficiary
+    """
+    if graph.num_edges == 0 or max_layers < 1:
+        return
+    index = _PathIndex(graph)
+    amounts = graph.out_amount
+    floor = 1.0 - amount_tolerance
+    dwell = float('inf') if max_dwell is None else float(max_dwell)
+
+    def valid_hops(last, new_edge):
+        return (amounts[new_edge] <= amounts[last]) & (amounts[new_edge] >= amounts[last] * floor)
+
+    def deadline(last):
+        return index.ts[last] + dwell if np.isfinite(dwell) else None
+
+    # Transfers some valid hop leads into continue a longer chain
+    edges = np.flatnonzero(index.src != index.dst)
+    parent, new_edge = index.next_edges(edges, deadline(edges))
+    fed = valid_hops(edges[parent], new_edge) & (index.dst[new_edge] != index.src[edges[parent]])
+    paths = [np.setdiff1d(edges, new_edge[fed])]
+
+    accounts = graph.accounts
+    for layers in range(1, max_layers + 1):
+        last = paths[-1]
+        if layers < max_layers:
+            parent, new_edge = index.next_edges(last, deadline(last))
+            keep = valid_hops(last[parent], new_edge) & index.simple([c[parent] for c in paths], new_edge)
+            parent, new_edge = parent[keep], new_edge[keep]
+        else:
+            parent = new_edge = np.empty(0, dtype=np.int64)
+
+        if layers >= min_layers:
+            ended = np.ones(len(last), dtype=bool)
+            ended[parent] = False
+            chains = [column[ended] for column in paths]
+            if len(chains[0]):
+                logger.debug(f"{len(chains[0])} layered chains of {layers} hops")
+                hops = np.column_stack(chains)
+                nodes = accounts[np.column_stack([index.src[chains[0]]] + [index.dst[c] for c in chains])]
+                txids = graph.out_txid[hops]
+                totals = amounts[hops].sum(axis=1)
+                for i in range(len(hops)):
+                    yield (nodes[i].tolist(), txids[i].tolist(), float(totals[i]),
+                           float(index.ts[chains[0][i]]), float(index.ts[chains[-1][i]]))
+        if not len(parent):
+            break
+        paths = [column[parent] for column in paths] + [new_edge]